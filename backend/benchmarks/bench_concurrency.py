@@ -0,0 +1,96 @@
+"""
+Concurrency benchmark for the async /chat pipeline.
+
+Drives the FastAPI app in-process with a fixed number of in-flight requests
+and reports throughput per concurrency level. Ollama and gTTS are replaced by
+stand-ins with a fixed latency, so the numbers show how well the request path
+overlaps waiting on I/O rather than how fast the model is.
+
+Usage (from backend/):
+    python benchmarks/bench_concurrency.py --llm-latency 0.5 --tts-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The file store writes local_db.json into the working directory
+os.chdir(tempfile.mkdtemp(prefix="bench_concurrency_"))
+# Every turn must reach the LLM stand-in; template replies would skip it
+os.environ["REPLY_TEMPLATES_ENABLED"] = "false"
+
+import httpx
+import main
+from services.llm_client import OllamaClient
+from services.llm_service import llm_service
+from services.tts_service import tts_service
+
+
+LLM_CALLS = [0]
+
+
+def install_stand_ins(llm_latency: float, tts_latency: float, llm_concurrency: int):
+    async def fake_ollama(request: httpx.Request) -> httpx.Response:
+        LLM_CALLS[0] += 1
+        await asyncio.sleep(llm_latency)
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "What is your phone number?"}})
+
+    def fake_tts(text: str, language: str = "en"):
+        time.sleep(tts_latency) # gTTS blocks, so the stand-in blocks too
+        return ""
+
+    llm_service.client = OllamaClient(
+        llm_service.api_url,
+        max_concurrency=llm_concurrency,
+        max_queue=100000,
+        transport=httpx.MockTransport(fake_ollama)
+    )
+    tts_service.synthesize = fake_tts
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            response = await client.post("/chat", json={
+                "userId": "bench",
+                "sessionId": f"bench-{concurrency}-{i}",
+                # Distinct prompts, so request coalescing does not flatter the numbers
+                "userMessage": f"Hi, I am looking for a villa in Marina ({i})",
+                "language": "en"
+            })
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    install_stand_ins(args.llm_latency, args.tts_latency, args.llm_concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'concurrency':>12} {'requests':>9} {'llm calls':>10} {'seconds':>9} {'req/s':>9}")
+        for concurrency in args.levels:
+            total = max(args.requests, concurrency)
+            calls = LLM_CALLS[0]
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = await run_level(client, concurrency, total)
+            print(f"{concurrency:>12} {total:>9} {LLM_CALLS[0] - calls:>10} {elapsed:>9.2f} {total / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Simulated Ollama latency in seconds")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Simulated gTTS latency in seconds")
+    parser.add_argument("--llm-concurrency", type=int, default=64, help="Cap on in-flight LLM calls (LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,164 @@
+"""
+Benchmark and equivalence check for the compiled lead extraction engine.
+
+Compares LeadExtractionService.extract_data against the original per-call
+implementation (kept below as `legacy_extract_data`) on typical chat messages
+and on adversarial long inputs, after checking both return identical profiles
+on a fixed corpus plus random fuzz.
+
+Usage (from backend/):
+    python benchmarks/bench_extraction.py --fuzz 20000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import LeadProfile
+from services.lead_extraction import lead_extractor
+
+LOCATIONS = lead_extractor.locations
+PROPERTY_TYPES = lead_extractor.property_types
+
+
+def legacy_extract_data(user_message: str, current_profile: LeadProfile) -> LeadProfile:
+    # Verbatim logic of extract_data before the compiled engine
+    msg_lower = user_message.lower()
+    if "off-plan" in msg_lower or "off plan" in msg_lower:
+        current_profile.investment_type = "Off-plan"
+    elif "ready" in msg_lower or "secondary" in msg_lower or "move in" in msg_lower:
+        current_profile.investment_type = "Ready/Secondary"
+    budget_match = re.search(r'(\d+(?:[.,]\d+)?[mk]?)', msg_lower)
+    if budget_match:
+        currency_indicators = ["$", "£", "€", "dollars", "pounds", "euros", "budget", "price", "cost"]
+        if any(ind in msg_lower for ind in currency_indicators):
+            if re.search(r'\d+\s*(?:m|million|k|thousand)', msg_lower) or "$" in msg_lower or "€" in msg_lower or "£" in msg_lower:
+                current_profile.budget_range = user_message
+    for p_type in PROPERTY_TYPES:
+        if p_type.lower() in msg_lower:
+            current_profile.property_type = p_type
+    if "studio" in msg_lower:
+        current_profile.bedrooms = "Studio"
+    else:
+        bd_match = re.search(r'(\d+)\s*(?:br|bed|room)', msg_lower)
+        if bd_match:
+            current_profile.bedrooms = f"{bd_match.group(1)} Bedroom(s)"
+    for loc in LOCATIONS:
+        if loc.lower() in msg_lower:
+            current_profile.target_location = loc
+    if "asap" in msg_lower or "urgent" in msg_lower or "now" in msg_lower or "this month" in msg_lower or "immediate" in msg_lower:
+        current_profile.urgency = "High"
+    if any("\u0600" <= c <= "\u06FF" for c in user_message):
+        current_profile.language_preference = "ar"
+    email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', user_message)
+    if email_match:
+        current_profile.email = email_match.group(0)
+    phone_match = re.search(r'(?:\+|00)?(?:\d[\s-]?){9,14}', user_message)
+    if phone_match and len(re.sub(r'\D', '', phone_match.group(0))) >= 9:
+        current_profile.phone_number = phone_match.group(0).strip()
+    name_patterns = [
+        r"my name is ([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)",
+        r"i am ([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)",
+        r"call me ([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)"
+    ]
+    for pattern in name_patterns:
+        match = re.search(pattern, user_message, re.IGNORECASE)
+        if match:
+            candidate = match.group(1)
+            forbidden = ["looking", "interested", "searching", "buying", "selling"]
+            if candidate.lower() not in forbidden:
+                current_profile.name = candidate.title()
+            break
+    return current_profile
+
+
+TYPICAL = [
+    "Hello",
+    "Hi, I want to buy a villa.",
+    "My name is Sarah Connor",
+    "call me at +971 50 123 4567 please",
+    "I'm looking for a 2 bedroom apartment in Downtown, budget around 1.5M dollars",
+    "Off-plan penthouse in Marina, price up to €900k, asap",
+    "I am interested in a studio near the Beachfront",
+    "email me: sarah.connor@example.com or 0501234567",
+    "مرحبا، أبحث عن فيلا",
+    "We need to move in this month, 3 br townhouse in the Hills, £2 million",
+]
+
+ADVERSARIAL = {
+    "long digit run (10k)": "9" * 10_000,
+    "spaced digits (10k)": "1 " * 5_000,
+    "word chars, no @ (10k)": "a" * 10_000,
+    "many @ (5k)": "a@" * 2_500,
+    "long prose (10k)": ("lorem ipsum dolor sit amet consectetur " * 260)[:10_000],
+    "digits + budget word (10k)": "budget " + "7" * 10_000,
+}
+
+FUZZ_ALPHABET = list("0123456789 -+.,@$€£kmKMabcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ") + ["ا", "١", "İ"]
+FUZZ_WORDS = ["off plan", "ready", "villa", "marina", "budget", "million", "thousand", "studio", "bed", "br", "room",
+              "my name is", "i am", "call me", "looking", "now", "asap", "@mail.com", "00971", "+44"]
+
+
+def fuzz_message(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 12)):
+        if rng.random() < 0.4:
+            parts.append(rng.choice(FUZZ_WORDS))
+        else:
+            parts.append("".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(1, 12))))
+    return rng.choice(["", " "]).join(parts)
+
+
+def check_equivalence(messages):
+    for message in messages:
+        expected = legacy_extract_data(message, LeadProfile())
+        actual = lead_extractor.extract_data(message, LeadProfile())
+        if expected != actual:
+            raise AssertionError(f"Mismatch for {message[:80]!r}:\n legacy={expected}\n engine={actual}")
+
+
+def time_per_call(fn, message, min_seconds=0.2):
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(message, LeadProfile())
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fuzz", type=int, default=20_000, help="Random messages for the equivalence check")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = TYPICAL + [fuzz_message(rng) for _ in range(args.fuzz)]
+    check_equivalence(corpus + [m[:2_000] for m in ADVERSARIAL.values()])
+    print(f"Equivalence: {len(corpus) + len(ADVERSARIAL)} messages, identical profiles\n")
+
+    print(f"{'input':<30} {'legacy':>12} {'engine':>12} {'speedup':>8}")
+    rows = [("typical (avg of 10)", None)] + list(ADVERSARIAL.items())
+    for label, message in rows:
+        if message is None:
+            legacy = sum(time_per_call(legacy_extract_data, m, 0.05) for m in TYPICAL) / len(TYPICAL)
+            engine = sum(time_per_call(lead_extractor.extract_data, m, 0.05) for m in TYPICAL) / len(TYPICAL)
+        else:
+            legacy = time_per_call(legacy_extract_data, message)
+            engine = time_per_call(lead_extractor.extract_data, message)
+        print(f"{label:<30} {legacy * 1e6:>10.1f}us {engine * 1e6:>10.1f}us {legacy / engine:>7.1f}x")
+
+    batch = TYPICAL * 1_000
+    start = time.perf_counter()
+    lead_extractor.extract_many(batch)
+    elapsed = time.perf_counter() - start
+    print(f"\nextract_many: {len(batch)} messages in {elapsed:.3f}s ({len(batch) / elapsed:,.0f} msg/s)")
+
+
+if __name__ == "__main__":
+    main()
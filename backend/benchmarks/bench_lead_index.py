@@ -0,0 +1,95 @@
+"""
+Benchmark for the lead index behind /admin/leads.
+
+Generates N synthetic sessions, indexes them, and times typical dashboard
+queries against the index and against a scan of the session documents
+(what answering them without the index costs).
+
+Usage (from backend/):
+    python benchmarks/bench_lead_index.py --sessions 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.budget import parse_budget
+from services.lead_extraction import lead_extractor
+from services.lead_index import LeadIndex
+
+BUDGETS = ["budget 1.5M dollars", "around 500k", "2 million euros", "€900k", "£2 million", "AED 3.2m",
+           "price up to $750,000", "budget 1,200,000 AED", None]
+
+
+def make_docs(n: int, rng: random.Random):
+    for i in range(n):
+        yield {
+            "session_id": f"bench-{i:07d}",
+            "qualification_status": rng.choice(["INITIAL", "DISCOVERY", "QUALIFIED", "NEEDS_REVIEW"]),
+            "updated_at": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00",
+            "lead_profile": {
+                "lead_score": rng.randint(0, 170),
+                "target_location": rng.choice(lead_extractor.locations + [None]),
+                "property_type": rng.choice(lead_extractor.property_types + [None]),
+                "budget_range": rng.choice(BUDGETS),
+                "urgency": rng.choice(["High", None, None]),
+            },
+        }
+
+
+def scan(docs, status, location, property_type, min_budget):
+    # Equivalent of the query without an index: parse and filter every document
+    hits = []
+    for doc in docs:
+        p = doc["lead_profile"]
+        if doc["qualification_status"] != status or p["property_type"] != property_type or p["target_location"] != location:
+            continue
+        value, _ = parse_budget(p["budget_range"])
+        if value is not None and value >= min_budget:
+            hits.append(doc)
+    hits.sort(key=lambda d: (d["lead_profile"]["urgency"] == "High", d["lead_profile"]["lead_score"]), reverse=True)
+    return hits[:50]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    docs = list(make_docs(args.sessions, rng))
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LeadIndex(os.path.join(tmp, "lead_index.sqlite3"))
+        start = time.perf_counter()
+        index.backfill(docs)
+        print(f"Indexed {index.count()} sessions in {time.perf_counter() - start:.1f}s\n")
+
+        queries = {
+            "QUALIFIED villas in Marina >= 1M, urgent first": dict(
+                status="QUALIFIED", property_type="villa", location="marina", min_budget=1_000_000, order="urgency"),
+            "top scored leads": dict(order="score"),
+            "QUALIFIED, score >= 100, by budget": dict(status="QUALIFIED", min_score=100, order="budget"),
+            "EUR budgets 500k-2M": dict(currency="EUR", min_budget=500_000, max_budget=2_000_000, order="updated"),
+        }
+        print(f"{'query':<50} {'rows':>5} {'index p50':>11} {'index max':>11}")
+        for label, params in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = index.query(**params)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f"{label:<50} {len(result['items']):>5} {timings[len(timings) // 2] * 1e3:>9.2f}ms {timings[-1] * 1e3:>9.2f}ms")
+
+        start = time.perf_counter()
+        scanned = scan(docs, "QUALIFIED", "Marina", "Villa", 1_000_000)
+        print(f"\nSame query as an in-memory scan of already-loaded documents: {(time.perf_counter() - start) * 1e3:.0f}ms ({len(scanned)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark for the prompt layout and Ollama's KV cache reuse.
+
+Replays the same scripted conversations with the previous prompt layout
+(lead profile at the top of the system prompt, history window sliding every
+turn) and the current one (static instructions first, append-only history
+folded in chunks, profile state as a trailing message), and reports how many
+prompt tokens had to be evaluated and the prompt eval time per turn.
+
+By default it runs against loadtest.fake_ollama in-process, which simulates
+Ollama's per-slot prefix cache (--eval-per-token seconds per uncached token).
+With --url it talks to a real Ollama, whose prompt_eval_count and
+prompt_eval_duration show the same effect on an actual model.
+
+Usage (from backend/):
+    python benchmarks/bench_prompt_cache.py --sessions 4 --parallel 4
+    python benchmarks/bench_prompt_cache.py --url http://localhost:11434/api/chat --model phi3:mini --sessions 1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from config.settings import config
+from loadtest.fake_ollama import LatencyDistribution, create_app
+from models.schemas import LeadProfile, Session
+from services.history_manager import HistoryManager
+from services.lead_extraction import lead_extractor
+from services.llm_client import OllamaClient, ollama_options
+from services.llm_service import llm_service
+
+SCRIPT = [
+    "{greeting}",
+    "My name is {name}",
+    "You can call me on {phone}",
+    "I want a {property}",
+    "Somewhere in {location} if possible",
+    "Budget is around {budget}",
+    "I'd need {beds} bedrooms",
+    "{investment} would be best",
+    "How soon could I see something?",
+    "Are there any schools nearby?",
+    "What about service charges?",
+    "Can your advisor call me {when}?",
+]
+GREETINGS = ["Hi, I'm looking for a property", "Hello there", "Good morning, I saw your ad",
+             "Hey, I want to invest in real estate", "Hi! Can you help me find a home?"]
+NAMES = ["Sarah", "Omar", "Priya", "James", "Lina", "Mateo", "Aisha", "Tom"]
+BUDGETS = ["2 million dollars", "800k", "1.5M AED", "3 million euros", "650,000 dollars"]
+WHEN = ["tomorrow morning", "on Friday", "after 6pm", "next week", "today"]
+
+
+def script(i: int):
+    # Every conversation says something different, as real ones do
+    values = {
+        "greeting": GREETINGS[i % len(GREETINGS)], "name": NAMES[i % len(NAMES)],
+        "phone": f"+971 50 {100 + i:03d} {4567 + i:04d}",
+        "property": lead_extractor.property_types[i % len(lead_extractor.property_types)].lower(),
+        "location": lead_extractor.locations[(i * 3) % len(lead_extractor.locations)],
+        "budget": BUDGETS[(i * 7) % len(BUDGETS)], "beds": 1 + i % 4,
+        "investment": ["Ready to move in", "Off-plan"][i % 2], "when": WHEN[(i * 2) % len(WHEN)],
+    }
+    return [line.format(**values) for line in SCRIPT]
+
+
+def previous_payload(session: Session, user_message: str, language: str, model: str, history: HistoryManager) -> dict:
+    # The layout before: profile values at the top of the system prompt, no options
+    p = session.lead_profile
+    system_prompt = f"""
+You are a fast, efficient Real Estate Assistant for **Everest View Property**.
+**GOAL**: Get the user's **Name & Phone Number** ASAP, then confirm their Request (Property/Budget).
+
+**Current Known Information**:
+Investment: {p.investment_type}\\nBudget: {p.budget_range}\\nType: {p.property_type}\\nBeds: {p.bedrooms}\\nLocation: {p.target_location}
+(Name: {p.name or 'Unknown'}, Phone: {p.phone_number or 'Unknown'})
+
+**Instructions**:
+1. **PRIORITY 1**: If 'Name' or 'Phone' is Unknown, **ASK FOR IT NOW**. Do not ask about property details until you have contact info.
+2. **PRIORITY 2**: If you have Name+Phone, ask for the main requirement (e.g., "What kind of property are you looking for?" or "What is your budget?").
+3. **DO NOT** ask about amenities, pools, views, or specific neighborhood boundaries.
+4. **DO NOT** loop. If state shows "Unknown" but user just said it, assume the system missed it and ask *once* more clearly, or move to the next item.
+5. Keep it SHORT. "Thanks [Name], what is your phone number?" is a perfect response.
+6. Language: **{language}**.
+"""
+    recent = [{"role": m.role, "content": m.content} for m in session.messages]
+    messages = history.build_messages(system_prompt, session.conversation_summary, recent, user_message)
+    return {"model": model, "messages": messages, "stream": False, "keep_alive": config.OLLAMA_KEEP_ALIVE}
+
+
+def current_payload(session: Session, user_message: str, language: str, model: str, history: HistoryManager) -> dict:
+    return llm_service._build_payload(session, user_message, language, model)
+
+
+LAYOUTS = {
+    # (payload builder, history manager as the graph uses it)
+    "previous": (previous_payload, HistoryManager(fold_chunk_turns=0)),
+    "current": (current_payload, HistoryManager()),
+}
+
+
+async def converse(client: OllamaClient, layout: str, i: int, model: str, turns: int, results: list):
+    build, history = LAYOUTS[layout]
+    profile = LeadProfile()
+    transcript, summary, summarized = [], None, 0
+    for user_message in script(i)[:turns]:
+        profile = lead_extractor.extract_data(user_message, profile)
+        summary, summarized = history.fold(transcript, summary, summarized)
+        session = Session.model_validate({
+            "session_id": f"{layout}-{i}", "user_id": "bench", "messages": transcript[summarized:],
+            "lead_profile": profile, "conversation_summary": summary, "summarized_count": summarized
+        })
+        payload = build(session, user_message, "en", model, history)
+        started = time.perf_counter()
+        data = await client.achat(payload)
+        results.append({
+            "seconds": time.perf_counter() - started,
+            "prompt_chars": sum(len(m["content"]) for m in payload["messages"]),
+            "evaluated": data.get("prompt_eval_count") or 0,
+            "eval_ms": (data.get("prompt_eval_duration") or 0) / 1e6,
+        })
+        transcript += [{"role": "user", "content": user_message},
+                       {"role": "assistant", "content": data["message"]["content"]}]
+
+
+async def run_layout(args, layout: str) -> list:
+    if args.url:
+        client = OllamaClient(args.url, max_concurrency=args.parallel)
+    else:
+        app = create_app(LatencyDistribution("const:0"), LatencyDistribution("const:0"),
+                         args.parallel, prompt_eval_per_token=args.eval_per_token)
+        client = OllamaClient("http://fake-ollama/api/chat", max_concurrency=args.parallel,
+                              transport=httpx.ASGITransport(app=app))
+    results = []
+    try:
+        # Conversations interleave turn by turn, as concurrent chats do
+        await asyncio.gather(*(
+            converse(client, layout, i, args.model, args.turns, results)
+            for i in range(args.sessions)
+        ))
+    finally:
+        await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="A real Ollama /api/chat URL (default: in-process stand-in)")
+    parser.add_argument("--model", default=config.MODEL_NAME)
+    parser.add_argument("--sessions", type=int, default=4, help="Conversations running at once")
+    parser.add_argument("--turns", type=int, default=len(SCRIPT))
+    parser.add_argument("--parallel", type=int, default=4, help="Ollama slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--eval-per-token", type=float, default=0.002, help="Stand-in prompt eval cost per uncached token")
+    args = parser.parse_args()
+
+    target = args.url or f"stand-in ({args.parallel} slots, {args.eval_per_token * 1000:g} ms/token)"
+    print(f"{args.sessions} conversations x {args.turns} turns against {target}, options {ollama_options() or 'none'}\n")
+    print(f"{'layout':<10} {'prompt chars':>13} {'evaluated tok':>14} {'eval ms/turn':>13} {'turn p50 ms':>12}")
+    summary = {}
+    for layout in LAYOUTS:
+        results = asyncio.run(run_layout(args, layout))
+        evaluated = sum(r["evaluated"] for r in results)
+        eval_ms = statistics.mean(r["eval_ms"] for r in results)
+        summary[layout] = eval_ms
+        print(f"{layout:<10} {sum(r['prompt_chars'] for r in results):>13} {evaluated:>14} {eval_ms:>13.1f} "
+              f"{statistics.median(r['seconds'] for r in results) * 1000:>12.1f}")
+    if summary["current"] > 0:
+        print(f"\nPrompt eval time per turn: {summary['previous'] / summary['current']:.1f}x lower with the current layout")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark for bulk lead scoring (services.lead_ranking).
+
+Generates N synthetic profiles and compares the per-profile path
+(calculate_lead_score + check_qualification_status) with the vectorized
+one: building the feature columns, scoring, statuses and a top-K ranking,
+then re-ranking under changed weights. Also checks that both paths agree,
+on the profiles and through the lead index (SQL feature masks), and exits 1
+if they do not.
+
+Usage (from backend/):
+    python benchmarks/bench_scoring.py --profiles 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models.schemas import LeadProfile
+from services import lead_ranking
+from services.lead_extraction import lead_extractor
+from services.lead_index import LeadIndex
+from services.lead_ranking import LeadRanker, ProfileBatch
+from services.scoring import ScoringWeights
+
+# Includes the edge cases of the scalar checks: empty strings, "M" vs "m", "high" vs "High"
+BUDGETS = ["budget 1.5M dollars", "around 500k", "2 million euros", "AED 3.2m", "price up to $750,000", "", None, None]
+URGENCIES = ["High", "high", "Low", "", None, None]
+NAMES = ["Sarah", "Omar", "", None, None]
+PHONES = ["+971 50 123 4567", "", None, None, None]
+
+CHANGED_WEIGHTS = {"high_urgency": 50, "large_budget": 45, "contact": {"phone_number": 25}, "filled_field": {"email": 30}}
+
+
+def make_profiles(n: int, rng: random.Random):
+    return [{
+        "investment_type": rng.choice(lead_extractor.investment_types + [None, None]),
+        "budget_range": rng.choice(BUDGETS),
+        "property_type": rng.choice(lead_extractor.property_types + ["", None, None]),
+        "bedrooms": rng.choice(["1", "2", "3", "studio", None, None]),
+        "target_location": rng.choice(lead_extractor.locations + [None, None, None]),
+        "urgency": rng.choice(URGENCIES),
+        "name": rng.choice(NAMES),
+        "phone_number": rng.choice(PHONES),
+        "email": rng.choice(["lead@example.com", None, None, None]),
+    } for _ in range(n)]
+
+
+def scalar(profiles, weights):
+    scores, statuses = [], []
+    for p in profiles:
+        profile = LeadProfile(**p)
+        scores.append(lead_extractor.calculate_lead_score(profile, weights))
+        statuses.append(lead_extractor.check_qualification_status(profile).value)
+    return scores, statuses
+
+
+def mismatches(batch, profiles, weights) -> int:
+    scores, statuses = scalar(profiles, weights)
+    vector_scores = lead_ranking.score(batch, weights)
+    vector_statuses = [lead_ranking.STATUSES[code] for code in lead_ranking.qualification_status(batch)]
+    return sum(1 for i in range(len(profiles))
+               if vector_scores[i] != scores[i] or vector_statuses[i] != statuses[i])
+
+
+def timed(fn, *args, repeat=5, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--parity-sample", type=int, default=100_000, help="Profiles checked against the scalar path")
+    parser.add_argument("--index-sessions", type=int, default=50_000, help="Leads checked through the lead index")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    profiles = make_profiles(args.profiles, rng)
+    session_ids = [f"bench-{i:07d}" for i in range(args.profiles)]
+    weights = ScoringWeights()
+    changed = weights.merged(CHANGED_WEIGHTS)
+    print(f"{args.profiles} profiles\n")
+
+    sample = profiles[:args.parity_sample]
+    _, scalar_seconds = timed(scalar, sample, weights, repeat=1)
+    scalar_total = scalar_seconds / len(sample) * args.profiles
+    print(f"{'scalar: score + status per profile':<44} {scalar_total * 1e3:>10.1f}ms  (measured on {len(sample)})")
+
+    batch, build_seconds = timed(ProfileBatch.from_profiles, session_ids, profiles, repeat=1)
+    scores, score_seconds = timed(lead_ranking.score, batch, weights)
+    statuses, status_seconds = timed(lead_ranking.qualification_status, batch)
+    _, top_seconds = timed(lead_ranking.top_k, scores, args.top)
+
+    def rerank(w):
+        return lead_ranking.top_k(lead_ranking.score(batch, w), args.top), lead_ranking.qualification_status(batch)
+
+    _, rerank_seconds = timed(rerank, changed)
+    rows = [
+        ("vector: feature columns from dicts (once)", build_seconds),
+        ("vector: scores", score_seconds),
+        ("vector: statuses", status_seconds),
+        (f"vector: top {args.top}", top_seconds),
+        ("vector: re-rank with changed weights", rerank_seconds),
+    ]
+    for label, seconds in rows:
+        print(f"{label:<44} {seconds * 1e3:>10.1f}ms")
+    print(f"\nRe-rank is {scalar_total / rerank_seconds:.0f}x the scalar pass")
+    print("Status counts:", dict(zip(lead_ranking.STATUSES, np.bincount(statuses, minlength=3).tolist())))
+
+    failed = 0
+    sample_batch = ProfileBatch.from_profiles(session_ids[:len(sample)], sample)
+    for label, w in (("default weights", weights), ("changed weights", changed)):
+        bad = mismatches(sample_batch, sample, w)
+        print(f"Parity, {label}: {len(sample) - bad}/{len(sample)} match")
+        failed += bad
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LeadIndex(os.path.join(tmp, "lead_index.sqlite3"))
+        n = min(args.index_sessions, args.profiles)
+        index.backfill({"session_id": session_ids[i], "updated_at": "2026-01-01T00:00:00",
+                        "lead_profile": profiles[i]} for i in range(n))
+        ranker = LeadRanker(index)
+        index_batch = ranker.batch()
+        by_id = dict(zip(session_ids[:n], profiles[:n]))
+        bad = mismatches(index_batch, [by_id[s] for s in index_batch.session_ids], changed)
+        print(f"Parity through the lead index ({ranker.load_seconds * 1e3:.0f}ms load): {n - bad}/{n} match")
+        failed += bad
+
+    if failed:
+        print("FAIL: the vectorized path differs from calculate_lead_score/check_qualification_status")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
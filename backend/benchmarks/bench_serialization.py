@@ -0,0 +1,119 @@
+"""
+Micro-benchmarks for Session serialization.
+
+For sessions of 10-500 messages, compares the original round trips with the
+services.serialization path:
+
+    read       Session(**doc)                      vs  session_from_doc(doc)
+    construct  Session.model_construct (trusted)   vs  session_from_doc(doc)
+    write      json.loads(session.json())          vs  session_to_doc(session)
+    store      json.dumps(store, indent=2)         vs  dumps(store)  (orjson / compact JSON)
+    state      Session + Message per history item  vs  one model_validate  (graph)
+
+and checks that both paths produce identical documents first. The construct
+row is why reads keep validation: pydantic-core validates faster than
+model_construct builds the same objects in Python.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --sizes 10 50 100 500 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from models.schemas import LeadProfile, Message, MessageRole, ProcessStatus, Session
+from services import serialization
+from services.serialization import dumps, loads, session_from_doc, session_to_doc
+
+warnings.filterwarnings("ignore", category=DeprecationWarning) # session.json() is the old path on purpose
+
+
+def make_session(n_messages: int) -> Session:
+    messages = [
+        Message(role="user" if i % 2 == 0 else "assistant",
+                content=f"Message {i}: I am looking for a 2 bedroom apartment in the Marina, budget around 1.5M dollars.")
+        for i in range(n_messages)
+    ]
+    return Session(
+        session_id=f"bench-{n_messages}", user_id="bench", messages=messages,
+        lead_profile=LeadProfile(name="Sara Lee", phone_number="+971 50 123 4567", property_type="Apartment",
+                                 budget_range="1.5M dollars", target_location="Marina", lead_score=120),
+        qualification_status="QUALIFIED", conversation_summary="User: hello", summarized_count=2
+    )
+
+
+def trusted_construct(doc: dict) -> Session:
+    # Validation-free construction; datetimes and enums still need converting by hand
+    return Session.model_construct(
+        session_id=doc["session_id"], user_id=doc["user_id"],
+        messages=[Message.model_construct(role=MessageRole(m["role"]), content=m["content"],
+                                          timestamp=datetime.fromisoformat(m["timestamp"])) for m in doc["messages"]],
+        qualification_status=ProcessStatus(doc["qualification_status"]),
+        lead_profile=LeadProfile.model_construct(**doc["lead_profile"]),
+        created_at=datetime.fromisoformat(doc["created_at"]), updated_at=datetime.fromisoformat(doc["updated_at"]),
+        conversation_summary=doc["conversation_summary"], summarized_count=doc["summarized_count"]
+    )
+
+
+def timeit(fn, repeat: int) -> float:
+    fn() # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6 # microseconds per call
+
+
+def check(session: Session):
+    doc = json.loads(session.json())
+    assert session_to_doc(session) == doc, "write path differs"
+    assert session_from_doc(doc).model_dump() == Session(**doc).model_dump(), "read path differs"
+    assert trusted_construct(doc).model_dump() == Session(**doc).model_dump(), "construct path differs"
+    assert loads(dumps(doc)) == doc, "storage format does not round-trip"
+
+
+def run(sizes, repeat: int):
+    print(f"Storage encoder: {'orjson' if serialization.orjson is not None else 'json (compact)'}")
+    print(f"{'msgs':>5} {'op':<9} {'before us':>11} {'after us':>10} {'speedup':>8} {'bytes before':>13} {'bytes after':>12}")
+    for n in sizes:
+        session = make_session(n)
+        check(session)
+        doc = session_to_doc(session)
+        store = {f"s{i}": doc for i in range(20)} # The FILE store rewrites every session on each save
+        history = [{"role": m.role.value, "content": m.content} for m in session.messages]
+
+        rows = [
+            ("read", lambda: Session(**doc), lambda: session_from_doc(doc), None),
+            ("construct", lambda: trusted_construct(doc), lambda: session_from_doc(doc), None),
+            ("write", lambda: json.loads(session.json()), lambda: session_to_doc(session), None),
+            ("store", lambda: json.dumps(store, indent=2, default=str), lambda: dumps(store),
+             (len(json.dumps(store, indent=2, default=str).encode()), len(dumps(store)))),
+            ("state",
+             lambda: Session(session_id="x", user_id="user", lead_profile=session.lead_profile,
+                             messages=[Message(role=m["role"], content=m["content"]) for m in history]),
+             lambda: Session.model_validate({"session_id": "x", "user_id": "user", "lead_profile": session.lead_profile,
+                                             "messages": [{"role": m["role"], "content": m["content"]} for m in history]}),
+             None),
+        ]
+        for op, before, after, sizes_ in rows:
+            t_before, t_after = timeit(before, repeat), timeit(after, repeat)
+            size_cols = f"{sizes_[0]:>13} {sizes_[1]:>12}" if sizes_ else ""
+            print(f"{n:>5} {op:<9} {t_before:>11.1f} {t_after:>10.1f} {t_before / t_after:>7.1f}x {size_cols}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
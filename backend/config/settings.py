@@ -12,6 +12,19 @@ class Config:
     FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH", "./firebase_credentials.json")
     FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "everest-view-property")
 
+    # Session store: "auto" (Firestore if credentials exist, else local_db.json) or "sqlite"
+    SESSION_STORE = os.getenv("SESSION_STORE", "auto")
+    SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "local_db.sqlite3")
+    # Messages loaded with a session (never fewer than the unsummarized tail); older ones are paged on demand
+    SESSION_MESSAGE_WINDOW = int(os.getenv("SESSION_MESSAGE_WINDOW", 20))
+
+    # In-process session cache (write-behind; set the flush interval to 0 for write-through)
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 1000))
+    SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", 300))
+    SESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", 1.0))
+    # Check a cached session's stored message_count before each turn (shared stores only)
+    SESSION_CACHE_REVALIDATE = os.getenv("SESSION_CACHE_REVALIDATE", "true").lower() == "true"
+
     # MongoDB
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "realestate_db")
@@ -20,6 +33,97 @@ class Config:
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/api/chat")
     MODEL_NAME = os.getenv("MODEL_NAME", "phi3:mini")
     MODEL_SOURCE = os.getenv("MODEL_SOURCE", "ollama") # or 'openai'
+    # Routing tiers (src/hybrid_router.py): small talk goes to the tiny model (empty = disabled),
+    # complex questions to the cloud tier (an Ollama-compatible URL, or an offline mock if empty)
+    TINY_MODEL_NAME = os.getenv("TINY_MODEL_NAME", "qwen2.5:0.5b")
+    CLOUD_MODEL_NAME = os.getenv("CLOUD_MODEL_NAME", "claude-3-5-sonnet")
+    CLOUD_MODEL_BASE_URL = os.getenv("CLOUD_MODEL_BASE_URL", "")
+    CLOUD_MOCK_LATENCY_SECONDS = float(os.getenv("CLOUD_MOCK_LATENCY_SECONDS", 0.8))
+    # Template fast path: slot questions answered without the LLM; routes can be switched off one by one
+    REPLY_TEMPLATES_ENABLED = os.getenv("REPLY_TEMPLATES_ENABLED", "true").lower() == "true"
+    REPLY_TEMPLATE_ROUTES = os.getenv("REPLY_TEMPLATE_ROUTES", "greeting,ask_name,ask_phone,ask_property,ask_budget,complete")
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500)) # Whole prompt, incl. system prompt
+    HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 4)) # User/assistant pairs sent verbatim
+    HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", 300))
+    # Older turns are folded into the summary this many at a time, so the prompt prefix stays cacheable in between
+    HISTORY_FOLD_CHUNK_TURNS = int(os.getenv("HISTORY_FOLD_CHUNK_TURNS", 4)) # 0 = fold every turn
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4)) # In-flight calls to Ollama per worker
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 64)) # Callers allowed to wait for a slot before rejecting
+    LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", 8))
+    LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", 30))
+    # How long Ollama keeps a model in memory after a request (sent with every call and the warmup preload)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Ollama request options; 0 = not sent (model default). num_ctx must fit HISTORY_TOKEN_BUDGET plus the reply
+    OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 0))
+    OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", 0)) # Reply length cap in tokens (-1 = unlimited)
+
+    # Startup warmup (builds services, preloads Ollama models, primes caches) and /ready
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+    WARMUP_SESSIONS = int(os.getenv("WARMUP_SESSIONS", 0)) # Most recent sessions loaded into the session cache
+    READY_CHECK_TIMEOUT_SECONDS = float(os.getenv("READY_CHECK_TIMEOUT_SECONDS", 2))
+
+    # Chat admission: turns run at once per worker, turns allowed to wait, and how long they may wait
+    CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", 32)) # 0 = unlimited
+    CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", 128)) # Beyond this new turns get 429
+    CHAT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", 15)) # Then 503
+    # Turns for one session run one at a time; rapid-fire messages within the window share one reply
+    CHAT_SESSION_MAX_PENDING = int(os.getenv("CHAT_SESSION_MAX_PENDING", 4))
+    CHAT_COALESCE_WINDOW_SECONDS = float(os.getenv("CHAT_COALESCE_WINDOW_SECONDS", 0)) # 0 = off
+
+    # Lead index for dashboard queries (/admin/leads), rebuilt from the session store if missing
+    LEAD_INDEX_ENABLED = os.getenv("LEAD_INDEX_ENABLED", "true").lower() == "true"
+    LEAD_INDEX_DB_PATH = os.getenv("LEAD_INDEX_DB_PATH", "lead_index.sqlite3")
+    # Lead score weights (JSON, reloaded on change) and the /admin/leads/rank feature cache
+    LEAD_SCORING_WEIGHTS_PATH = os.getenv("LEAD_SCORING_WEIGHTS_PATH", "config/scoring_weights.json")
+    LEAD_RANK_REFRESH_SECONDS = float(os.getenv("LEAD_RANK_REFRESH_SECONDS", 30))
+
+    # Reply cache: "memory" (per worker), "sqlite" (shared by workers on the host) or "off"
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 24 * 3600))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+    RESPONSE_CACHE_SQLITE_PATH = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "response_cache.sqlite3")
+
+    # Text-to-speech: "gtts" (Google, needs network) or "stub" (offline, for load tests)
+    TTS_PROVIDER = os.getenv("TTS_PROVIDER", "gtts")
+    TTS_STUB_LATENCY_SECONDS = float(os.getenv("TTS_STUB_LATENCY_SECONDS", 0.2))
+
+    # Text-to-speech audio cache (shared directory, safe across workers)
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", 256))
+
+    # Async runtime
+    BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", 16)) # Threads for blocking I/O (SDKs, file writes, TTS)
+
+    # Outbox for notifications and CRM writes (SQLite, shared by workers on the host)
+    OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", "outbox.sqlite3")
+    OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", 2)) # Delivery threads per app process; 0 = run scripts/run_outbox_worker.py
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 6))
+    OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", 2))
+    OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 300))
+    OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 60)) # A claimed job is retried after this if its worker died
+    OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 1))
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+    # Retention sweep of finished jobs, run by the workers every OUTBOX_SWEEP_INTERVAL_SECONDS
+    OUTBOX_DONE_RETENTION_MINUTES = float(os.getenv("OUTBOX_DONE_RETENTION_MINUTES", 60))
+    OUTBOX_DEAD_RETENTION_DAYS = float(os.getenv("OUTBOX_DEAD_RETENTION_DAYS", 7))
+    OUTBOX_DEAD_MAX_ROWS = int(os.getenv("OUTBOX_DEAD_MAX_ROWS", 10000))
+    OUTBOX_SWEEP_INTERVAL_SECONDS = float(os.getenv("OUTBOX_SWEEP_INTERVAL_SECONDS", 300))
+
+    # CRM (Supabase) writes: bulk upserts flushed at this many buffered rows or after this long
+    CRM_BATCH_SIZE = int(os.getenv("CRM_BATCH_SIZE", 200))
+    CRM_FLUSH_INTERVAL_SECONDS = float(os.getenv("CRM_FLUSH_INTERVAL_SECONDS", 2))
+
+    # Providers: "auto" uses Twilio/Resend/Supabase when configured, "local" uses offline stand-ins
+    PROVIDER_MODE = os.getenv("PROVIDER_MODE", "auto")
+    LOCAL_PROVIDER_LOG = os.getenv("LOCAL_PROVIDER_LOG", "local_providers.jsonl")
+    LOCAL_PROVIDER_FAILURE_RATE = float(os.getenv("LOCAL_PROVIDER_FAILURE_RATE", 0))
+    LOCAL_PROVIDER_LATENCY_SECONDS = float(os.getenv("LOCAL_PROVIDER_LATENCY_SECONDS", 0))
+
+    # Logging: JSON lines; high-volume events (e.g. every Ollama response) are sampled at LOG_SAMPLE_RATE
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))
 
     # Notifications
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
@@ -0,0 +1,66 @@
+-- Supabase (Postgres) tables written by src/db_manager.py (CRM sync).
+--
+-- Every write is a bulk upsert, so each on_conflict key below needs a primary
+-- key or unique constraint:
+--   leads                  on_conflict=session_id
+--   conversations          on_conflict=session_id
+--   conversation_messages  on_conflict=session_id,seq
+--
+-- New project: run the whole file in the SQL editor.
+-- Existing project (conversations rows with an embedded `messages` array):
+-- run it as well before deploying; every statement is idempotent. The
+-- migration block at the end adds message_count, copies the embedded
+-- transcripts into conversation_messages and lets new rows omit `messages`.
+-- Check the sync afterwards with: python scripts/check_crm_sync.py
+
+create table if not exists leads (
+    session_id      text primary key,
+    investment_type text,
+    budget          text,
+    property_type   text,
+    bedrooms        text,
+    location        text,
+    language        text,
+    urgency         text,
+    score           integer,
+    updated_at      timestamp
+);
+
+-- One header row per session; the messages live in conversation_messages
+create table if not exists conversations (
+    session_id    text primary key,
+    message_count integer not null default 0,
+    updated_at    timestamp
+);
+
+-- Append-only transcript, seq is the message number within the session
+create table if not exists conversation_messages (
+    session_id text not null,
+    seq        integer not null,
+    role       text not null,
+    content    text,
+    logged_at  timestamp,
+    primary key (session_id, seq)
+);
+
+-- Migration from the embedded transcript (conversations.messages)
+alter table conversations add column if not exists message_count integer not null default 0;
+
+do $$
+begin
+    if exists (select 1 from information_schema.columns
+               where table_name = 'conversations' and column_name = 'messages') then
+        alter table conversations alter column messages drop not null;
+
+        insert into conversation_messages (session_id, seq, role, content, logged_at)
+        select c.session_id, (m.ordinality - 1)::integer, m.value->>'role', m.value->>'content', c.updated_at
+        from conversations c
+        cross join lateral jsonb_array_elements(to_jsonb(c.messages)) with ordinality as m(value, ordinality)
+        where c.messages is not null
+        on conflict (session_id, seq) do nothing;
+
+        update conversations
+        set message_count = jsonb_array_length(to_jsonb(messages))
+        where messages is not null and message_count = 0;
+    end if;
+end $$;
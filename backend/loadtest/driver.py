@@ -0,0 +1,220 @@
+"""
+Load driver: replays multi-turn lead conversations against a running backend.
+
+For each concurrency level, that many virtual users each run conversations
+back to back (new session per conversation, turns in order) for --duration
+seconds. Reports throughput and p50/p95/p99 turn latency per level; with
+--stream it drives /chat/stream and also reports time to first token.
+
+Usage (from backend/):
+    python -m loadtest.driver --base-url http://127.0.0.1:8002 --levels 1 4 16 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+# Conversation scripts: {name} / {phone} / {email} are filled per conversation
+CONVERSATIONS = [
+    [
+        "Hello",
+        "My name is {name}",
+        "You can call me on {phone}",
+        "I want a villa in the Marina, budget around 2M dollars",
+        "Off-plan is fine, we want to buy asap",
+    ],
+    [
+        "Hi, I'm looking for an apartment",
+        "2 bedrooms in Downtown please",
+        "Budget is about 900k euros",
+        "I am {name}, email me at {email}",
+    ],
+    [
+        "مرحبا، أبحث عن فيلا",
+        "My name is {name}",
+        "{phone}",
+        "Budget 3 million AED, ready to move in",
+    ],
+    [
+        "Good morning",
+        "Just browsing for now",
+        "Maybe a townhouse in the Hills",
+        "What prices do you have?",
+        "Thanks, I will think about it",
+    ],
+]
+
+FIRST_NAMES = ["Sara", "Omar", "Lina", "James", "Maria", "Yusuf", "Anna", "Karim"]
+LAST_NAMES = ["Lee", "Haddad", "Smith", "Garcia", "Khan", "Novak", "Rossi", "Ali"]
+
+
+def fill_values(rng: random.Random) -> Dict[str, str]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        "name": f"{first} {last}",
+        "phone": f"+971 5{rng.randint(0, 9)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "email": f"{first.lower()}.{last.lower()}{rng.randint(1, 999)}@example.com",
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LevelResult:
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.conversations = 0
+        self.elapsed = 0.0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self) -> dict:
+        lat = sorted(self.latencies)
+        ttft = sorted(self.first_token)
+        done = len(lat)
+        return {
+            "concurrency": self.concurrency,
+            "requests": done,
+            "errors": sum(self.errors.values()),
+            "error_kinds": self.errors,
+            "conversations": self.conversations,
+            "throughput_rps": round(done / self.elapsed, 2) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(lat, 50) * 1000, 1) if lat else None,
+            "p95_ms": round(percentile(lat, 95) * 1000, 1) if lat else None,
+            "p99_ms": round(percentile(lat, 99) * 1000, 1) if lat else None,
+            "max_ms": round(lat[-1] * 1000, 1) if lat else None,
+            "ttft_p50_ms": round(percentile(ttft, 50) * 1000, 1) if ttft else None,
+            "ttft_p95_ms": round(percentile(ttft, 95) * 1000, 1) if ttft else None,
+        }
+
+
+async def send_turn(client: httpx.AsyncClient, payload: dict, stream: bool, result: LevelResult) -> bool:
+    start = time.perf_counter()
+    try:
+        if not stream:
+            response = await client.post("/chat", json=payload)
+            if response.status_code != 200:
+                result.error(f"http_{response.status_code}")
+                return False
+            response.json()
+        else:
+            first = None
+            async with client.stream("POST", "/chat/stream", json=payload) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    result.error(f"http_{response.status_code}")
+                    return False
+                async for line in response.aiter_lines():
+                    if first is None and line.startswith("event: token"):
+                        first = time.perf_counter() - start
+            if first is not None:
+                result.first_token.append(first)
+    except httpx.TimeoutException:
+        result.error("timeout")
+        return False
+    except httpx.HTTPError as e:
+        result.error(type(e).__name__)
+        return False
+    result.latencies.append(time.perf_counter() - start)
+    return True
+
+
+async def virtual_user(client: httpx.AsyncClient, deadline: float, rng: random.Random, args, result: LevelResult):
+    while time.perf_counter() < deadline:
+        script = rng.choice(CONVERSATIONS)
+        values = fill_values(rng)
+        session_id = f"load-{uuid.uuid4().hex}"
+        for turn in script:
+            if time.perf_counter() >= deadline:
+                return
+            payload = {"userId": "loadtest", "sessionId": session_id,
+                       "userMessage": turn.format(**values), "language": "en"}
+            if not await send_turn(client, payload, args.stream, result):
+                break # Abandon the conversation, like a user would
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+        else:
+            result.conversations += 1
+
+
+async def run_level(base_url: str, concurrency: int, args) -> LevelResult:
+    result = LevelResult(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, deadline, random.Random(args.seed * 1000 + i), args, result)
+            for i in range(concurrency)
+        ))
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+def print_table(rows: List[dict], stream: bool):
+    header = f"{'conc':>5} {'reqs':>7} {'errs':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    if stream:
+        header += f" {'ttft p50':>9} {'ttft p95':>9}"
+    print(header)
+    for r in rows:
+        line = (f"{r['concurrency']:>5} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8} "
+                f"{r['p50_ms']!s:>9} {r['p95_ms']!s:>9} {r['p99_ms']!s:>9} {r['max_ms']!s:>9}")
+        if stream:
+            line += f" {r['ttft_p50_ms']!s:>9} {r['ttft_p95_ms']!s:>9}"
+        print(line)
+
+
+async def run(args) -> List[dict]:
+    rows = []
+    for level in args.levels:
+        result = await run_level(args.base_url, level, args)
+        rows.append(result.summary())
+        print(f"  concurrency {level}: {rows[-1]['requests']} requests, {rows[-1]['errors']} errors")
+    return rows
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrency levels")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean pause between turns, seconds")
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and measure time to first token")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+
+
+def report(rows: List[dict], args, extra: Optional[dict] = None):
+    print()
+    print_table(rows, args.stream)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"results": rows, **(extra or {})}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8002")
+    add_arguments(parser)
+    args = parser.parse_args()
+    rows = asyncio.run(run(args))
+    report(rows, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Fake Ollama server for offline load tests.
+
+Serves POST /api/chat (streaming NDJSON and non-streaming JSON, same shapes as
+Ollama) with a configurable latency model:
+
+    time to first token ~ --prompt-latency distribution
+    each further token  ~ --token-latency distribution
+    at most --parallel requests are generated at once (OLLAMA_NUM_PARALLEL);
+    the rest wait in a queue, as they do on a real Ollama box.
+
+With --prompt-eval-per-token, prompt evaluation is simulated with a KV cache
+as in Ollama's runner: each of the --parallel slots keeps the last prompt it
+evaluated, a request takes the free slot sharing the longest prefix with its
+prompt, and only the tokens after that prefix cost time. prompt_eval_count
+and prompt_eval_duration report the evaluated part, as Ollama does.
+options.num_predict caps the reply.
+
+A chat request with no messages only loads the model (as the warmup preload
+does) and GET /api/ps lists the models loaded so far, so the backend's
+/ready check works against the stand-in.
+
+Distributions: const:S, uniform:LO,HI, normal:MEAN,STD, lognormal:MEDIAN,SIGMA, exp:MEAN
+(all in seconds).
+
+Usage (from backend/):
+    python -m loadtest.fake_ollama --port 11500 --prompt-latency lognormal:0.4,0.5 --token-latency const:0.02
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLIES = [
+    "Thank you for reaching out to Everest View Property! May I have your name, please?",
+    "Nice to meet you. What is the best phone number to reach you on?",
+    "Great. Are you looking for an apartment, a villa or a townhouse?",
+    "Which area do you prefer, for example Downtown, Marina or the Hills?",
+    "What budget range do you have in mind for this purchase?",
+    "Are you interested in an off-plan project or a ready property you can move into?",
+    "Thank you! Our sales team will contact you shortly with matching options.",
+]
+
+
+class LatencyDistribution:
+    def __init__(self, spec: str):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        expected = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if kind not in expected or len(self.args) != expected[kind]:
+            raise ValueError(f"Bad latency spec '{spec}', e.g. const:0.5, uniform:0.2,1, normal:0.8,0.2, lognormal:0.5,0.4, exp:0.3")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        a = self.args
+        if self.kind == "const":
+            value = a[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(a[0], a[1])
+        elif self.kind == "normal":
+            value = rng.gauss(a[0], a[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(a[0]), a[1]) if a[0] > 0 else 0.0
+        else:
+            value = rng.expovariate(1 / a[0]) if a[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+def render_prompt(messages: List[dict]) -> str:
+    # Stand-in for the model's chat template
+    return "".join(f"<|{m.get('role')}|>\n{m.get('content', '')}<|end|>\n" for m in messages)
+
+
+def common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def create_app(prompt_latency: LatencyDistribution, token_latency: LatencyDistribution,
+               parallel: int, seed: int = 0, prompt_eval_per_token: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(parallel)
+    slot_prompts = [""] * parallel # Last prompt evaluated by each slot (its KV cache)
+    slot_busy = [False] * parallel
+    stats = {"requests": 0, "in_flight": 0, "queued": 0, "prompt_tokens": 0, "prompt_tokens_cached": 0}
+    loaded = {} # model -> keep_alive of the last request, as GET /api/ps reports them
+
+    def take_slot(prompt: str) -> Tuple[int, int]:
+        # Free slot with the longest cached prefix of this prompt: (slot, cached tokens)
+        free = [i for i in range(parallel) if not slot_busy[i]]
+        best = max(free, key=lambda i: common_prefix(slot_prompts[i], prompt))
+        slot_busy[best] = True
+        return best, common_prefix(slot_prompts[best], prompt) // 4
+
+    def pick_reply(messages: List[dict]) -> str:
+        user_turns = sum(1 for m in messages if m.get("role") == "user")
+        return REPLIES[(user_turns - 1) % len(REPLIES)]
+
+    def chunk(model: str, content: str, done: bool, **extra) -> dict:
+        return {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+            **extra,
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "fake"}]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name, "size": 0, "keep_alive": keep_alive}
+                           for name, keep_alive in loaded.items()]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        messages = body.get("messages", [])
+        loaded[model] = body.get("keep_alive", "5m")
+        if not messages:
+            # Load-only request: Ollama answers with one final object, whatever "stream" says
+            return JSONResponse(chunk(model, "", True, done_reason="load"))
+        tokens = pick_reply(messages).split(" ")
+        num_predict = (body.get("options") or {}).get("num_predict", -1)
+        truncated = 0 <= num_predict < len(tokens)
+        if truncated:
+            tokens = tokens[:num_predict]
+        prompt = render_prompt(messages)
+        prompt_tokens = len(prompt) // 4
+        evaluated = {"tokens": prompt_tokens, "seconds": 0.0}
+        stats["requests"] += 1
+        started = time.perf_counter()
+
+        async def generate():
+            stats["queued"] += 1
+            async with slots:
+                stats["queued"] -= 1
+                stats["in_flight"] += 1
+                slot = None
+                try:
+                    latency = prompt_latency.sample(rng)
+                    if prompt_eval_per_token > 0:
+                        slot, cached = take_slot(prompt)
+                        evaluated["tokens"] = prompt_tokens - cached
+                        evaluated["seconds"] = evaluated["tokens"] * prompt_eval_per_token
+                        stats["prompt_tokens_cached"] += cached
+                        latency += evaluated["seconds"]
+                    stats["prompt_tokens"] += prompt_tokens
+                    await asyncio.sleep(latency)
+                    for i, token in enumerate(tokens):
+                        if i:
+                            await asyncio.sleep(token_latency.sample(rng))
+                        yield token + (" " if i < len(tokens) - 1 else "")
+                finally:
+                    stats["in_flight"] -= 1
+                    if slot is not None:
+                        # The reply is generated into the same cache, after the prompt
+                        slot_prompts[slot] = prompt + render_prompt([{"role": "assistant", "content": " ".join(tokens)}])
+                        slot_busy[slot] = False
+
+        def final_fields() -> dict:
+            return {
+                "done_reason": "length" if truncated else "stop",
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "prompt_eval_count": evaluated["tokens"],
+                "prompt_eval_duration": int(evaluated["seconds"] * 1e9),
+                "eval_count": len(tokens),
+            }
+
+        if body.get("stream", True):
+            async def ndjson():
+                async for token in generate():
+                    yield json.dumps(chunk(model, token, False)) + "\n"
+                yield json.dumps(chunk(model, "", True, **final_fields())) + "\n"
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+        content = "".join([token async for token in generate()])
+        return JSONResponse(chunk(model, content, True, **final_fields()))
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--prompt-latency", default="lognormal:0.4,0.5", help="Time to first token")
+    parser.add_argument("--token-latency", default="const:0.02", help="Time between tokens")
+    parser.add_argument("--parallel", type=int, default=4, help="Requests generated at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prompt-eval-per-token", type=float, default=0.0,
+                        help="Seconds per prompt token not in the slot's KV cache (0 = no prompt eval simulation)")
+    args = parser.parse_args()
+
+    app = create_app(LatencyDistribution(args.prompt_latency), LatencyDistribution(args.token_latency),
+                     args.parallel, args.seed, args.prompt_eval_per_token)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+One-box load test: starts the fake Ollama server and the backend (uvicorn) in
+a scratch directory, replays conversations at each concurrency level, prints
+throughput and p50/p95/p99 latency, then stops both servers.
+
+Everything runs offline: the LLM is loadtest.fake_ollama, TTS uses the stub
+provider (TTS_PROVIDER=stub) and notifications/CRM use the local stand-ins
+(PROVIDER_MODE=local). Extra backend settings can be passed as --env KEY=VALUE.
+
+Usage (from backend/):
+    python -m loadtest.run --levels 1 4 16 64 --duration 20
+    python -m loadtest.run --workers 4 --parallel 8 --prompt-latency lognormal:0.6,0.4 --stream
+    python -m loadtest.run --env SESSION_STORE=sqlite --env RESPONSE_CACHE_BACKEND=off --json results.json
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from loadtest import driver
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up in {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--parallel", type=int, default=4, help="Fake Ollama requests generated at once")
+    parser.add_argument("--prompt-latency", default="lognormal:0.4,0.5")
+    parser.add_argument("--token-latency", default="const:0.02")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Stub TTS seconds per uncached reply")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra backend setting")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory (logs, databases)")
+    driver.add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    ollama_port, backend_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}/api/chat",
+        "TTS_PROVIDER": "stub",
+        "TTS_STUB_LATENCY_SECONDS": str(args.tts_latency),
+        "PROVIDER_MODE": "local",
+        "PYTHONUNBUFFERED": "1",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    logs = {name: open(os.path.join(workdir, f"{name}.log"), "w") for name in ("ollama", "backend")}
+    ollama = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.fake_ollama", "--port", str(ollama_port), "--parallel", str(args.parallel),
+         "--prompt-latency", args.prompt_latency, "--token-latency", args.token_latency],
+        cwd=BACKEND_DIR, env=env, stdout=logs["ollama"], stderr=subprocess.STDOUT
+    )
+    # The backend runs in the scratch directory, so its local files (sessions,
+    # caches, outbox) never touch the working tree
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--host", "127.0.0.1",
+         "--port", str(backend_port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=logs["backend"], stderr=subprocess.STDOUT
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{ollama_port}/api/tags", ollama)
+        wait_until_up(f"http://127.0.0.1:{backend_port}/", backend)
+        print(f"Fake Ollama :{ollama_port} (parallel={args.parallel}, prompt={args.prompt_latency}, "
+              f"token={args.token_latency}), backend :{backend_port} (workers={args.workers}), scratch {workdir}")
+        args.base_url = f"http://127.0.0.1:{backend_port}"
+        rows = asyncio.run(driver.run(args))
+        driver.report(rows, args, extra={
+            "workers": args.workers, "parallel": args.parallel, "prompt_latency": args.prompt_latency,
+            "token_latency": args.token_latency, "tts_latency": args.tts_latency, "env": args.env,
+        })
+    finally:
+        stop(backend)
+        stop(ollama)
+        for f in logs.values():
+            f.close()
+        if args.keep:
+            print(f"Logs and data kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
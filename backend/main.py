@@ -1,17 +1,33 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from models.schemas import ChatRequest, ChatResponse, Message, MessageRole, ProcessStatus
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from pydantic import ValidationError
+from models.schemas import ChatRequest, ChatResponse, LeadRankRequest, Message, MessageRole, ProcessStatus
+from services.session_cache import session_cache
+from services.session_query import SessionQuery
 from services.firestore_service import firestore_service
-from services.mongo_cache_service import mongo_cache_service
-from src.graph import graph # LangGraph Integation
+from services.lead_index import lead_index
+from services.scoring import lead_ranker, scoring_weights
+from services.response_cache import response_cache
+from services.reply_templates import reply_templates
+from src.graph import graph, astream_turn # LangGraph Integation
 from services.llm_service import llm_service
+from services.model_registry import model_registry
 from services.lead_extraction import lead_extractor
 from services.notifications import notification_service
+from services.tts_service import tts_service
+from services.executor import run_blocking, shutdown_executor
+from services.outbox import outbox
+from services.admission import Overloaded, admission, session_gate
+from services.warmup import warmup
+from services import metrics
+from src.db_manager import db_manager
 from config.settings import config
+from typing import Optional
 import uuid
-import io
-import base64
-from gtts import gTTS
+import json
+import asyncio
+import time
 
 app = FastAPI(title="Real Estate AI Chatbot")
 
@@ -24,43 +40,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    session_id = request.sessionId
-    user_id = request.userId
-    user_message = request.userMessage
-    language = request.language or "en"
+def _last_assistant_message(session) -> str:
+    if session.messages and session.messages[-1].role == MessageRole.ASSISTANT:
+        return session.messages[-1].content
+    return ""
 
-    # 1. Fetch Session
-    session = firestore_service.get_or_create_session(user_id, session_id)
-    if language != session.lead_profile.language_preference:
-        session.lead_profile.language_preference = language
+async def _lookup_cached_reply(session, user_message: str, last_assistant_msg: str, language: str):
+    if response_cache is None:
+        return None
+    with metrics.stage("cache_lookup"):
+        cached_reply = await run_blocking(response_cache.get, user_message, last_assistant_msg, language, session.lead_profile)
+    if cached_reply is not None:
+        print(f"Cache Hit for session {session.session_id}")
+    return cached_reply
 
-    # 2. Check Cache
-    last_assistant_msg = ""
-    if session.messages and session.messages[-1].role == MessageRole.ASSISTANT:
-        last_assistant_msg = session.messages[-1].content
-    
-    session_context_hash = f"{session_id}:{last_assistant_msg}:{language}"
-    
-    cached_reply_data = mongo_cache_service.get_cached_response(session_context_hash, user_message)
-    if cached_reply_data:
-        print(f"Cache Hit for session {session_id}")
-        return ChatResponse(
-            reply=cached_reply_data["reply"],
-            leadProfile=session.lead_profile,
-            qualificationStatus=session.qualification_status,
-            leadScore=session.lead_profile.lead_score,
-            audioBase64=cached_reply_data.get("audioBase64")
-        )
+async def _store_reply(user_message: str, last_assistant_msg: str, language: str, profile, reply: str):
+    if response_cache is None:
+        return
+    await run_blocking(response_cache.set, user_message, last_assistant_msg, language, profile, reply)
 
-    # 3. LangGraph Execution
-    # Prepare State
+def _build_initial_state(session, user_message: str, language: str, cached_reply=None) -> dict:
     msgs = [{"role": m.role, "content": m.content} for m in session.messages]
     msgs.append({"role": "user", "content": user_message})
 
-    initial_state = {
-        "session_id": session_id,
+    return {
+        "session_id": session.session_id,
         "messages": msgs,
         "lead_profile": session.lead_profile,
         "qualification_status": session.qualification_status,
@@ -68,41 +72,81 @@ async def chat_endpoint(request: ChatRequest):
         "model_used": "Local-Llama",
         "latest_reply": "",
         "audio_base64": None,
-        "language": language
+        "language": language,
+        "cached_reply": cached_reply,
+        "conversation_summary": session.conversation_summary,
+        "summarized_count": session.summarized_count,
+        "message_offset": session.message_offset
     }
 
-    print(">>> INVOKING LANGGRAPH <<<")
-    final_state = graph.invoke(initial_state)
+async def _save_turn(session, user_message: str, final_state: dict):
+    session.lead_profile = final_state["lead_profile"]
+    session.qualification_status = final_state["qualification_status"]
+    session.conversation_summary = final_state.get("conversation_summary")
+    session.summarized_count = final_state.get("summarized_count", session.summarized_count)
+    session.messages.append(Message(role=MessageRole.USER, content=user_message))
+    session.messages.append(Message(role=MessageRole.ASSISTANT, content=final_state["latest_reply"]))
+
+    with metrics.stage("save_session"):
+        await session_cache.asave_session(session)
+
+async def _fetch_session(user_id: str, session_id: str, language: str):
+    with metrics.stage("session_fetch"):
+        session = await session_cache.aget_or_create_session(user_id, session_id)
+    if language != session.lead_profile.language_preference:
+        session.lead_profile.language_preference = language
+    return session
+
+async def _synthesize(reply: str, language: str):
+    with metrics.stage("tts"):
+        return await tts_service.asynthesize(reply, language)
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest):
+    # One turn at a time per session (optionally merging rapid-fire messages),
+    # and a bounded number of turns in flight overall
+    async def admitted_turn(message: str) -> ChatResponse:
+        async with admission.slot():
+            return await _chat_turn(request.model_copy(update={"userMessage": message}))
+
+    with metrics.TURN_SECONDS.labels("chat").time():
+        try:
+            return await session_gate.submit(request.sessionId, request.userMessage, admitted_turn)
+        except Overloaded as e:
+            raise _overloaded(e)
+
+async def _chat_turn(request: ChatRequest) -> ChatResponse:
+    session_id = request.sessionId
+    user_id = request.userId
+    user_message = request.userMessage
+    language = request.language or "en"
+
+    # 1. Fetch Session
+    session = await _fetch_session(user_id, session_id, language)
+
+    # 2. Check Cache
+    last_assistant_msg = _last_assistant_message(session)
+    cached_reply = await _lookup_cached_reply(session, user_message, last_assistant_msg, language)
+    # The cache is keyed on the profile before this turn
+    profile_before = session.lead_profile.model_copy()
+
+    # 3. LangGraph Execution: extract -> respond (cache, template or LLM) -> TTS,
+    # with the notifier running alongside respond
+    initial_state = _build_initial_state(session, user_message, language, cached_reply)
+    final_state = await graph.ainvoke(initial_state)
     
     llm_reply = final_state["latest_reply"]
     updated_profile = final_state["lead_profile"]
     new_status = final_state["qualification_status"]
+    audio_base64 = final_state["audio_base64"]
 
-    # 4. Audio Generation (Text-to-Speech)
-    audio_base64 = None
-    try:
-        tts = gTTS(text=llm_reply, lang=language, slow=False)
-        audio_fp = io.BytesIO()
-        tts.write_to_fp(audio_fp)
-        audio_fp.seek(0)
-        audio_base64 = base64.b64encode(audio_fp.read()).decode('utf-8')
-    except Exception as e:
-        print(f"TTS Generation failed: {e}")
-
-    # 5. Save everything
-    session.lead_profile = updated_profile
-    session.qualification_status = new_status
-    session.messages.append(Message(role=MessageRole.USER, content=user_message))
-    session.messages.append(Message(role=MessageRole.ASSISTANT, content=llm_reply))
-    
-    firestore_service.save_session(session)
-
-    # 6. Cache Response
-    response_payload = {
-        "reply": llm_reply,
-        "audioBase64": audio_base64
-    }
-    mongo_cache_service.cache_response(session_context_hash, user_message, response_payload)
+    # 4. Save everything (only LLM replies are worth caching)
+    if final_state["model_used"] not in ("Cache", "Template"):
+        await _store_reply(user_message, last_assistant_msg, language, profile_before, llm_reply)
+    await _save_turn(session, user_message, final_state)
 
     return ChatResponse(
         reply=llm_reply,
@@ -112,9 +156,275 @@ async def chat_endpoint(request: ChatRequest):
         audioBase64=audio_base64
     )
 
+async def _stream_turn(request: ChatRequest):
+    """
+    Runs one chat turn and yields (event, data) pairs as they become available:
+    'token' for every reply chunk, 'lead' with the updated profile once the reply
+    is complete, 'audio' when TTS is done and 'done' at the end.
+    Shared by the SSE and WebSocket transports. Raises Overloaded before the
+    first event when the session or the server is too busy.
+    """
+    async with session_gate.hold(request.sessionId), admission.slot():
+        language = request.language or "en"
+
+        started = time.perf_counter()
+        session = await _fetch_session(request.userId, request.sessionId, language)
+
+        last_assistant_msg = _last_assistant_message(session)
+        cached_reply = await _lookup_cached_reply(session, request.userMessage, last_assistant_msg, language)
+        profile_before = session.lead_profile.model_copy()
+        initial_state = _build_initial_state(session, request.userMessage, language, cached_reply)
+
+        final_state = None
+        async for kind, payload in astream_turn(initial_state):
+            if kind == "token":
+                yield "token", {"delta": payload}
+            else:
+                final_state = payload
+
+        llm_reply = final_state["latest_reply"]
+        updated_profile = final_state["lead_profile"]
+        if final_state["model_used"] not in ("Cache", "Template"):
+            await _store_reply(request.userMessage, last_assistant_msg, language, profile_before, llm_reply)
+
+        # Persist while TTS runs, the client already has the full text
+        save_task = asyncio.create_task(_save_turn(session, request.userMessage, final_state))
+        tts_task = asyncio.create_task(_synthesize(llm_reply, language))
+
+        yield "lead", {
+            "reply": llm_reply,
+            "leadProfile": updated_profile.model_dump(),
+            "qualificationStatus": final_state["qualification_status"],
+            "leadScore": updated_profile.lead_score
+        }
+        yield "audio", {"audioBase64": await tts_task}
+        await save_task
+        metrics.TURN_SECONDS.labels("stream").observe(time.perf_counter() - started)
+        yield "done", {}
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Server-Sent Events variant of /chat: reply tokens are forwarded as Ollama produces them.
+    """
+    try:
+        admission.check() # Refuse with a status code while we still can
+    except Overloaded as e:
+        raise _overloaded(e)
+
+    async def event_source():
+        try:
+            async for event, data in _stream_turn(request):
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Overloaded as e:
+            data = {"status": e.status_code, "detail": e.reason, "retryAfter": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket variant of /chat. Each client message is a ChatRequest JSON object;
+    the server answers with {"type": <event>, ...data} frames, ending the turn with "done".
+    """
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                payload = await websocket.receive_json()
+            except ValueError as e: # Not JSON; the connection stays usable
+                await websocket.send_json({"type": "error", "detail": f"Invalid JSON frame: {e}"})
+                continue
+            try:
+                request = ChatRequest.model_validate(payload)
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": e.errors()})
+                continue
+            try:
+                async for event, data in _stream_turn(request):
+                    await websocket.send_text(json.dumps({"type": event, **data}, default=str))
+            except Overloaded as e:
+                await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.reason, "retryAfter": e.retry_after})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/admin/leads")
+async def query_leads(
+    status: Optional[ProcessStatus] = None,
+    location: Optional[str] = None,
+    property_type: Optional[str] = None,
+    urgency: Optional[str] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    currency: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    order: str = "urgency",
+    limit: int = 50,
+    offset: int = 0
+):
+    """
+    Lead index query, e.g. ?status=QUALIFIED&property_type=villa&location=marina&min_budget=1000000&order=urgency
+    """
+    if lead_index is None:
+        raise HTTPException(status_code=404, detail="Lead index is disabled")
+    try:
+        return await run_blocking(
+            lead_index.query,
+            status=status.value if status else None, location=location, property_type=property_type,
+            urgency=urgency, min_budget=min_budget, max_budget=max_budget, currency=currency,
+            min_score=min_score, max_score=max_score, order=order, limit=limit, offset=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/admin/leads/rank")
+async def rank_leads(request: LeadRankRequest):
+    """
+    Re-ranks every indexed lead under the configured weights, or under
+    `weights` overrides to try a change first, e.g. {"weights": {"high_urgency": 50}, "k": 20}.
+    Returns the top k with ranked_score/ranked_status; nothing is written back.
+    """
+    if lead_index is None:
+        raise HTTPException(status_code=404, detail="Lead index is disabled")
+    try:
+        weights = scoring_weights().merged(request.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_blocking(
+        lead_ranker.rank, weights, request.k,
+        status=request.status.value if request.status else None, refresh=request.refresh
+    )
+
+def _session_query(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: str = "profile",
+    status: Optional[ProcessStatus] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    location: Optional[str] = None,
+    updated_after: Optional[str] = None,
+    updated_before: Optional[str] = None
+) -> SessionQuery:
+    try:
+        return SessionQuery(
+            limit=limit, cursor=cursor, fields=fields, status=status.value if status else None,
+            min_score=min_score, max_score=max_score, location=location,
+            updated_after=updated_after, updated_before=updated_before
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/admin/sessions")
-async def get_all_sessions():
-    return firestore_service.get_all_sessions()
+async def get_all_sessions(query: SessionQuery = Depends(_session_query)):
+    """
+    One page of sessions, newest first: {"items": [...], "next_cursor": ...}.
+    Pass next_cursor back as `cursor` for the next page; fields=full includes
+    the recent messages (older ones via /admin/sessions/{session_id}/messages).
+    """
+    return await session_cache.alist_sessions(query)
+
+@app.get("/admin/sessions/{session_id}/messages")
+async def get_session_messages(session_id: str, before: Optional[int] = None, limit: int = 50):
+    """
+    A session's transcript, one page at a time from the newest:
+    {"items": [...], "message_count": n, "next_before": ...}. Pass next_before
+    back as `before` for the previous page.
+    """
+    page = await session_cache.aget_messages(session_id, before, max(1, min(limit, 500)))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return page
+
+@app.get("/admin/sessions/stream")
+async def stream_sessions(query: SessionQuery = Depends(_session_query)):
+    """
+    Every matching session as NDJSON, read from the store `limit` at a time.
+    """
+    def lines():
+        for doc in session_cache.iter_sessions(query):
+            yield json.dumps(doc, default=str) + "\n"
+
+    # Starlette iterates sync generators on its thread pool, so store reads don't block the loop
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once startup warmup has finished and the session
+    store and Ollama answer, 503 with the failing checks otherwise.
+    """
+    ready, checks = await warmup.check()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks})
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, model routes,
+    cache hits and qualification transitions.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/admin/llm/metrics")
+async def get_llm_metrics():
+    return {**llm_service.client.stats(), "tiers": model_registry.stats()}
+
+@app.get("/admin/session-cache/metrics")
+async def get_session_cache_metrics():
+    return session_cache.stats()
+
+@app.get("/admin/response-cache/metrics")
+async def get_response_cache_metrics():
+    return response_cache.stats() if response_cache else {"enabled": False}
+
+@app.get("/admin/reply-templates/metrics")
+async def get_reply_template_metrics():
+    return reply_templates.stats() if reply_templates else {"enabled": False}
+
+@app.get("/admin/tts-cache/metrics")
+async def get_tts_cache_metrics():
+    return tts_service.cache.stats() if tts_service.cache else {"enabled": False}
+
+@app.get("/admin/admission/metrics")
+async def get_admission_metrics():
+    return {"admission": admission.stats(), "sessions": session_gate.stats()}
+
+@app.get("/admin/outbox/metrics")
+async def get_outbox_metrics():
+    stats = await run_blocking(outbox.stats)
+    stats["crm"] = db_manager.stats()
+    return stats
+
+@app.on_event("startup")
+async def startup():
+    session_cache.start()
+    outbox.start()
+    # Build services, load the Ollama models and prime caches before /ready reports ready
+    if config.WARMUP_ON_STARTUP:
+        app.state.warmup = asyncio.create_task(warmup.run())
+    else:
+        warmup.skip()
+    # First start with the lead index: build it from the store in the background
+    if lead_index is not None:
+        app.state.lead_index_backfill = asyncio.create_task(run_blocking(firestore_service.rebuild_lead_index, True))
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Flush write-behind sessions before the executor goes away
+    await run_blocking(session_cache.stop)
+    await run_blocking(outbox.stop)
+    if db_manager.resolved:
+        await run_blocking(db_manager.flush)
+    await llm_service.aclose()
+    await model_registry.aclose()
+    shutdown_executor()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -35,11 +35,23 @@ class LeadProfile(BaseModel):
 class Session(BaseModel):
     session_id: str
     user_id: str
+    # Recent window only: messages[0] is message number `message_offset` of the transcript
     messages: List[Message] = []
+    message_offset: int = 0
     qualification_status: ProcessStatus = ProcessStatus.INITIAL
     lead_profile: LeadProfile = Field(default_factory=LeadProfile)
+    # Rolling summary of messages[:summarized_count], see HistoryManager
+    conversation_summary: Optional[str] = None
+    summarized_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # (store's message_count, our message_count) when last read or written,
+    # see serialization.split_session_doc; not part of the document
+    _sync: Optional[Tuple[int, int]] = PrivateAttr(default=None)
+
+    @property
+    def message_count(self) -> int:
+        return self.message_offset + len(self.messages)
 
 class ChatRequest(BaseModel):
     userId: str
@@ -53,3 +65,10 @@ class ChatResponse(BaseModel):
     qualificationStatus: ProcessStatus
     leadScore: int
     audioBase64: Optional[str] = None
+
+class LeadRankRequest(BaseModel):
+    # Overrides of the configured lead score weights, same shape as the weights file
+    weights: Optional[Dict[str, Any]] = None
+    k: int = 50
+    status: Optional[ProcessStatus] = None
+    refresh: bool = False # Re-read the lead index now instead of after LEAD_RANK_REFRESH_SECONDS
@@ -0,0 +1,203 @@
+"""
+Check for the CRM sync (src.db_manager) against the local Supabase stand-in.
+
+Runs offline (PROVIDER_MODE=local, files in a temp directory) and checks:
+- rows stay buffered below CRM_BATCH_SIZE and go out as one bulk upsert per
+  table when the batch fills or on flush();
+- each message is sent once, conversation_messages holds every transcript in
+  order and conversations.message_count matches it;
+- a restarted manager resends a session's history without duplicating rows;
+- a failed flush keeps the rows buffered and the next flush writes them;
+- the same writes through the outbox (side_effects jobs, drained inline);
+- every written row fits config/supabase_schema.sql: known columns, and the
+  on_conflict keys are the table's primary key.
+Meant for CI and for checking a migration, exits 1 on failure.
+
+Usage (from backend/):
+    python scripts/check_crm_sync.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(BACKEND_DIR, "config", "supabase_schema.sql")
+WORKDIR = tempfile.mkdtemp(prefix="crm-check-")
+
+# Before config is imported: offline providers, no files left in backend/
+os.environ.update({
+    "PROVIDER_MODE": "local",
+    "LOCAL_PROVIDER_LOG": os.path.join(WORKDIR, "local_providers.jsonl"),
+    "LOCAL_PROVIDER_FAILURE_RATE": "0",
+    "LOCAL_PROVIDER_LATENCY_SECONDS": "0",
+    "OUTBOX_DB_PATH": os.path.join(WORKDIR, "outbox.sqlite3"),
+})
+sys.path.insert(0, BACKEND_DIR)
+
+from config.settings import config
+from models.schemas import LeadProfile, ProcessStatus
+from src.db_manager import DatabaseManager
+from src.local_providers import provider_log
+
+BATCH_SIZE = 10
+failures = []
+
+
+def check(ok: bool, label: str):
+    print(f"  {'ok ' if ok else 'BAD'} {label}")
+    if not ok:
+        failures.append(label)
+
+
+def load_schema(path: str = SCHEMA_PATH):
+    # {table: (columns, primary key)} from the create table statements
+    with open(path, encoding="utf-8") as f:
+        sql = f.read()
+    tables = {}
+    for name, body in re.findall(r"create table if not exists (\w+) \((.*?)\n\);", sql, re.S):
+        columns, key = set(), ()
+        for line in body.strip().splitlines():
+            line = line.strip().rstrip(",")
+            composite = re.match(r"primary key \((.*)\)", line)
+            if composite:
+                key = tuple(c.strip() for c in composite.group(1).split(","))
+                continue
+            column = line.split()[0]
+            columns.add(column)
+            if "primary key" in line:
+                key = (column,)
+        tables[name] = (columns, key)
+    return tables
+
+
+def transcript(turns: int):
+    messages = []
+    for t in range(turns):
+        messages += [{"role": "user", "content": f"message {t}"}, {"role": "assistant", "content": f"reply {t}"}]
+    return messages
+
+
+def upserts():
+    return [e for e in provider_log.entries() if e["provider"] == "supabase"]
+
+
+def check_transcripts(client, transcripts: dict):
+    rows = client.tables.get("conversation_messages", {})
+    for session_id, messages in transcripts.items():
+        stored = [rows.get((session_id, seq)) for seq in range(len(messages))]
+        same = all(r is not None and (r["role"], r["content"]) == (m["role"], m["content"]) for r, m in zip(stored, messages))
+        count = client.tables["conversations"][(session_id,)]["message_count"]
+        check(same and count == len(messages), f"{session_id}: {len(messages)} messages in order, message_count={count}")
+    expected = sum(len(m) for m in transcripts.values())
+    check(len(rows) == expected, f"conversation_messages has {len(rows)}/{expected} rows, no duplicates")
+
+
+def check_buffered_path():
+    print("buffered writes")
+    db = DatabaseManager(batch_size=BATCH_SIZE, flush_interval=3600)
+    transcripts = {"s1": [], "s2": []}
+    full = {s: transcript(6) for s in transcripts}
+
+    db.upsert_lead("s1", LeadProfile(name="Sarah", budget_range="1M"), 40)
+    transcripts["s1"] = full["s1"][:2]
+    db.log_conversation("s1", transcripts["s1"])
+    check(not upserts() and not db.flush_due(), "below the batch size nothing is sent")
+
+    # s1 grows turn by turn (whole transcript each time), s2 arrives at once and fills the batch
+    for turn in range(2, 4):
+        transcripts["s1"] = full["s1"][:turn * 2]
+        db.log_conversation("s1", transcripts["s1"])
+    transcripts["s2"] = full["s2"]
+    db.log_conversation("s2", transcripts["s2"])
+    tables = sorted(e["action"] for e in upserts())
+    check(tables == ["conversation_messages.upsert", "conversations.upsert", "leads.upsert"],
+          f"a full batch goes out as one upsert per table: {tables}")
+
+    db.upsert_lead("s1", LeadProfile(name="Sarah", budget_range="2M"), 55)
+    transcripts["s1"] = full["s1"]
+    db.log_conversation("s1", transcripts["s1"])
+    check(db.flush_due() is False and db.flush() == 8, "flush() writes what is left (lead, 6 messages, header)")
+    check_transcripts(db.client, transcripts)
+    sent = [(r["session_id"], r["seq"]) for e in upserts() if e["action"] == "conversation_messages.upsert" for r in e["data"]["rows"]]
+    check(len(sent) == len(set(sent)), f"every message sent once ({len(sent)} rows)")
+    check(db.client.tables["leads"][("s1",)]["budget"] == "2M", "the latest lead row wins")
+
+    print("restart")
+    restarted = DatabaseManager(batch_size=BATCH_SIZE, flush_interval=3600)
+    restarted.client = db.client
+    transcripts["s1"] = full["s1"] + transcript(7)[12:]
+    restarted.log_conversation("s1", transcripts["s1"])
+    restarted.flush()
+    check_transcripts(db.client, transcripts)
+
+    print("failed flush")
+    transcripts["s2"] = full["s2"] + transcript(7)[12:]
+    restarted.log_conversation("s2", transcripts["s2"][10:], offset=10)
+    config.LOCAL_PROVIDER_FAILURE_RATE = 1.0
+    try:
+        restarted.flush()
+        raised = False
+    except Exception:
+        raised = True
+    finally:
+        config.LOCAL_PROVIDER_FAILURE_RATE = 0.0
+    check(raised and restarted.stats()["buffered_messages"] == 4, "the error is raised and the rows stay buffered")
+    check(restarted.flush() == 5, "the next flush writes them")
+    check_transcripts(db.client, transcripts)
+    return db.client
+
+
+def check_outbox_path():
+    print("through the outbox")
+    from services.outbox import outbox
+    import src.side_effects as side_effects
+    from src.db_manager import db_manager
+
+    transcripts = {f"o{s}": [] for s in range(3)}
+    for turn in range(8):
+        session_id = f"o{turn % 3}"
+        transcripts[session_id] = transcripts[session_id] + transcript(turn + 1)[turn * 2:]
+        side_effects.enqueue_lead_side_effects({
+            "session_id": session_id, "lead_profile": LeadProfile(name="Omar", budget_range=f"{turn}M"),
+            "qualification_status": ProcessStatus.DISCOVERY, "messages": list(transcripts[session_id])
+        })
+    drained = outbox.drain()
+    stats = outbox.stats()
+    check(drained and not stats.get("pending") and not stats.get("running"), "every CRM job is done after drain")
+    check_transcripts(db_manager.client, transcripts)
+    return db_manager.client
+
+
+def check_schema(clients):
+    print(f"schema ({os.path.relpath(SCHEMA_PATH, BACKEND_DIR)})")
+    schema = load_schema()
+    for entry in upserts():
+        table = entry["action"].split(".")[0]
+        columns, key = schema.get(table, (set(), ()))
+        unknown = {c for row in entry["data"]["rows"] for c in row} - columns
+        conflict = tuple(c.strip() for c in entry["data"]["on_conflict"].split(","))
+        if unknown or conflict != key:
+            check(False, f"{table}: unknown columns {sorted(unknown)}, on_conflict {conflict} vs primary key {key}")
+            return
+    written = sorted({t for client in clients for t in client.tables})
+    check(set(written) <= set(schema), f"all writes match the schema ({', '.join(written)})")
+
+
+def main():
+    try:
+        clients = [check_buffered_path(), check_outbox_path()]
+        check_schema(clients)
+    finally:
+        for name in os.listdir(WORKDIR):
+            os.remove(os.path.join(WORKDIR, name))
+        os.rmdir(WORKDIR)
+    if failures:
+        print(f"FAIL: {len(failures)} check(s)")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Import-time budget check for the API.
+
+Imports `main` in a fresh interpreter (as a new replica would), fails if that
+takes longer than the budget or if a module that should only be loaded on
+first use (LangGraph, provider SDKs, gTTS) was imported, and lists the
+slowest imports. Import attempts are recorded too, so a deferred module
+imported at startup fails the check even where it is not installed. Meant
+for CI, exits 1 on failure.
+
+Usage (from backend/):
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 800 --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Built lazily (services.lazy.Lazy / imports inside the factory), never at import
+DEFERRED_MODULES = ["langgraph", "langchain_core", "supabase", "twilio", "resend", "gtts", "firebase_admin", "numpy"]
+
+PROBE = """
+import json, sys, time
+deferred = %r
+attempted = set()
+
+class Recorder:
+    # First on sys.meta_path: notes the import, then lets the real finders run
+    @staticmethod
+    def find_spec(name, path=None, target=None):
+        if name.split(".")[0] in deferred:
+            attempted.add(name.split(".")[0])
+        return None
+
+sys.meta_path.insert(0, Recorder)
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+loaded = sorted(attempted | {m for m in deferred if m in sys.modules})
+print(json.dumps({"seconds": elapsed, "loaded": loaded}))
+"""
+
+
+def run_probe(runs: int):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE % DEFERRED_MODULES],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def slowest_imports(top: int):
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        rows.append((int(self_us), int(cumulative_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=900, help="Fail when `import main` takes longer")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters; the fastest run is compared")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list (self time)")
+    args = parser.parse_args()
+
+    results = run_probe(args.runs)
+    best_ms = min(r["seconds"] for r in results) * 1000
+    loaded = sorted({m for r in results for m in r["loaded"]})
+
+    print(f"import main: {best_ms:.0f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'self ms':>8} {'total ms':>9}  module")
+    for self_us, cumulative_us, name in slowest_imports(args.top):
+        print(f"{self_us / 1000:>8.1f} {cumulative_us / 1000:>9.1f}  {name}")
+
+    failed = False
+    if best_ms > args.budget_ms:
+        print(f"FAIL: over budget by {best_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported at startup, should be deferred: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Routing check for the reply templates (services.reply_templates).
+
+Replays short conversations through lead_extractor and the template engine,
+as the graph does turn by turn, and compares each turn's outcome (template
+route or LLM fallback reason) with the expected one. Also fails when a
+template addresses the lead by a word the name pattern mistook for a name.
+Meant for CI, exits 1 on failure.
+
+Usage (from backend/):
+    python scripts/check_reply_templates.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import LeadProfile
+from services.lead_extraction import lead_extractor
+from services.reply_templates import ROUTES, ReplyTemplateEngine, addressable_name
+from src.hybrid_router import is_trivial
+
+# (label, [(user message, expected route or "llm:<reason>"), ...])
+CASES = [
+    ("full qualification", [
+        ("Hi", "greeting"),
+        ("My name is Sarah", "ask_phone"),
+        ("+971 50 123 4567", "ask_property"),
+        ("I want a villa", "ask_budget"),
+        ("Budget is around 2 million dollars", "complete"),
+        ("Thanks", "llm:profile_complete"),
+    ]),
+    ("questions and open-ended turns go to the LLM", [
+        ("Hello", "greeting"),
+        ("What areas do you cover?", "llm:question"),
+        ("I like the sea", "llm:open_ended"),
+    ]),
+    ("name pattern false positive is asked for again", [
+        ("hello there, I am looking for an apartment", "greeting"),
+        ("I am interested in a villa", "ask_name"),
+        ("My name is Omar", "ask_phone"),
+    ]),
+    ("false positive after the first turn", [
+        ("Hi", "greeting"),
+        ("hello there, I am looking for an apartment", "ask_name"),
+        ("call me Lina", "ask_phone"),
+    ]),
+]
+
+
+def outcome(engine: ReplyTemplateEngine, reply, misses_before: dict, route_hits_before: dict) -> str:
+    if reply is None:
+        reason = next(r for r, n in engine.misses.items() if n != misses_before.get(r, 0))
+        return f"llm:{reason}"
+    return next(r for r, n in engine.hits.items() if n != route_hits_before[r])
+
+
+def run_case(messages):
+    engine = ReplyTemplateEngine(routes=ROUTES)
+    profile = LeadProfile()
+    results = []
+    for turn, (message, expected) in enumerate(messages):
+        before = profile.model_copy()
+        profile = lead_extractor.extract_data(message, profile.model_copy())
+        misses, hits = dict(engine.misses), dict(engine.hits)
+        reply = engine.reply(message, before, profile, "en", small_talk=is_trivial(message), first_turn=turn == 0)
+        got = outcome(engine, reply, misses, hits)
+        leaked = reply is not None and profile.name and not addressable_name(profile.name) and profile.name in reply
+        results.append((message, expected, got, reply, leaked))
+    return results
+
+
+def main():
+    failed = 0
+    for label, messages in CASES:
+        print(label)
+        for message, expected, got, reply, leaked in run_case(messages):
+            ok = got == expected and not leaked
+            failed += not ok
+            note = "" if ok else f"  <- expected {expected}" + (", reply uses a non-name" if leaked else "")
+            print(f"  {'ok ' if ok else 'BAD'} {message!r:<48} {got}{note}")
+    if failed:
+        print(f"FAIL: {failed} turn(s) routed differently")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+Rebuilds the lead index (/admin/leads) from the session store.
+
+The API builds the index on its first start and keeps it updated on every
+save; run this after restoring a backup, changing budget parsing, or to
+repair an index that missed writes.
+
+Usage (from backend/):
+    python scripts/rebuild_lead_index.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firestore_service import firestore_service
+from services.lead_index import lead_index
+
+
+def main():
+    if lead_index is None:
+        print("Lead index is disabled (LEAD_INDEX_ENABLED=false).")
+        return
+    start = time.perf_counter()
+    indexed = firestore_service.rebuild_lead_index()
+    print(f"Indexed {indexed} sessions into {lead_index.db_path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
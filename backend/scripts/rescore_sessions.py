@@ -0,0 +1,247 @@
+"""
+Re-extracts and re-scores stored sessions after a change to the extraction
+lexicons or the lead score weights.
+
+Every session is streamed from the configured session store (or straight
+from a local_db.json file with --json), its user messages are replayed
+through LeadExtractionService.extract_data from an empty profile, and the
+score and qualification status are recomputed on a process pool. Only the
+sessions whose profile or status changed are written back, in batches
+(updated_at is left alone, the lead index is refreshed).
+
+--mode score skips the replay and only recomputes score and status from the
+stored profiles (enough after a weights-only change, and no message reads).
+--dry-run writes nothing and prints a diff of what would change.
+--checkpoint records progress after every written batch; running the same
+command again resumes after the last checkpointed session.
+
+A running API keeps its cached copy of a session and writes it back on that
+session's next turn, so run this while the API is stopped (or idle).
+
+Usage (from backend/):
+    python scripts/rescore_sessions.py --dry-run
+    python scripts/rescore_sessions.py --workers 8 --checkpoint rescore.ckpt.json
+    python scripts/rescore_sessions.py --mode score
+    python scripts/rescore_sessions.py --json local_db.json --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import LeadProfile, ProcessStatus
+from services.firestore_service import firestore_service
+from services.json_stream import iter_object_items
+from services.lead_extraction import lead_extractor
+from services.serialization import model_to_doc
+from services.session_query import SessionQuery, encode_cursor, sort_key
+
+MESSAGE_PAGE_SIZE = 500
+
+
+# --- sources: one record per session, with the key to resume after it ---
+
+def _record(doc, user_messages, resume):
+    return {
+        "session_id": doc["session_id"],
+        "user_id": doc.get("user_id"),
+        "profile": doc.get("lead_profile") or {},
+        "status": doc.get("qualification_status"),
+        "user_messages": user_messages,
+        "resume": resume,
+    }
+
+
+def _user_messages(messages):
+    return [m["content"] for m in messages if m.get("role") == "user"]
+
+
+def from_json(path, replay, resume_after=None):
+    # Streamed: the file is never loaded whole. Resumes by position in the file.
+    for position, (session_id, doc) in enumerate(iter_object_items(path)):
+        if resume_after is not None and position <= resume_after:
+            continue
+        doc.setdefault("session_id", session_id)
+        yield _record(doc, _user_messages(doc.get("messages") or []) if replay else None, position)
+
+
+def stored_user_messages(session_id):
+    pages, before = [], None
+    while True:
+        page = firestore_service.get_messages(session_id, before, MESSAGE_PAGE_SIZE)
+        if page is None:
+            return []
+        pages.append(page["items"])
+        before = page["next_before"]
+        if before is None:
+            break
+    return [m["content"] for items in reversed(pages) for m in items if m.get("role") == "user"]
+
+
+def from_store(replay, resume_after=None):
+    # Newest first, a page at a time. Resumes after the sort key of the last session.
+    cursor = encode_cursor({"updated_at": resume_after[0], "session_id": resume_after[1]}) if resume_after else None
+    for doc in firestore_service.iter_sessions(SessionQuery(limit=MESSAGE_PAGE_SIZE, cursor=cursor)):
+        yield _record(doc, stored_user_messages(doc["session_id"]) if replay else None, list(sort_key(doc)))
+
+
+# --- worker ---
+
+def rescore(record):
+    """
+    Runs in the pool. Returns (record, new profile doc, new status, changes)
+    where changes maps each changed field to (old, new).
+    """
+    old = LeadProfile(**record["profile"])
+    if record["user_messages"] is None:
+        new = old.model_copy()
+    else:
+        new = LeadProfile(language_preference=old.language_preference)
+        for text in record["user_messages"]:
+            new = lead_extractor.extract_data(text, new)
+    new.lead_score = lead_extractor.calculate_lead_score(new)
+    status = lead_extractor.check_qualification_status(new).value
+
+    changes = {
+        field: (getattr(old, field), getattr(new, field))
+        for field in LeadProfile.model_fields
+        if getattr(old, field) != getattr(new, field)
+    }
+    if status != record["status"]:
+        changes["qualification_status"] = (record["status"], status)
+    record = {k: v for k, v in record.items() if k != "user_messages"} # Not needed past this point
+    return record, model_to_doc(new), status, changes
+
+
+# --- checkpoint ---
+
+def load_checkpoint(path, run):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("run") != run:
+        sys.exit(f"{path} was written by a different run ({checkpoint.get('run')}), delete it to start over")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# --- main ---
+
+def write_back(pending):
+    sessions = []
+    for record, profile, status, _ in pending:
+        session = firestore_service.get_or_create_session(record["user_id"], record["session_id"])
+        session.lead_profile = LeadProfile(**profile)
+        session.qualification_status = ProcessStatus(status)
+        sessions.append(session)
+    firestore_service.save_sessions(sessions)
+
+
+def format_diff(session_id, changes):
+    return f"~ {session_id}  " + ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in changes.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["extract", "score"], default="extract",
+                        help="extract: replay user messages; score: recompute from stored profiles")
+    parser.add_argument("--json", metavar="PATH", help="Stream sessions from this local_db.json instead of the store")
+    parser.add_argument("--dry-run", action="store_true", help="Write nothing, print what would change")
+    parser.add_argument("--diff-limit", type=int, default=100, help="Changed sessions printed in dry-run mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes (1 = run inline)")
+    parser.add_argument("--chunksize", type=int, default=64, help="Sessions per task sent to a worker")
+    parser.add_argument("--batch-size", type=int, default=200, help="Changed sessions per write-back batch")
+    parser.add_argument("--checkpoint", metavar="PATH", help="Progress file, rerun the same command to resume")
+    parser.add_argument("--progress-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.json and not args.dry_run:
+        # Write-back goes through the store; that only matches the file in FILE mode
+        if firestore_service.mode != "FILE" or os.path.abspath(args.json) != os.path.abspath(firestore_service.db_file):
+            sys.exit("--json can only be written back to the FILE store's own local_db.json, use --dry-run")
+
+    run = {"source": args.json or "store", "mode": args.mode, "dry_run": args.dry_run}
+    checkpoint = load_checkpoint(args.checkpoint, run)
+    if checkpoint and checkpoint.get("finished"):
+        print(f"{args.checkpoint}: this run already finished, delete it to start over")
+        return 0
+    counts = Counter(checkpoint["counts"]) if checkpoint else Counter()
+    resume_after = checkpoint["resume_after"] if checkpoint else None
+    if resume_after is not None:
+        print(f"Resuming after {resume_after} ({counts['processed']} sessions already processed)")
+
+    replay = args.mode == "extract"
+    records = from_json(args.json, replay, resume_after) if args.json else from_store(replay, resume_after)
+    pool = Pool(args.workers) if args.workers > 1 else None
+    results = pool.imap(rescore, records, chunksize=args.chunksize) if pool else map(rescore, records)
+
+    transitions = Counter()
+    fields_changed = Counter()
+    pending = []
+    started = last_report = time.perf_counter()
+    processed_here = 0
+
+    def flush():
+        if pending and not args.dry_run:
+            write_back(pending)
+            counts["written"] += len(pending)
+        pending.clear()
+        save_checkpoint(args.checkpoint, {"run": run, "resume_after": resume_after, "counts": counts, "finished": False})
+
+    try:
+        for record, profile, status, changes in results:
+            counts["processed"] += 1
+            processed_here += 1
+            if changes:
+                counts["changed"] += 1
+                fields_changed.update(changes.keys())
+                if "qualification_status" in changes:
+                    transitions["{} -> {}".format(*changes["qualification_status"])] += 1
+                if args.dry_run and counts["changed"] <= args.diff_limit:
+                    print(format_diff(record["session_id"], changes))
+                pending.append((record, profile, status, changes))
+            # Safe to resume after this session once everything up to it is written
+            resume_after = record["resume"]
+            if len(pending) >= args.batch_size:
+                flush()
+
+            now = time.perf_counter()
+            if now - last_report >= args.progress_seconds:
+                rate = processed_here / (now - started)
+                print(f"... {counts['processed']} processed, {counts['changed']} changed, "
+                      f"{counts['written']} written ({rate:.0f} sessions/s)")
+                last_report = now
+        flush()
+    finally:
+        if pool:
+            pool.terminate()
+
+    save_checkpoint(args.checkpoint, {"run": run, "resume_after": resume_after, "counts": counts, "finished": True})
+    elapsed = time.perf_counter() - started
+    print(f"{'Dry run: ' if args.dry_run else ''}{counts['processed']} sessions processed, {counts['changed']} changed, "
+          f"{counts['written']} written in {elapsed:.1f}s")
+    if args.dry_run and counts["changed"] > args.diff_limit:
+        print(f"(diff shows the first {args.diff_limit} changed sessions)")
+    for field, n in fields_changed.most_common():
+        print(f"  {field:<22} {n}")
+    for transition, n in transitions.most_common():
+        print(f"  {transition:<22} {n}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Runs outbox delivery workers outside the API process.
+
+Use it with OUTBOX_WORKERS=0 on the API so notifications and CRM writes are
+delivered by a separate process, or with --drain to flush due jobs once and
+sweep finished ones (e.g. from cron or after an outage).
+
+Usage (from backend/):
+    python scripts/run_outbox_worker.py --workers 4
+    python scripts/run_outbox_worker.py --drain
+    PROVIDER_MODE=local python scripts/run_outbox_worker.py --drain
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.outbox import outbox
+import src.side_effects  # noqa: F401 (registers the handlers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(1, outbox.workers))
+    parser.add_argument("--drain", action="store_true", help="Deliver due jobs once and exit")
+    args = parser.parse_args()
+
+    if args.drain:
+        outbox.drain(timeout=float("inf"))
+        outbox.sweep()
+        print(outbox.stats())
+        return
+
+    outbox.workers = args.workers
+    outbox.start()
+    print(f"Outbox: {args.workers} worker(s) running on {outbox.db_path}. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(30)
+            print(outbox.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        outbox.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Pre-warms the TTS audio cache with the fixed replies in every supported language.
+
+Run it once per deployment (or after changing TTS options) so the first users
+don't pay gTTS latency for the short fixed prompts the assistant repeats all day:
+the reply templates without placeholders (for the enabled routes) and the
+fallback reply, the same phrases the startup warmup covers.
+
+Usage (from backend/):
+    python scripts/warm_tts_cache.py
+    python scripts/warm_tts_cache.py --languages en ar --phrases-file extra_phrases.json
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_service import FALLBACK_REPLY
+from services.reply_templates import TEMPLATES, fixed_replies, reply_templates
+from services.tts_service import tts_service
+
+# Languages offered by the chat widget (the ones with reply templates)
+SUPPORTED_LANGUAGES = list(TEMPLATES)
+
+def load_phrases(languages, phrases_file=None):
+    # The replies the assistant says word for word, as the startup warmup does
+    phrases = {lang: [] for lang in languages}
+    routes = reply_templates.routes if reply_templates is not None else ()
+    for lang, text in sorted(fixed_replies(routes)):
+        if lang in phrases:
+            phrases[lang].append(text)
+    # The fallback reply is English-only but is spoken in whatever language the user picked
+    for lang in languages:
+        phrases[lang].append(FALLBACK_REPLY)
+    if phrases_file:
+        with open(phrases_file, 'r') as f:
+            extra = json.load(f) # {"en": ["...", ...], ...}
+        for lang, items in extra.items():
+            if lang in phrases:
+                phrases[lang].extend(items)
+    return phrases
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", nargs="+", default=SUPPORTED_LANGUAGES)
+    parser.add_argument("--phrases-file", help="JSON object mapping language code to a list of extra phrases")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel gTTS requests")
+    args = parser.parse_args()
+
+    if tts_service.cache is None:
+        print("TTS cache is disabled (TTS_CACHE_ENABLED=false), nothing to warm.")
+        return 1
+
+    jobs = [(lang, text) for lang, items in load_phrases(args.languages, args.phrases_file).items() for text in items]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(tts_service.synthesize_bytes, text, lang): (lang, text) for lang, text in jobs}
+        for future in as_completed(futures):
+            lang, text = futures[future]
+            try:
+                future.result()
+                print(f"[{lang}] ok   {text[:60]}")
+            except Exception as e:
+                failed += 1
+                print(f"[{lang}] FAIL {text[:60]} ({e})")
+
+    print(f"Warmed {len(jobs) - failed}/{len(jobs)} phrases into {tts_service.cache.cache_dir}: {tts_service.cache.stats()}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
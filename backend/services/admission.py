@@ -0,0 +1,231 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config.settings import config
+from services.metrics import ADMISSION_REJECTIONS
+
+
+class Overloaded(Exception):
+    """Raised when a turn is refused; carries the HTTP status and a Retry-After hint in seconds."""
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{reason} (retry after {retry_after}s)")
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Batch:
+    def __init__(self, message: str):
+        self.messages: List[str] = [message]
+        self.followers = 0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class _Slot:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0 # Turns holding or waiting for the lock
+        self.batch: Optional[_Batch] = None # Next turn, still open for coalescing
+
+
+class SessionGate:
+    """
+    Serializes turns per session inside this process: a turn only starts after
+    the previous turn for the same session has saved, so concurrent requests
+    can no longer overwrite each other's messages and profile updates.
+
+    With `coalesce_window` > 0, messages that arrive while a turn is waiting
+    (the window itself, or the previous turn still running) are folded into
+    that turn: one LLM call answers all of them and every caller gets the same
+    response. At most `max_pending` turns may queue per session.
+
+    Serialization is per worker; with several workers route a session to one
+    worker (sticky sessions on sessionId).
+    """
+    def __init__(
+        self,
+        max_pending: int = config.CHAT_SESSION_MAX_PENDING,
+        coalesce_window: float = config.CHAT_COALESCE_WINDOW_SECONDS
+    ):
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self._slots: Dict[str, _Slot] = {}
+        self.turns = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.waits = 0
+
+    def _enter(self, session_id: str) -> _Slot:
+        slot = self._slots.get(session_id)
+        if slot is None:
+            slot = self._slots[session_id] = _Slot()
+        if self.max_pending > 0 and slot.pending >= self.max_pending:
+            self.rejected += 1
+            ADMISSION_REJECTIONS.labels("session_queue_full").inc()
+            raise Overloaded(429, 1, "Too many pending messages for this session")
+        slot.pending += 1
+        if slot.lock.locked():
+            self.waits += 1
+        return slot
+
+    def _leave(self, session_id: str, slot: _Slot):
+        slot.pending -= 1
+        if slot.pending == 0:
+            self._slots.pop(session_id, None)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        """Holds the session's turn lock (streaming turns, which are never coalesced)."""
+        slot = self._enter(session_id)
+        try:
+            async with slot.lock:
+                self.turns += 1
+                yield
+        finally:
+            self._leave(session_id, slot)
+
+    async def submit(self, session_id: str, message: str, run: Callable[[str], Awaitable]):
+        """
+        Runs `run(message)` as this session's next turn and returns its result.
+        With coalescing, `message` may instead join a turn that has not started
+        yet; `run` then receives all joined messages, newline separated.
+        """
+        slot = self._slots.get(session_id)
+        if self.coalesce_window > 0 and slot is not None and slot.batch is not None:
+            batch = slot.batch
+            batch.messages.append(message)
+            batch.followers += 1
+            self.coalesced += 1
+            return await asyncio.shield(batch.future)
+
+        slot = self._enter(session_id)
+        batch = _Batch(message)
+        try:
+            if self.coalesce_window > 0:
+                slot.batch = batch
+                await asyncio.sleep(self.coalesce_window)
+            async with slot.lock:
+                if slot.batch is batch:
+                    slot.batch = None # Later messages start the next turn
+                self.turns += 1
+                result = await run("\n".join(batch.messages))
+            batch.future.set_result(result)
+            return result
+        except BaseException as e:
+            if slot.batch is batch:
+                slot.batch = None
+            # Followers share the outcome; nobody to tell otherwise
+            if batch.followers and not batch.future.done():
+                if isinstance(e, Exception):
+                    batch.future.set_exception(e)
+                else:
+                    batch.future.cancel()
+            raise
+        finally:
+            self._leave(session_id, slot)
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self._slots),
+            "queued_turns": sum(max(0, s.pending - 1) for s in self._slots.values()),
+            "turns": self.turns,
+            "waited": self.waits,
+            "coalesced_messages": self.coalesced,
+            "rejected": self.rejected,
+            "max_pending": self.max_pending,
+            "coalesce_window_seconds": self.coalesce_window,
+        }
+
+
+class AdmissionController:
+    """
+    Caps chat turns running at once in this worker. Up to `max_queue` more may
+    wait, each for at most `queue_timeout` seconds; beyond that a turn is
+    refused right away with 429, and a turn that waited too long gets 503.
+    Both carry a Retry-After estimated from recent turn durations, so latency
+    stays bounded instead of growing with the backlog. max_in_flight <= 0
+    disables the limit.
+    """
+    def __init__(
+        self,
+        max_in_flight: int = config.CHAT_MAX_IN_FLIGHT,
+        max_queue: int = config.CHAT_MAX_QUEUE,
+        queue_timeout: float = config.CHAT_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self._avg_turn_seconds = 1.0 # EWMA, seeds the first Retry-After
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self._avg_turn_seconds * backlog / max(1, self.max_in_flight)))
+
+    def check(self):
+        """Fails fast with 429 when the wait queue is full (used before a response starts streaming)."""
+        if self.max_in_flight <= 0:
+            return
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            self.rejected_full += 1
+            ADMISSION_REJECTIONS.labels("queue_full").inc()
+            raise Overloaded(429, self.retry_after(), "Server is busy")
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.max_in_flight <= 0:
+            yield
+            return
+        self.check()
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            ADMISSION_REJECTIONS.labels("queue_timeout").inc()
+            raise Overloaded(503, self.retry_after(), "Timed out waiting for capacity")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+            self._avg_turn_seconds = 0.8 * self._avg_turn_seconds + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_queue_timeout": self.rejected_timeout,
+            "avg_turn_seconds": round(self._avg_turn_seconds, 3),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+        }
+
+
+session_gate = SessionGate()
+admission = AdmissionController()
@@ -0,0 +1,76 @@
+import re
+from typing import Optional, Tuple
+
+# LeadProfile.budget_range holds the raw user message that mentioned a budget,
+# e.g. "I'm looking for a 2 bedroom flat, budget around 1.5M dollars".
+# parse_budget turns that into a number and a currency for range queries.
+
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3,
+    "m": 1e6, "mn": 1e6, "mil": 1e6, "million": 1e6, "millions": 1e6,
+    "b": 1e9, "bn": 1e9, "billion": 1e9,
+}
+
+_CURRENCIES = {
+    "$": "USD", "usd": "USD", "dollar": "USD", "dollars": "USD",
+    "€": "EUR", "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pound": "GBP", "pounds": "GBP",
+    "aed": "AED", "dirham": "AED", "dirhams": "AED", "dhs": "AED",
+}
+
+_CURRENCY_WORD = r"(?:usd|dollars?|eur|euros?|gbp|pounds?|aed|dirhams?|dhs)"
+_AMOUNT = re.compile(
+    r"(?P<pre>[$€£]|\b" + _CURRENCY_WORD + r")?\s*"
+    r"(?<![\d.,])(?P<num>\d{1,3}(?:,\d{3})+(?:\.\d+)?(?!\d)|\d{1,3}(?:\.\d{3}){2,}(?!\d)|\d{1,3}(?: \d{3})+(?!\d)|\d+(?:[.,]\d+)?)"
+    r"\s*(?P<mult>k|thousand|mn|mil|millions?|m|bn|billion|b)?\b"
+    r"(?:\s*(?P<post>[$€£]|" + _CURRENCY_WORD + r"\b))?"
+    r"(?!\s*(?:bed|br|room|bath|sq|m2|sqft|year|yr|%))",
+    re.IGNORECASE
+)
+_ANY_CURRENCY = re.compile(r"[$€£]|\b" + _CURRENCY_WORD + r"\b", re.IGNORECASE)
+
+# Bare numbers (no multiplier, no currency) below this are counts, not prices
+_MIN_BARE_AMOUNT = 10_000
+
+
+def _to_number(num: str) -> float:
+    if re.fullmatch(r"\d{1,3}(?:[, ]\d{3})+(?:\.\d+)?", num):
+        return float(num.replace(",", "").replace(" ", ""))
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3}){2,}", num):
+        return float(num.replace(".", ""))
+    return float(num.replace(",", "."))
+
+
+def parse_budget(text: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Returns (value, currency) for the largest amount mentioned in `text`, or
+    (None, None). "1.5M" -> 1500000.0, "500k" -> 500000.0, "2 million euros"
+    -> (2000000.0, "EUR"). Amounts next to bed/room/sq words are ignored; the
+    currency is None when the message names none.
+    """
+    if not text:
+        return None, None
+    best: Optional[Tuple[float, Optional[str]]] = None
+    for match in _AMOUNT.finditer(text):
+        value = _to_number(match.group("num"))
+        mult = (match.group("mult") or "").lower()
+        symbol = (match.group("pre") or match.group("post") or "").lower()
+        bare = not mult and not symbol
+        if mult:
+            value *= _MULTIPLIERS[mult]
+        # Bare numbers are only prices when they are large, and never phone-like
+        # (9+ digits) or space-grouped ("50 123 4567" is a phone number)
+        if bare and (value < _MIN_BARE_AMOUNT or " " in match.group("num")
+                     or len(re.sub(r"\D", "", match.group("num"))) >= 9):
+            continue
+        if value <= 0:
+            continue
+        if best is None or value > best[0]:
+            best = (value, _CURRENCIES.get(symbol))
+    if best is None:
+        return None, None
+    value, currency = best
+    if currency is None:
+        anywhere = _ANY_CURRENCY.search(text)
+        currency = _CURRENCIES.get(anywhere.group(0).lower()) if anywhere else None
+    return value, currency
@@ -0,0 +1,36 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from config.settings import config
+
+# Shared, bounded pool for the blocking leftovers of the request path
+# (SDK clients, file I/O, gTTS). Keeps them off the event loop without
+# letting a burst of requests spawn an unbounded number of threads.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.BLOCKING_POOL_SIZE,
+                thread_name_prefix="blocking"
+            )
+        return _executor
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking callable on the shared executor and awaits its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_executor(wait: bool = True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
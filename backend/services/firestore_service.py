@@ -1,30 +1,76 @@
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-except ImportError:
-    firebase_admin = None
-    firestore = None
 from models.schemas import Session, Message, LeadProfile
 from config.settings import config
+from services.executor import run_blocking
+from services.sqlite_store import SQLiteSessionStore
+from services.session_query import SessionQuery, PROFILE_FIELDS, make_page, sort_key
+from services.lead_index import lead_index
+from services.lazy import Lazy
+from services.serialization import (
+    session_from_doc, session_to_doc, split_session_doc, window_start, dumps, loads,
+    sync_base, mark_synced, is_stale, merge_stale_header
+)
 from datetime import datetime
-import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import copy
+import heapq
+import re
 import os
+import threading
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, ReturnDocument, UpdateOne
 except ImportError:
     MongoClient = None
+    ReturnDocument = None
+    UpdateOne = None
 
 
 import certifi
 
+# Firestore batches are capped at 500 writes
+FIRESTORE_BATCH_LIMIT = 500
+
+# Header fields read back to save a stale copy (serialization.merge_stale_header)
+STALE_MERGE_FIELDS = (
+    "message_count", "lead_profile", "qualification_status", "conversation_summary", "summarized_count"
+)
+
+def _message_id(seq: int) -> str:
+    # Zero-padded, so document ids sort like seq
+    return f"{seq:08d}"
+
+def _strip_seq(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in m.items() if k not in ("seq", "session_id")} for m in messages]
+
 class FirestoreService:
+    """
+    Session storage. The session document is a header (profile, status,
+    summary, message_count); messages are stored apart from it and only
+    appended: a `messages` subcollection in Firestore, a `session_messages`
+    collection in MongoDB, a child table in SQLite. A session is loaded with
+    its recent message window (see serialization.window_start) and older
+    messages are paged with get_messages(). Documents written before the
+    split keep their embedded messages until the first read moves them out.
+    The FILE mock keeps each transcript inline in local_db.json.
+    """
     def __init__(self):
         # Fallback priority: Firestore (Real) > MongoDB (Real) > File (Mock)
+        # SESSION_STORE=sqlite skips the chain and uses the SQLite (WAL) store.
         self.mode = "MOCK" 
+        # Blocking methods run on the executor pool, guard the shared file store
+        self._file_lock = threading.RLock()
+
+        # 0. Explicit SQLite store (safe with several uvicorn workers)
+        if config.SESSION_STORE == "sqlite":
+            self.sqlite_store = SQLiteSessionStore(config.SQLITE_DB_PATH, json_path="local_db.json")
+            self.mode = "SQLITE"
+            print(f"Using: SQLite WAL ({config.SQLITE_DB_PATH})")
+            return
         
         # 1. Try Firestore
         try:
             if config.FIREBASE_CREDENTIALS_PATH and os.path.exists(config.FIREBASE_CREDENTIALS_PATH):
+                import firebase_admin # Slow to import, only needed with Firestore configured
+                from firebase_admin import credentials, firestore
                 if not firebase_admin._apps:
                     cred = credentials.Certificate(config.FIREBASE_CREDENTIALS_PATH)
                     firebase_admin.initialize_app(cred, {'projectId': config.FIREBASE_PROJECT_ID})
@@ -42,6 +88,8 @@ class FirestoreService:
         #     self.mongo_client.server_info() # Trigger check
         #     self.mongo_db = self.mongo_client[config.MONGO_DB_NAME]
         #     self.mongo_coll = self.mongo_db.sessions
+        #     self.mongo_messages = self.mongo_db.session_messages
+        #     self.mongo_messages.create_index([("session_id", 1), ("seq", 1)], unique=True)
         #     self.mode = "MONGODB"
         #     print("Using: MongoDB (Sessions)")
         #     return
@@ -57,62 +105,307 @@ class FirestoreService:
     def _load_from_file(self):
         if os.path.exists("local_db.json"):
             try:
-                with open("local_db.json", 'r') as f:
-                    return json.load(f)
+                with open("local_db.json", 'rb') as f:
+                    return loads(f.read())
             except:
                 return {}
         return {}
 
     def _save_to_file(self):
-        with open("local_db.json", 'w') as f:
-            json.dump(self.mock_store, f, indent=2, default=str)
+        # Compact: the whole store is rewritten on every save
+        with open("local_db.json", 'wb') as f:
+            f.write(dumps(self.mock_store))
+
+    # --- message storage ---
+
+    def _fs_messages_ref(self, session_id: str):
+        return self.collection_ref.document(session_id).collection("messages")
+
+    def _fs_commit(self, writes: List[tuple]):
+        for i in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for ref, data in writes[i:i + FIRESTORE_BATCH_LIMIT]:
+                batch.set(ref, data)
+            batch.commit()
+
+    def _split_legacy(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Moves the messages embedded in a pre-split document to message
+        storage and rewrites it as a header. Returns the header.
+        """
+        messages = doc.pop("messages")
+        header, new_messages = split_session_doc({**doc, "messages": messages}, 0)
+        session_id = header["session_id"]
+        if self.mode == "FIRESTORE":
+            writes = [(self._fs_messages_ref(session_id).document(_message_id(m["seq"])), m) for m in new_messages]
+            writes.append((self.collection_ref.document(session_id), header))
+            self._fs_commit(writes)
+        else:
+            if new_messages:
+                self.mongo_messages.bulk_write([
+                    UpdateOne({"session_id": session_id, "seq": m["seq"]}, {"$setOnInsert": {**m, "session_id": session_id}}, upsert=True)
+                    for m in new_messages
+                ], ordered=False)
+            self.mongo_coll.update_one(
+                {"session_id": session_id},
+                {"$set": {"message_count": header["message_count"]}, "$unset": {"messages": ""}}
+            )
+        return header
+
+    def _get_header(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Firestore and MongoDB only
+        if self.mode == "FIRESTORE":
+            doc = self.collection_ref.document(session_id).get()
+            header = doc.to_dict() if doc.exists else None
+        else:
+            header = self.mongo_coll.find_one({"session_id": session_id}, {"_id": 0})
+        if header is not None and "messages" in header:
+            header = self._split_legacy(header)
+        return header
+
+    def _read_messages(self, session_id: str, start: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Stored messages start <= seq < end (to the last one when end is None),
+        oldest first, each with its `seq`.
+        """
+        if self.mode == "FIRESTORE":
+            ref = self._fs_messages_ref(session_id).where("seq", ">=", start)
+            if end is not None:
+                ref = ref.where("seq", "<", end)
+            return [snapshot.to_dict() for snapshot in ref.order_by("seq").stream()]
+        elif self.mode == "MONGODB":
+            seq = {"$gte": start}
+            if end is not None:
+                seq["$lt"] = end
+            cursor = self.mongo_messages.find({"session_id": session_id, "seq": seq}, {"_id": 0, "session_id": 0}).sort("seq", 1)
+            return list(cursor)
+        elif self.mode == "SQLITE":
+            return self.sqlite_store.read_messages(session_id, start, end)
+        else:
+            with self._file_lock:
+                doc = self.mock_store.get(session_id) or {}
+                messages = (doc.get("messages") or [])[start:end]
+                return [{**m, "seq": start + i} for i, m in enumerate(messages)]
+
+    def _with_window(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Header plus its recent message window, as session_from_doc() expects it.
+        """
+        start = window_start(header.get("message_count") or 0, header.get("summarized_count") or 0)
+        messages = _strip_seq(self._read_messages(header["session_id"], start))
+        return {**header, "messages": messages, "message_offset": start}
+
+    def _file_window(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        messages = doc.get("messages") or []
+        start = window_start(len(messages), doc.get("summarized_count") or 0)
+        return {**doc, "messages": messages[start:], "message_offset": start, "message_count": len(messages)}
+
+    def _file_append(self, data: Dict[str, Any]) -> int:
+        # Keeps the whole transcript inline: stored messages plus the new ones
+        stored = (self.mock_store.get(data["session_id"]) or {}).get("messages") or []
+        header, new_messages = split_session_doc(data, len(stored))
+        count = header.pop("message_count")
+        self.mock_store[data["session_id"]] = {**header, "messages": stored + _strip_seq(new_messages)}
+        return count
+
+    def _fs_save(self, docs: List[Dict[str, Any]], bases: List[Optional[Tuple[int, int]]]) -> List[Tuple[int, bool]]:
+        # One read for the stored headers, then headers and new messages in batches
+        refs = [self.collection_ref.document(data["session_id"]) for data in docs]
+        stored = {
+            snapshot.id: snapshot.to_dict() or {}
+            for snapshot in self.db.get_all(refs, field_paths=list(STALE_MERGE_FIELDS)) if snapshot.exists
+        }
+        writes, results = [], []
+        for ref, data, base in zip(refs, docs, bases):
+            current = stored.get(data["session_id"])
+            count = (current or {}).get("message_count") or 0
+            header, new_messages = split_session_doc(data, count, base)
+            stale = current is not None and is_stale(base, count)
+            if stale:
+                header = merge_stale_header(header, current)
+            writes.extend((ref.collection("messages").document(_message_id(m["seq"])), m) for m in new_messages)
+            writes.append((ref, header))
+            results.append((header["message_count"], stale))
+        self._fs_commit(writes)
+        return results
+
+    def _mongo_save(self, docs: List[Dict[str, Any]], bases: List[Optional[Tuple[int, int]]]) -> List[Tuple[int, bool]]:
+        message_ops, results = [], []
+        for data, base in zip(docs, bases):
+            header, _ = split_session_doc(data, 0)
+            count = header.pop("message_count")
+            if base is None:
+                # Positions are seqs, the count before this update says which are stored
+                update = {"$set": header, "$max": {"message_count": count}}
+            else:
+                # Reserve seqs for the messages added since base, wherever the count is now
+                update = {"$set": header, "$inc": {"message_count": max(0, count - base[1])}}
+            before = self.mongo_coll.find_one_and_update(
+                {"session_id": data["session_id"]},
+                update,
+                projection={"_id": 0, **{field: 1 for field in STALE_MERGE_FIELDS}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            stored_count = (before or {}).get("message_count") or 0
+            header, new_messages = split_session_doc(data, stored_count, base)
+            stale = before is not None and is_stale(base, stored_count)
+            if stale:
+                merged = merge_stale_header(header, before)
+                self.mongo_coll.update_one(
+                    {"session_id": data["session_id"]},
+                    {"$set": {field: merged[field] for field in STALE_MERGE_FIELDS if field != "message_count"}}
+                )
+            message_ops.extend(
+                UpdateOne({"session_id": data["session_id"], "seq": m["seq"]},
+                          {"$setOnInsert": {**m, "session_id": data["session_id"]}}, upsert=True)
+                for m in new_messages
+            )
+            results.append((header["message_count"], stale))
+        if message_ops:
+            self.mongo_messages.bulk_write(message_ops, ordered=False)
+        return results
 
     def get_or_create_session(self, user_id: str, session_id: str) -> Session:
         # A. Firestore
         if self.mode == "FIRESTORE":
-            doc_ref = self.collection_ref.document(session_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                return Session(**doc.to_dict())
+            header = self._get_header(session_id)
+            if header is not None:
+                return session_from_doc(self._with_window(header))
             else:
                 new_session = Session(session_id=session_id, user_id=user_id)
-                doc_ref.set(json.loads(new_session.json()))
+                self.collection_ref.document(session_id).set(split_session_doc(session_to_doc(new_session), 0)[0])
+                mark_synced(new_session, 0, 0)
                 return new_session
 
         # B. MongoDB
         elif self.mode == "MONGODB":
-            doc = self.mongo_coll.find_one({"session_id": session_id})
-            if doc:
-                # MongoDB stores _id, remove it or ignore it
-                if "_id" in doc: del doc["_id"]
-                return Session(**doc)
+            header = self._get_header(session_id)
+            if header is not None:
+                return session_from_doc(self._with_window(header))
             else:
                 new_session = Session(session_id=session_id, user_id=user_id)
-                self.mongo_coll.insert_one(json.loads(new_session.json()))
+                self.mongo_coll.insert_one(split_session_doc(session_to_doc(new_session), 0)[0])
+                mark_synced(new_session, 0, 0)
                 return new_session
         
-        # C. File Mock
+        # C. SQLite
+        elif self.mode == "SQLITE":
+            return self.sqlite_store.get_or_create(user_id, session_id)
+
+        # D. File Mock
         else:
-            if session_id in self.mock_store:
-                return Session(**self.mock_store[session_id])
-            new_session = Session(session_id=session_id, user_id=user_id)
-            self.mock_store[session_id] = json.loads(new_session.json())
-            self._save_to_file()
-            return new_session
-
-    def save_session(self, session: Session):
+            with self._file_lock:
+                if session_id in self.mock_store:
+                    return session_from_doc(self._file_window(self.mock_store[session_id]))
+                new_session = Session(session_id=session_id, user_id=user_id)
+                self._file_append(session_to_doc(new_session))
+                self._save_to_file()
+                return new_session
+
+    def save_session(self, session: Session) -> List[str]:
         session.updated_at = datetime.utcnow()
-        data = json.loads(session.json())
+        return self.save_sessions([session])
+
+    def save_sessions(self, sessions: List[Session]) -> List[str]:
+        """
+        Batched save_session: one backend round-trip for the whole list.
+
+        Each session only appends the messages it added since it was read
+        (or last saved). If another worker saved it in between, they go after
+        that worker's messages and the header is merged rather than
+        overwritten; the ids of such stale sessions are returned, callers
+        holding them should read them again.
+        """
+        if not sessions:
+            return []
+        docs = [session_to_doc(s) for s in sessions]
+        bases = [sync_base(s) for s in sessions]
 
         if self.mode == "FIRESTORE":
-            doc_ref = self.collection_ref.document(session.session_id)
-            doc_ref.set(data)
+            results = self._fs_save(docs, bases)
         elif self.mode == "MONGODB":
-            # Upsert
-            self.mongo_coll.replace_one({"session_id": session.session_id}, data, upsert=True)
+            results = self._mongo_save(docs, bases)
+        elif self.mode == "SQLITE":
+            results = self.sqlite_store.save_many(docs, bases)
         else:
-            self.mock_store[session.session_id] = data
-            self._save_to_file()
+            # Single process, the file store is never stale
+            with self._file_lock:
+                results = [(self._file_append(data), False) for data in docs]
+                self._save_to_file()
+        self._index_leads(docs)
+
+        stale = []
+        for session, data, (count, was_stale) in zip(sessions, docs, results):
+            mark_synced(session, count, data.get("message_offset", 0) + len(data.get("messages") or []))
+            if was_stale:
+                stale.append(session.session_id)
+        if stale:
+            print(f"⚠️ {len(stale)} session(s) were saved by another worker since they were read, "
+                  f"appended after their messages and merged the profiles: {', '.join(stale[:5])}")
+        return stale
+
+    def message_count(self, session_id: str) -> Optional[int]:
+        """Stored number of messages of the session, None if it does not exist."""
+        if self.mode in ("FIRESTORE", "MONGODB"):
+            header = self._get_header(session_id)
+            return (header.get("message_count") or 0) if header is not None else None
+        elif self.mode == "SQLITE":
+            return self.sqlite_store.message_count(session_id)
+        with self._file_lock:
+            doc = self.mock_store.get(session_id)
+            return len(doc.get("messages") or []) if doc is not None else None
+
+    def get_messages(self, session_id: str, before: Optional[int] = None, limit: int = 50) -> Optional[Dict[str, Any]]:
+        """
+        One page of a session's messages, oldest first, ending just before
+        message number `before` (the latest page when None). Pass next_before
+        back as `before` for the previous page. None if the session does not exist.
+        """
+        count = self.message_count(session_id)
+        if count is None:
+            return None
+
+        end = count if before is None else max(0, min(before, count))
+        start = max(0, end - limit)
+        return {
+            "session_id": session_id,
+            "message_count": count,
+            "items": self._read_messages(session_id, start, end) if end > start else [],
+            "next_before": start if start > 0 else None
+        }
+
+    def _index_leads(self, docs: List[Dict[str, Any]]):
+        # The session is saved at this point; a failed index write only makes the
+        # dashboard stale until the next save or a rebuild, so it must not fail the save
+        if lead_index is None:
+            return
+        try:
+            lead_index.upsert_many(docs)
+        except Exception as e:
+            print(f"Lead index update failed: {e}")
+
+    def rebuild_lead_index(self, only_if_empty: bool = False) -> int:
+        """
+        Indexes every stored session. Returns how many were indexed.
+        """
+        if lead_index is None or (only_if_empty and lead_index.count() > 0):
+            return 0
+        indexed = lead_index.backfill(self.iter_sessions(SessionQuery(limit=500)))
+        print(f"Lead index: indexed {indexed} sessions")
+        return indexed
+
+    def ping(self) -> str:
+        """
+        One cheap round trip to the backend, raises if it is unreachable. Returns the mode.
+        """
+        if self.mode == "FIRESTORE":
+            next(iter(self.collection_ref.limit(1).stream()), None)
+        elif self.mode == "MONGODB":
+            self.mongo_client.admin.command("ping")
+        elif self.mode == "SQLITE":
+            self.sqlite_store.ping()
+        return self.mode
 
     def get_all_sessions(self):
         if self.mode == "FIRESTORE":
@@ -124,7 +417,120 @@ class FirestoreService:
                 if "_id" in doc: del doc["_id"]
                 sessions.append(doc)
             return sessions
+        elif self.mode == "SQLITE":
+            return self.sqlite_store.get_all()
         else:
-            return list(self.mock_store.values())
+            with self._file_lock:
+                return list(self.mock_store.values())
+
+    def _full_docs(self, headers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # fields=full on Firestore/MongoDB: each header with its recent message window
+        return [self._with_window(self._split_legacy(h) if "messages" in h else h) for h in headers]
+
+    def _list_page(self, query: SessionQuery, limit: int) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` session documents matching `query`, newest first.
+        """
+        if self.mode == "FIRESTORE":
+            # Status and updated_at are filtered by Firestore (needs a composite index on
+            # qualification_status + updated_at + session_id); profile filters are applied here
+            from firebase_admin import firestore # Already loaded by __init__ in this mode
+            direction = firestore.Query.DESCENDING
+            ref = self.collection_ref
+            if query.status:
+                ref = ref.where("qualification_status", "==", query.status)
+            if query.updated_after:
+                ref = ref.where("updated_at", ">=", query.updated_after)
+            if query.updated_before:
+                ref = ref.where("updated_at", "<", query.updated_before)
+            ref = ref.order_by("updated_at", direction=direction).order_by("session_id", direction=direction)
+            if query.after:
+                ref = ref.start_after({"updated_at": query.after[0], "session_id": query.after[1]})
+            if query.fields == "profile":
+                ref = ref.select(list(PROFILE_FIELDS))
+            docs = []
+            for snapshot in ref.stream():
+                doc = snapshot.to_dict()
+                if query.matches(doc):
+                    docs.append(doc)
+                    if len(docs) >= limit:
+                        break
+            return self._full_docs(docs) if query.fields == "full" else docs
+        elif self.mode == "MONGODB":
+            conditions: List[Dict[str, Any]] = []
+            if query.status:
+                conditions.append({"qualification_status": query.status})
+            score = {}
+            if query.min_score is not None:
+                score["$gte"] = query.min_score
+            if query.max_score is not None:
+                score["$lte"] = query.max_score
+            if score:
+                conditions.append({"lead_profile.lead_score": score})
+            if query.location:
+                conditions.append({"lead_profile.target_location": {"$regex": f"^{re.escape(query.location)}$", "$options": "i"}})
+            updated = {}
+            if query.updated_after:
+                updated["$gte"] = query.updated_after
+            if query.updated_before:
+                updated["$lt"] = query.updated_before
+            if updated:
+                conditions.append({"updated_at": updated})
+            if query.after:
+                conditions.append({"$or": [
+                    {"updated_at": {"$lt": query.after[0]}},
+                    {"updated_at": query.after[0], "session_id": {"$lt": query.after[1]}}
+                ]})
+            projection = {"_id": 0}
+            if query.fields == "profile":
+                projection["messages"] = 0
+            cursor = (self.mongo_coll.find({"$and": conditions} if conditions else {}, projection)
+                      .sort([("updated_at", -1), ("session_id", -1)])
+                      .limit(limit))
+            return self._full_docs(list(cursor)) if query.fields == "full" else list(cursor)
+        elif self.mode == "SQLITE":
+            return self.sqlite_store.list_page(query, limit)
+        else:
+            with self._file_lock:
+                docs = heapq.nlargest(limit, (d for d in self.mock_store.values() if query.matches(d)), key=sort_key)
+                # Copies, so callers never hold the live store documents
+                return [copy.deepcopy(self._file_window(d)) if query.fields == "full" else query.project(d) for d in docs]
+
+    def list_sessions(self, query: SessionQuery) -> Dict[str, Any]:
+        """
+        One page of sessions: {"items": [...], "next_cursor": str | None}.
+        """
+        return make_page(self._list_page(query, query.limit + 1), query)
+
+    def iter_sessions(self, query: SessionQuery) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every matching session, fetching `query.limit` at a time.
+        """
+        query = copy.copy(query)
+        while True:
+            docs = self._list_page(query, query.limit)
+            for doc in docs:
+                yield query.project(doc)
+            if len(docs) < query.limit:
+                return
+            query.after = sort_key(docs[-1])
+
+    # Async API: every backend client here is blocking (Firestore SDK, pymongo, file I/O),
+    # so the async request path hands them to the shared executor pool.
+    async def aget_or_create_session(self, user_id: str, session_id: str) -> Session:
+        return await run_blocking(self.get_or_create_session, user_id, session_id)
+
+    async def asave_session(self, session: Session):
+        return await run_blocking(self.save_session, session)
+
+    async def aget_all_sessions(self):
+        return await run_blocking(self.get_all_sessions)
+
+    async def alist_sessions(self, query: SessionQuery) -> Dict[str, Any]:
+        return await run_blocking(self.list_sessions, query)
+
+    async def aget_messages(self, session_id: str, before: Optional[int] = None, limit: int = 50) -> Optional[Dict[str, Any]]:
+        return await run_blocking(self.get_messages, session_id, before, limit)
 
-firestore_service = FirestoreService()
+# Built on first use (Firebase init or the local_db.json load), not at import
+firestore_service = Lazy("firestore_service", FirestoreService)
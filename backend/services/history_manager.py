@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+from config.settings import config
+
+ChatMessage = Dict[str, str]
+
+class HistoryManager:
+    """
+    Keeps the LLM prompt within a fixed token budget.
+
+    At least the last `keep_turns` user/assistant turns are sent verbatim.
+    Older messages are folded, once, into a rolling summary that is stored on
+    the Session (`conversation_summary` + `summarized_count`), so the prompt
+    cost stays bounded however long the conversation gets. The summary is
+    extractive (one short line per message, oldest lines dropped first), which
+    costs no extra LLM call; the lead profile is sent as its own message.
+
+    Folding happens `fold_chunk_turns` turns at a time rather than every turn:
+    in between, the prompt only grows at the end, so Ollama can reuse its KV
+    cache for everything before the new turn instead of re-evaluating the
+    summary and history whenever the window slides.
+    """
+    def __init__(
+        self,
+        token_budget: int = config.HISTORY_TOKEN_BUDGET,
+        keep_turns: int = config.HISTORY_KEEP_TURNS,
+        summary_max_tokens: int = config.HISTORY_SUMMARY_MAX_TOKENS,
+        fold_chunk_turns: int = config.HISTORY_FOLD_CHUNK_TURNS
+    ):
+        self.token_budget = token_budget
+        self.keep_messages = keep_turns * 2
+        self.summary_max_tokens = summary_max_tokens
+        self.fold_chunk_messages = fold_chunk_turns * 2
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # ~4 characters per token for English-like text, plus per-message overhead
+        return len(text or "") // 4 + 4
+
+    @staticmethod
+    def _role(message: ChatMessage) -> str:
+        role = message["role"]
+        return getattr(role, "value", role)
+
+    def _summary_line(self, message: ChatMessage) -> str:
+        text = " ".join(message["content"].split())
+        limit = 160 if self._role(message) == "user" else 80
+        if len(text) > limit:
+            text = text[:limit].rsplit(" ", 1)[0] + "..."
+        speaker = "User" if self._role(message) == "user" else "Assistant"
+        return f"{speaker}: {text}"
+
+    def _trim_summary(self, lines: List[str]) -> List[str]:
+        while lines and sum(self.estimate_tokens(l) for l in lines) > self.summary_max_tokens:
+            lines.pop(0)
+        return lines
+
+    def fold(self, history: List[ChatMessage], summary: Optional[str], summarized_count: int) -> Tuple[Optional[str], int]:
+        """
+        Once more than keep_turns + fold_chunk_turns turns are unsummarized,
+        folds every message older than the last keep_turns into the summary.
+        `history` is the transcript before the current user message (or its
+        loaded tail, with summarized_count counted from history[0]).
+        Returns the new (summary, summarized_count).
+        """
+        if len(history) - summarized_count <= self.keep_messages + self.fold_chunk_messages:
+            return summary, summarized_count
+        fold_until = len(history) - self.keep_messages
+        lines = summary.split("\n") if summary else []
+        lines.extend(self._summary_line(m) for m in history[summarized_count:fold_until])
+        lines = self._trim_summary(lines)
+        return ("\n".join(lines) or None), fold_until
+
+    def build_messages(
+        self,
+        system_prompt: str,
+        summary: Optional[str],
+        recent: List[ChatMessage],
+        user_message: str,
+        state_message: Optional[str] = None
+    ) -> List[ChatMessage]:
+        """
+        Assembles system prompt + summary + recent turns + the current user
+        message + `state_message` (per-turn context, as a trailing system
+        message so everything before it stays a stable prefix).
+        If that still exceeds the budget (very long messages), the oldest recent
+        messages are folded into the summary for this request only.
+        """
+        recent = [{"role": self._role(m), "content": m["content"]} for m in recent]
+        lines = summary.split("\n") if summary else []
+
+        def total() -> int:
+            return (self.estimate_tokens(system_prompt)
+                    + sum(self.estimate_tokens(l) for l in lines)
+                    + sum(self.estimate_tokens(m["content"]) for m in recent)
+                    + self.estimate_tokens(user_message)
+                    + (self.estimate_tokens(state_message) if state_message else 0))
+
+        while recent and total() > self.token_budget:
+            lines.append(self._summary_line(recent.pop(0)))
+            lines = self._trim_summary(lines)
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if lines:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation:\n" + "\n".join(lines)})
+        messages.extend(recent)
+        messages.append({"role": "user", "content": user_message})
+        if state_message:
+            messages.append({"role": "system", "content": state_message})
+        return messages
+
+history_manager = HistoryManager()
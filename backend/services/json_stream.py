@@ -0,0 +1,85 @@
+import json
+from typing import Any, Iterator, TextIO, Tuple
+
+# Streaming reader for large JSON files holding one top-level object, such
+# as the FILE-mode local_db.json ({session_id: session, ...}): memory stays
+# around one value instead of the whole file. ijson is used when installed.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed, so the buffer never holds more than the current value
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expected one of {chars!r}, found {c or 'end of file'!r}")
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal cut at the chunk boundary decodes "successfully"; read on to be sure
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_object_items(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields the (key, value) pairs of the top-level JSON object in `path`, in file order.
+    """
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.kvitems(f, "", use_float=True)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            yield key, reader.value()
+            if reader.expect(",}") == "}":
+                return
@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Lazy:
+    """
+    Module-level singleton that is built on first use instead of at import.
+
+    Attribute reads and writes go to the built object, so call sites keep
+    using `from module import service` unchanged. Construction happens once,
+    under a lock; resolve() builds it explicitly (startup warmup) and
+    `resolved` tells whether that has happened yet.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "init_seconds", None)
+        _providers.append(self)
+
+    def resolve(self) -> Any:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                instance = self._factory()
+                object.__setattr__(self, "init_seconds", time.perf_counter() - started)
+                object.__setattr__(self, "_instance", instance)
+                print(f"⚙️ {self._name} initialized in {self.init_seconds * 1000:.0f} ms")
+            return self._instance
+
+    @property
+    def resolved(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self.resolve(), attr, value)
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self._name} {'resolved' if self.resolved else 'pending'}>"
+
+
+_providers: List[Lazy] = []
+
+
+def providers() -> List[Lazy]:
+    return list(_providers)
+
+
+def provider_stats() -> Dict[str, Optional[float]]:
+    """Provider name -> construction time in seconds (None while not built)."""
+    return {p._name: round(p.init_seconds, 4) if p.init_seconds is not None else None for p in _providers}
@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.settings import config
+from services.budget import parse_budget
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    session_id TEXT PRIMARY KEY,
+    qualification_status TEXT NOT NULL,
+    lead_score INTEGER NOT NULL,
+    target_location TEXT,
+    property_type TEXT,
+    bedrooms TEXT,
+    investment_type TEXT,
+    urgency TEXT,
+    urgency_rank INTEGER NOT NULL,
+    budget_value REAL,
+    budget_currency TEXT,
+    budget_raw TEXT,
+    name TEXT,
+    phone_number TEXT,
+    email TEXT,
+    language TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leads_status_score ON leads (qualification_status, lead_score DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_status_urgency ON leads (qualification_status, urgency_rank DESC, lead_score DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_location_type ON leads (target_location, property_type, budget_value);
+CREATE INDEX IF NOT EXISTS idx_leads_status_budget ON leads (qualification_status, budget_value DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_currency_budget ON leads (budget_currency, budget_value);
+CREATE INDEX IF NOT EXISTS idx_leads_budget ON leads (budget_value DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_score ON leads (lead_score DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_updated ON leads (updated_at);
+"""
+
+COLUMNS = (
+    "session_id", "qualification_status", "lead_score", "target_location", "property_type", "bedrooms",
+    "investment_type", "urgency", "urgency_rank", "budget_value", "budget_currency", "budget_raw",
+    "name", "phone_number", "email", "language", "updated_at"
+)
+
+# Ordering options of /admin/leads; session_id breaks ties so pages are stable
+ORDERINGS = {
+    "urgency": "urgency_rank DESC, lead_score DESC, updated_at DESC, session_id",
+    "score": "lead_score DESC, updated_at DESC, session_id",
+    "budget": "budget_value DESC, lead_score DESC, session_id", # NULL budgets sort last
+    "updated": "updated_at DESC, session_id",
+}
+
+_URGENCY_RANK = {"high": 2, "medium": 1}
+
+def _lower(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else None
+
+def index_row(doc: Dict[str, Any]) -> tuple:
+    """
+    Flattens a session document (as stored) into a `leads` row.
+    """
+    profile = doc.get("lead_profile") or {}
+    status = doc.get("qualification_status")
+    budget_value, budget_currency = parse_budget(profile.get("budget_range"))
+    urgency = profile.get("urgency")
+    return (
+        doc["session_id"],
+        getattr(status, "value", status) or "INITIAL",
+        int(profile.get("lead_score") or 0),
+        _lower(profile.get("target_location")),
+        _lower(profile.get("property_type")),
+        profile.get("bedrooms"),
+        profile.get("investment_type"),
+        urgency,
+        _URGENCY_RANK.get((urgency or "").lower(), 0),
+        budget_value,
+        budget_currency,
+        profile.get("budget_range"),
+        profile.get("name"),
+        profile.get("phone_number"),
+        profile.get("email"),
+        profile.get("language_preference"),
+        str(doc.get("updated_at") or ""),
+    )
+
+class LeadIndex:
+    """
+    Secondary index of lead profiles for dashboard queries, on its own SQLite
+    file (WAL, shared by workers on the host).
+
+    One row per session with the budget parsed to a number and currency and
+    the filterable fields in indexed columns. It is updated on every session
+    save and can be rebuilt from the session store with `backfill`, so it is
+    never the source of truth.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._conn().execute("PRAGMA optimize")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def upsert_many(self, docs: Iterable[Dict[str, Any]]) -> int:
+        rows = [index_row(doc) for doc in docs]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO leads ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows
+            )
+        return len(rows)
+
+    def backfill(self, docs: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Indexes every document of `docs` (e.g. firestore_service.iter_sessions()).
+        """
+        total, batch = 0, []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                total += self.upsert_many(batch)
+                batch = []
+        total += self.upsert_many(batch)
+        # Planner statistics, so multi-filter queries pick the most selective index
+        self._conn().execute("ANALYZE")
+        return total
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def scan(self, columns: str, order: str = "updated") -> List[tuple]:
+        """
+        `columns` (SQL expressions over `leads`) of every lead as plain tuples, in ORDERINGS[order] order.
+        """
+        cursor = self._conn().cursor()
+        cursor.row_factory = None
+        return cursor.execute(f"SELECT {columns} FROM leads ORDER BY {ORDERINGS[order]}").fetchall()
+
+    def get_many(self, session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Rows of the given sessions, keyed by session_id (missing ones are left out).
+        """
+        rows = {}
+        for i in range(0, len(session_ids), 500):
+            chunk = session_ids[i:i + 500]
+            sql = f"SELECT * FROM leads WHERE session_id IN ({', '.join('?' for _ in chunk)})"
+            for row in self._conn().execute(sql, chunk):
+                rows[row["session_id"]] = dict(row)
+        return rows
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        location: Optional[str] = None,
+        property_type: Optional[str] = None,
+        urgency: Optional[str] = None,
+        min_budget: Optional[float] = None,
+        max_budget: Optional[float] = None,
+        currency: Optional[str] = None,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+        order: str = "urgency",
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Leads matching every given filter, e.g. status="QUALIFIED",
+        property_type="villa", location="marina", min_budget=1_000_000,
+        order="urgency". Returns {"items": [...], "took_ms": float}.
+        """
+        if order not in ORDERINGS:
+            raise ValueError(f"order must be one of {', '.join(ORDERINGS)}")
+        where, params = [], []
+        for column, value in (
+            ("qualification_status", status),
+            ("target_location", _lower(location)),
+            ("property_type", _lower(property_type)),
+            ("budget_currency", currency.upper() if currency else None),
+        ):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if urgency:
+            where.append("urgency_rank = ?")
+            params.append(_URGENCY_RANK.get(urgency.lower(), 0))
+        for clause, value in (
+            ("budget_value >= ?", min_budget),
+            ("budget_value <= ?", max_budget),
+            ("lead_score >= ?", min_score),
+            ("lead_score <= ?", max_score),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+
+        sql = "SELECT * FROM leads"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {ORDERINGS[order]} LIMIT ? OFFSET ?"
+        start = time.perf_counter()
+        rows = self._conn().execute(sql, params + [max(1, min(limit, 500)), max(0, offset)]).fetchall()
+        return {
+            "items": [dict(row) for row in rows],
+            "took_ms": round((time.perf_counter() - start) * 1000, 3)
+        }
+
+def build_lead_index() -> Optional[LeadIndex]:
+    if not config.LEAD_INDEX_ENABLED:
+        return None
+    return LeadIndex(config.LEAD_INDEX_DB_PATH)
+
+lead_index = build_lead_index()
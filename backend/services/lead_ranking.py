@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from config.settings import config
+from services.scoring import FILLED_FIELDS, ScoringWeights
+
+# Columnar counterpart of LeadExtractionService.calculate_lead_score and
+# check_qualification_status: a batch of profiles is one boolean array per
+# feature, and scores, statuses and top-K rankings for the whole batch come
+# out of a few array operations. The results must match the scalar path
+# exactly (benchmarks/bench_scoring.py checks it).
+
+FEATURES = FILLED_FIELDS + ("large_budget", "high_urgency")
+
+# Status codes; STATUSES[code] is the ProcessStatus value
+INITIAL, DISCOVERY, QUALIFIED = 0, 1, 2
+STATUSES = ("INITIAL", "DISCOVERY", "QUALIFIED")
+
+# The same features computed by SQLite over the lead index, packed into one
+# integer per lead (bit j = FEATURES[j]); budget_raw is budget_range as saved
+_INDEX_COLUMNS = {"budget_range": "budget_raw"}
+_FILLED_SQL = "(ifnull(length({}), 0) > 0)"
+FEATURE_MASK_SQL = " | ".join(
+    [f"({_FILLED_SQL.format(_INDEX_COLUMNS.get(field, field))} << {bit})" for bit, field in enumerate(FILLED_FIELDS)]
+    + [f"(ifnull(instr(lower(budget_raw), 'm') > 0, 0) << {len(FILLED_FIELDS)})",
+       f"(ifnull(urgency = 'High', 0) << {len(FILLED_FIELDS) + 1})"]
+)
+
+
+def _large_budget(budget: Optional[str]) -> bool:
+    return bool(budget) and ("m" in budget.lower() or "million" in budget.lower())
+
+
+class ProfileBatch:
+    """
+    Profiles as one boolean column per feature (FEATURES), with the session ids in the same order.
+    """
+    def __init__(self, session_ids: Sequence[str], columns: Dict[str, np.ndarray]):
+        self.session_ids = list(session_ids)
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.session_ids)
+
+    @classmethod
+    def from_profiles(cls, session_ids: Sequence[str], profiles: Iterable[Mapping[str, Any]]) -> "ProfileBatch":
+        """From profile dicts (LeadProfile documents)."""
+        profiles = list(profiles)
+        n = len(profiles)
+        columns = {field: np.fromiter((bool(p.get(field)) for p in profiles), bool, count=n) for field in FILLED_FIELDS}
+        columns["large_budget"] = np.fromiter((_large_budget(p.get("budget_range")) for p in profiles), bool, count=n)
+        columns["high_urgency"] = np.fromiter((p.get("urgency") == "High" for p in profiles), bool, count=n)
+        return cls(session_ids, columns)
+
+    @classmethod
+    def from_masks(cls, session_ids: Sequence[str], masks: np.ndarray) -> "ProfileBatch":
+        """From packed feature bits (FEATURE_MASK_SQL)."""
+        return cls(session_ids, {field: (masks >> bit) & 1 == 1 for bit, field in enumerate(FEATURES)})
+
+
+def score(batch: ProfileBatch, weights: ScoringWeights) -> np.ndarray:
+    """Lead scores of the batch (int64), as calculate_lead_score computes them."""
+    c = batch.columns
+    scores = np.zeros(len(batch), dtype=np.int64)
+    for field in FILLED_FIELDS:
+        scores += c[field] * getattr(weights.filled_field, field)
+    scores += c["large_budget"] * weights.large_budget
+    scores += c["high_urgency"] * weights.high_urgency
+    scores += c["name"] * weights.contact.name
+    scores += c["phone_number"] * weights.contact.phone_number
+    return scores
+
+
+def qualification_status(batch: ProfileBatch) -> np.ndarray:
+    """Status codes of the batch (index into STATUSES), as check_qualification_status decides them."""
+    c = batch.columns
+    has_contact = c["name"] & c["phone_number"]
+    has_interest = c["property_type"] | c["budget_range"]
+    discovery_fields = [c[f] for f in ("investment_type", "budget_range", "property_type", "bedrooms", "target_location")]
+    all_fields = np.logical_and.reduce(discovery_fields)
+    any_field = np.logical_or.reduce(discovery_fields)
+    qualified = (has_contact & has_interest) | (all_fields & (c["name"] | c["phone_number"] | c["email"]))
+    return np.select([qualified, any_field | has_contact], [QUALIFIED, DISCOVERY], INITIAL).astype(np.int8)
+
+
+def top_k(scores: np.ndarray, k: int, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Indices of the k highest scores (among `candidates`, default all), highest
+    first; equal scores keep batch order. O(n) selection, then a sort of k.
+    """
+    idx = np.arange(len(scores)) if candidates is None else candidates
+    k = max(0, min(k, len(idx)))
+    if k == 0:
+        return idx[:0]
+    values = scores[idx]
+    if k < len(idx):
+        kth = np.partition(values, len(values) - k)[len(values) - k] # k-th largest
+        greater = idx[values > kth]
+        ties = idx[values == kth][:k - len(greater)]
+        idx = np.concatenate([greater, ties])
+        values = scores[idx]
+    return idx[np.argsort(-values, kind="stable")]
+
+
+class LeadRanker:
+    """
+    Ranks every lead in the lead index under any weights, for the dashboard.
+
+    The feature columns are read from the index in one query (most recently
+    updated first, so equal scores rank the freshest lead higher) and kept
+    for LEAD_RANK_REFRESH_SECONDS; after that each ranking is a vectorized
+    pass, so trying new weights does not touch the database. Nothing is
+    written back (scripts/rescore_sessions.py --mode score does that).
+    """
+    def __init__(self, index, refresh_seconds: float = config.LEAD_RANK_REFRESH_SECONDS):
+        self.index = index
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._batch: Optional[ProfileBatch] = None
+        self._loaded_at = 0.0
+        self.load_seconds = None
+
+    def batch(self, refresh: bool = False) -> ProfileBatch:
+        with self._lock:
+            if refresh or self._batch is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+                started = time.perf_counter()
+                rows = self.index.scan(f"session_id, {FEATURE_MASK_SQL}", order="updated")
+                masks = np.fromiter((mask for _, mask in rows), np.int64, count=len(rows))
+                self._batch = ProfileBatch.from_masks([session_id for session_id, _ in rows], masks)
+                self._loaded_at = time.monotonic()
+                self.load_seconds = time.perf_counter() - started
+            return self._batch
+
+    def rank(self, weights: ScoringWeights, k: int = 50, status: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """
+        {"items": [lead index row + ranked_score/ranked_status], "total": leads
+        considered, "status_counts": {...}, "weights": ..., "took_ms": ...}.
+        `status` filters on the recomputed status.
+        """
+        batch = self.batch(refresh)
+        started = time.perf_counter()
+        scores = score(batch, weights)
+        statuses = qualification_status(batch)
+        candidates = None
+        if status is not None:
+            # NEEDS_REVIEW is never computed, so it matches nothing
+            code = STATUSES.index(status) if status in STATUSES else -1
+            candidates = np.flatnonzero(statuses == code)
+        top = top_k(scores, max(1, min(k, 500)), candidates)
+        rank_ms = (time.perf_counter() - started) * 1000
+
+        rows = self.index.get_many([batch.session_ids[i] for i in top])
+        items: List[Dict[str, Any]] = []
+        for i in top:
+            row = rows.get(batch.session_ids[i])
+            if row is None: # Removed from the index since the columns were loaded
+                continue
+            items.append({**row, "ranked_score": int(scores[i]), "ranked_status": STATUSES[statuses[i]]})
+        counts = np.bincount(statuses, minlength=len(STATUSES))
+        return {
+            "items": items,
+            "total": len(batch) if candidates is None else len(candidates),
+            "status_counts": {name: int(n) for name, n in zip(STATUSES, counts)},
+            "weights": weights.model_dump(),
+            "took_ms": {"rank": round(rank_ms, 3), "last_load": round((self.load_seconds or 0) * 1000, 3)}
+        }
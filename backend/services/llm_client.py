@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import config
+
+
+class LLMOverloadedError(Exception):
+    """Raised when the wait queue in front of the model server is full."""
+
+
+def ollama_options() -> Dict[str, int]:
+    """
+    Ollama request `options` from the config (unset ones keep the model's defaults).
+    The preload sends the same ones: a different num_ctx makes Ollama reload the model.
+    """
+    options = {}
+    if config.OLLAMA_NUM_CTX > 0:
+        options["num_ctx"] = config.OLLAMA_NUM_CTX
+    if config.OLLAMA_NUM_PREDICT != 0:
+        options["num_predict"] = config.OLLAMA_NUM_PREDICT
+    return options
+
+
+class _AsyncState:
+    """
+    Per-event-loop pieces of the client: httpx pools and asyncio primitives
+    are bound to the loop that created them.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient, max_concurrency: int):
+        self.loop = loop
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+
+class OllamaClient:
+    """
+    Long-lived, pooled HTTP client for the Ollama API.
+
+    - Keep-alive connection pools for both the sync (requests) and async (httpx) paths.
+    - At most `max_concurrency` requests in flight upstream; further callers wait
+      in a queue of at most `max_queue` entries and are rejected beyond that.
+    - Identical in-flight payloads (same hash) share one upstream call.
+    - Queue depth and wait-time metrics via stats().
+    """
+    def __init__(
+        self,
+        api_url: str,
+        max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+        max_queue: int = config.LLM_MAX_QUEUE,
+        pool_size: int = config.LLM_POOL_CONNECTIONS,
+        keepalive_seconds: float = config.LLM_KEEPALIVE_SECONDS,
+        timeout: float = config.LLM_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.api_url = api_url
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.pool_size = pool_size
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+        self.transport = transport
+
+        # Sync path
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        # Async path (created lazily per event loop)
+        self._async: Optional[_AsyncState] = None
+
+        # Metrics (shared by both paths)
+        self._metrics_lock = threading.Lock()
+        self._in_flight = 0
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._requests_total = 0
+        self._coalesced_total = 0
+        self._rejected_total = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    # --- helpers ---
+
+    @staticmethod
+    def payload_key(payload: dict) -> str:
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _get_async_state(self) -> _AsyncState:
+        loop = asyncio.get_running_loop()
+        if self._async is None or self._async.loop is not loop:
+            limits = httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive_seconds
+            )
+            client = httpx.AsyncClient(timeout=self.timeout, limits=limits, transport=self.transport)
+            self._async = _AsyncState(loop, client, self.max_concurrency)
+        return self._async
+
+    def _enter_queue(self):
+        with self._metrics_lock:
+            if self._queue_depth >= self.max_queue:
+                self._rejected_total += 1
+                raise LLMOverloadedError(f"LLM wait queue is full ({self.max_queue} waiting)")
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+
+    def _leave_queue(self, waited: float):
+        with self._metrics_lock:
+            self._queue_depth -= 1
+            self._in_flight += 1
+            self._requests_total += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+
+    def _abandon_queue(self):
+        with self._metrics_lock:
+            self._queue_depth -= 1
+
+    def _release(self):
+        with self._metrics_lock:
+            self._in_flight -= 1
+
+    # --- sync API ---
+
+    def chat(self, payload: dict) -> Dict[str, Any]:
+        self._enter_queue()
+        start = time.perf_counter()
+        self._sync_semaphore.acquire()
+        self._leave_queue(time.perf_counter() - start)
+        try:
+            response = self._session.post(self.api_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._sync_semaphore.release()
+            self._release()
+
+    # --- async API ---
+
+    async def _acquire(self, state: _AsyncState):
+        self._enter_queue()
+        start = time.perf_counter()
+        try:
+            await state.semaphore.acquire()
+        except BaseException:
+            self._abandon_queue()
+            raise
+        self._leave_queue(time.perf_counter() - start)
+
+    def _arelease(self, state: _AsyncState):
+        state.semaphore.release()
+        self._release()
+
+    async def _achat_upstream(self, state: _AsyncState, payload: dict) -> Dict[str, Any]:
+        await self._acquire(state)
+        try:
+            response = await state.client.post(self.api_url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._arelease(state)
+
+    async def achat(self, payload: dict) -> Dict[str, Any]:
+        state = self._get_async_state()
+        key = self.payload_key(payload)
+
+        future = state.inflight.get(key)
+        if future is not None:
+            with self._metrics_lock:
+                self._coalesced_total += 1
+            # shield: one caller disconnecting must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = state.loop.create_task(self._achat_upstream(state, payload))
+        state.inflight[key] = future
+        future.add_done_callback(lambda _: state.inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def astream(self, payload: dict) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields the decoded NDJSON chunks of a streaming request. Streams are
+        per-client, so they hold a slot but are never coalesced.
+        """
+        state = self._get_async_state()
+        await self._acquire(state)
+        try:
+            async with state.client.stream("POST", self.api_url, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+        finally:
+            self._arelease(state)
+
+    async def apreload(self, model: str, keep_alive: str = config.OLLAMA_KEEP_ALIVE) -> Dict[str, Any]:
+        """
+        Loads the model into memory without generating anything (a chat
+        request with no messages) and keeps it there for keep_alive.
+        """
+        payload = {"model": model, "messages": [], "keep_alive": keep_alive}
+        options = ollama_options()
+        if options:
+            payload["options"] = options
+        return await self.achat(payload)
+
+    async def aloaded_models(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Models the server currently holds in memory (GET /api/ps). Raises if unreachable.
+        """
+        state = self._get_async_state()
+        ps_url = self.api_url.split("/api/")[0] + "/api/ps"
+        response = await state.client.get(ps_url, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return [m.get("name") or m.get("model") for m in response.json().get("models", [])]
+
+    async def aclose(self):
+        if self._async is not None:
+            await self._async.client.aclose()
+            self._async = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            completed = self._requests_total
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": self._queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "requests_total": completed,
+                "coalesced_total": self._coalesced_total,
+                "rejected_total": self._rejected_total,
+                "wait_seconds_total": round(self._wait_seconds_total, 6),
+                "wait_seconds_max": round(self._wait_seconds_max, 6),
+                "wait_seconds_avg": round(self._wait_seconds_total / completed, 6) if completed else 0.0
+            }
@@ -1,23 +1,23 @@
-import requests
+import time
+from typing import AsyncIterator
 from config.settings import config
+from services.llm_client import OllamaClient, ollama_options
+from services.history_manager import history_manager
 from models.schemas import Session, LeadProfile
+from services.structured_log import get_logger, log_sampled
+from services.model_registry import ModelBackend, model_registry
 
-class LLMService:
-    def __init__(self):
-        self.api_url = config.OLLAMA_BASE_URL
-        self.model = config.MODEL_NAME
+logger = get_logger("llm")
 
-    def _build_system_prompt(self, lead_profile: LeadProfile, language: str = "en") -> str:
-        # Dynamic insertion of current profile values
-        profile_text = f"Investment: {lead_profile.investment_type}\\nBudget: {lead_profile.budget_range}\\nType: {lead_profile.property_type}\\nBeds: {lead_profile.bedrooms}\\nLocation: {lead_profile.target_location}"
-        
-        base_prompt = f"""
+FALLBACK_REPLY = "I apologize, but I am having trouble connecting to my brain right now. Please try again in a moment."
+
+# Identical for every session and turn, so it is always a cached prefix on the
+# Ollama side; anything that changes per turn goes in the trailing state message
+SYSTEM_PROMPT = """
 You are a fast, efficient Real Estate Assistant for **Everest View Property**.
 **GOAL**: Get the user's **Name & Phone Number** ASAP, then confirm their Request (Property/Budget).
 
-**Current Known Information**:
-{profile_text}
-(Name: {lead_profile.name or 'Unknown'}, Phone: {lead_profile.phone_number or 'Unknown'})
+The **Current Known Information** about the lead comes as the last message, after the user's message.
 
 **Instructions**:
 1. **PRIORITY 1**: If 'Name' or 'Phone' is Unknown, **ASK FOR IT NOW**. Do not ask about property details until you have contact info.
@@ -25,53 +25,165 @@ You are a fast, efficient Real Estate Assistant for **Everest View Property**.
 3. **DO NOT** ask about amenities, pools, views, or specific neighborhood boundaries.
 4. **DO NOT** loop. If state shows "Unknown" but user just said it, assume the system missed it and ask *once* more clearly, or move to the next item.
 5. Keep it SHORT. "Thanks [Name], what is your phone number?" is a perfect response.
-6. Language: **{language}**.
+6. Reply in the Language given with the Current Known Information.
 """
-        return base_prompt
-
-    def generate_response(self, session: Session, user_message: str, language: str = "en") -> str:
-        system_prompt = self._build_system_prompt(session.lead_profile, language)
-        
-        # Build message history for context
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in session.messages:
-            messages.append({"role": msg.role, "content": msg.content})
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
 
+class LLMService:
+    def __init__(self):
+        self.api_url = config.OLLAMA_BASE_URL
+        self.model = config.MODEL_NAME
+        # One pooled, rate-limited client per process, shared by every request
+        self.client = OllamaClient(self.api_url)
+
+    def _build_state_message(self, lead_profile: LeadProfile, language: str = "en") -> str:
+        # Dynamic insertion of current profile values, sent after the user message
+        profile_text = f"Investment: {lead_profile.investment_type}\nBudget: {lead_profile.budget_range}\nType: {lead_profile.property_type}\nBeds: {lead_profile.bedrooms}\nLocation: {lead_profile.target_location}"
+        return f"""**Current Known Information**:
+{profile_text}
+(Name: {lead_profile.name or 'Unknown'}, Phone: {lead_profile.phone_number or 'Unknown'})
+Language: **{language}**."""
+
+    def _build_payload(self, session: Session, user_message: str, language: str = "en", model: str = None) -> dict:
+        # Static instructions + summary + recent history + current user message, then the profile state:
+        # only the tail changes from turn to turn, so Ollama reuses the KV cache for the rest.
+        # session.messages must not already contain user_message.
+        recent = [{"role": msg.role, "content": msg.content} for msg in session.messages]
+        messages = history_manager.build_messages(
+            SYSTEM_PROMPT, session.conversation_summary, recent, user_message,
+            state_message=self._build_state_message(session.lead_profile, language)
+        )
+
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": config.OLLAMA_KEEP_ALIVE
+        }
+        options = ollama_options()
+        if options:
+            payload["options"] = options
+        return payload
+
+    @staticmethod
+    def _log_response(data: dict):
+        # Sampled summary instead of dumping every response
+        log_sampled(
+            logger, "ollama_response", model=data.get("model"), eval_count=data.get("eval_count"),
+            prompt_eval_count=data.get("prompt_eval_count"),
+            prompt_eval_ms=round(data["prompt_eval_duration"] / 1e6, 1) if data.get("prompt_eval_duration") else None,
+            total_ms=round(data["total_duration"] / 1e6, 1) if data.get("total_duration") else None,
+            done_reason=data.get("done_reason")
+        )
+
+    def _parse_reply(self, data: dict) -> str:
+        self._log_response(data)
+        # The chat endpoint (/api/chat) returns 'message': {'role': 'assistant', 'content': '...'},
+        # the generate endpoint (/api/generate) returns 'response'. Accept both.
+        if "message" in data:
+            return data["message"]["content"]
+        elif "response" in data:
+            return data["response"]
+        else:
+            return "Error: Unexpected response format from Ollama."
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _client_for(self, backend: ModelBackend):
+        return backend.client if backend.client is not None else self.client
+
+    def _fallback_tier(self, backend: ModelBackend, error: Exception) -> ModelBackend:
+        """
+        The default tier to retry on when another tier failed, else None.
+        """
+        print(f"LLM Call Failed ({backend.tier}): {error}")
+        if backend is model_registry.default:
+            return None
+        backend.record_fallback()
+        return model_registry.default
+
+    def _generate(self, backend: ModelBackend, session: Session, user_message: str, language: str) -> str:
+        payload = self._build_payload(session, user_message, language, backend.model)
+        start = time.perf_counter()
+        try:
+            reply = self._parse_reply(self._client_for(backend).chat(payload))
+        except Exception:
+            backend.record(time.perf_counter() - start, ok=False)
+            raise
+        backend.record(time.perf_counter() - start, ok=True)
+        return reply
+
+    async def _agenerate(self, backend: ModelBackend, session: Session, user_message: str, language: str) -> str:
+        payload = self._build_payload(session, user_message, language, backend.model)
+        start = time.perf_counter()
         try:
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False
-            }
-            if config.MODEL_SOURCE == "ollama":
-                response = requests.post(self.api_url, json=payload, timeout=60)
-                response.raise_for_status()
-                data = response.json()
-                print(f"DEBUG: Ollama Response Data: {data}")
-                # Ollama returns 'message': {'role': 'assistant', 'content': '...'} or just 'response' depending on endpoint
-                # The chat endpoint uses 'message', generate uses 'response'.
-                # Assuming /api/chat based on payload structure. If /api/generate, structure is diff.
-                # Default config OLLAMA_BASE_URL is /api/generate, but structure above is for /api/chat.
-                # Let's adjust for /api/chat since we are sending "messages".
-                
-                # If the URL ends with /generate, we might need a different payload.
-                # But let's assume the user will set OLLAMA_BASE_URL to .../api/chat OR we handle it.
-                # Let's try to be robust. if "messages" is in payload, it should be chat endpoint.
-                
-                if "message" in data:
-                    return data["message"]["content"]
-                elif "response" in data:
-                    return data["response"]
-                else:
-                    return "Error: Unexpected response format from Ollama."
-            else:
-                return "Mock OpenAI Response: This feature is pending."
-                
-        except Exception as e:
-            print(f"LLM Call Failed: {e}")
-            return "I apologize, but I am having trouble connecting to my brain right now. Please try again in a moment."
+            reply = self._parse_reply(await self._client_for(backend).achat(payload))
+        except Exception:
+            backend.record(time.perf_counter() - start, ok=False)
+            raise
+        backend.record(time.perf_counter() - start, ok=True)
+        return reply
+
+    def generate_response(self, session: Session, user_message: str, language: str = "en", model: str = None) -> str:
+        """
+        `model` is a routing tier from the model registry (default tier if None).
+        A failing non-default tier is retried once on the default tier.
+        """
+        if config.MODEL_SOURCE != "ollama":
+            return "Mock OpenAI Response: This feature is pending."
+        backend = model_registry.get(model)
+        while backend is not None:
+            try:
+                return self._generate(backend, session, user_message, language)
+            except Exception as e:
+                backend = self._fallback_tier(backend, e)
+        return FALLBACK_REPLY
+
+    async def agenerate_response(self, session: Session, user_message: str, language: str = "en", model: str = None) -> str:
+        """
+        Non-blocking variant of generate_response for the async request path.
+        """
+        if config.MODEL_SOURCE != "ollama":
+            return "Mock OpenAI Response: This feature is pending."
+        backend = model_registry.get(model)
+        while backend is not None:
+            try:
+                return await self._agenerate(backend, session, user_message, language)
+            except Exception as e:
+                backend = self._fallback_tier(backend, e)
+        return FALLBACK_REPLY
+
+    async def astream_response(self, session: Session, user_message: str, language: str = "en", model: str = None) -> AsyncIterator[str]:
+        """
+        Yields reply chunks as Ollama produces them (NDJSON stream from /api/chat or /api/generate).
+        Falls back to the default tier only if the failing tier produced nothing yet.
+        """
+        if config.MODEL_SOURCE != "ollama":
+            yield "Mock OpenAI Response: This feature is pending."
+            return
+        backend = model_registry.get(model)
+        produced = False
+        while backend is not None:
+            payload = self._build_payload(session, user_message, language, backend.model)
+            payload["stream"] = True
+            start = time.perf_counter()
+            try:
+                async for data in self._client_for(backend).astream(payload):
+                    chunk = data.get("message", {}).get("content") or data.get("response") or ""
+                    if chunk:
+                        produced = True
+                        yield chunk
+                    if data.get("done"):
+                        self._log_response(data)
+                        break
+                backend.record(time.perf_counter() - start, ok=True)
+                return
+            except Exception as e:
+                backend.record(time.perf_counter() - start, ok=False)
+                if produced:
+                    print(f"LLM Stream Failed ({backend.tier}): {e}")
+                    return
+                backend = self._fallback_tier(backend, e)
+        yield FALLBACK_REPLY
 
 llm_service = LLMService()
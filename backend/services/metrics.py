@@ -0,0 +1,112 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Tuple
+
+# Prometheus metrics for the chat path. prometheus_client is optional: without
+# it every metric is a no-op and /metrics reports that it is unavailable.
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+    )
+except ImportError:
+    Counter = Histogram = None
+
+# Stages of a chat turn, in order
+STAGES = (
+    "session_fetch",        # session cache / store read
+    "cache_lookup",         # response cache
+    "qualifier_llm",        # LLM call (or streamed generation) in the qualifier node
+    "qualifier_extraction", # lead extraction, scoring and status
+    "notifier",             # outbox enqueue
+    "tts",
+    "save_session",
+)
+
+# LLM calls take seconds, the local stages milliseconds
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class _NoOpMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def time(self):
+        return nullcontext()
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram(
+        "chat_stage_seconds", "Time spent in each stage of a chat turn", ["stage"], buckets=_BUCKETS
+    )
+    TURN_SECONDS = Histogram(
+        "chat_turn_seconds", "Time to serve a whole chat turn", ["endpoint"], buckets=_BUCKETS
+    )
+    MODEL_ROUTES = Counter(
+        "chat_model_route_total", "Replies by model route (Local-Tiny, Local-Llama, Cloud-Claude, Template, Cache)", ["model"]
+    )
+    CACHE_LOOKUPS = Counter(
+        "chat_cache_lookups_total", "Cache lookups by cache and result (hit, miss, skip)", ["cache", "result"]
+    )
+    QUALIFICATION_TRANSITIONS = Counter(
+        "lead_qualification_transitions_total", "Changes of a session's qualification status", ["from_status", "to_status"]
+    )
+    LLM_TIER_SECONDS = Histogram(
+        "llm_tier_call_seconds", "LLM call latency per routing tier", ["tier"], buckets=_BUCKETS
+    )
+    LLM_TIER_ERRORS = Counter(
+        "llm_tier_errors_total", "Failed LLM calls per routing tier", ["tier"]
+    )
+    TEMPLATE_DECISIONS = Counter(
+        "reply_template_decisions_total", "Template fast-path outcomes: template route hits and LLM fallback reasons", ["kind", "route"]
+    )
+    ADMISSION_REJECTIONS = Counter(
+        "chat_admission_rejections_total", "Chat turns refused by admission control", ["reason"]
+    )
+else:
+    STAGE_SECONDS = TURN_SECONDS = MODEL_ROUTES = CACHE_LOOKUPS = QUALIFICATION_TRANSITIONS = _NoOpMetric()
+    LLM_TIER_SECONDS = LLM_TIER_ERRORS = TEMPLATE_DECISIONS = ADMISSION_REJECTIONS = _NoOpMetric()
+
+@contextmanager
+def stage(name: str):
+    """
+    Times the enclosed block into chat_stage_seconds{stage=name}.
+    Works in async code too: only wall time between enter and exit is measured.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+def record_route(model: str):
+    MODEL_ROUTES.labels(model).inc()
+
+def record_cache(cache: str, result: str):
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+def record_transition(before, after):
+    before, after = getattr(before, "value", before), getattr(after, "value", after)
+    if before != after:
+        QUALIFICATION_TRANSITIONS.labels(str(before), str(after)).inc()
+
+def render() -> Tuple[bytes, str]:
+    """
+    Returns (body, content type) for the /metrics endpoint. With several
+    uvicorn workers set PROMETHEUS_MULTIPROC_DIR so every worker's samples
+    are aggregated.
+    """
+    if Histogram is None:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
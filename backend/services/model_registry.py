@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config.settings import config
+from services.llm_client import OllamaClient
+from services.metrics import LLM_TIER_ERRORS, LLM_TIER_SECONDS
+
+# Tier names, as chosen by src.hybrid_router.select_model
+LOCAL_TINY = "Local-Tiny"
+LOCAL_LLAMA = "Local-Llama"
+CLOUD_CLAUDE = "Cloud-Claude"
+
+MOCK_CLOUD_REPLY = (
+    "That is a great question, and our investment advisor will go through it with you in detail. "
+    "So they can reach you, may I have your name and phone number?"
+)
+
+
+class MockCloudClient:
+    """
+    Offline stand-in for the cloud tier with the OllamaClient interface:
+    answers after a fixed latency with an Ollama-shaped response.
+    """
+    def __init__(self, model: str, latency: float = config.CLOUD_MOCK_LATENCY_SECONDS):
+        self.model = model
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._requests_total = 0
+
+    def _response(self, payload: dict) -> Dict[str, Any]:
+        with self._lock:
+            self._requests_total += 1
+        prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+        return {
+            "model": self.model,
+            "message": {"role": "assistant", "content": MOCK_CLOUD_REPLY},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(MOCK_CLOUD_REPLY.split()),
+            "total_duration": int(self.latency * 1e9),
+        }
+
+    def chat(self, payload: dict) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return self._response(payload)
+
+    async def achat(self, payload: dict) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency)
+        return self._response(payload)
+
+    async def astream(self, payload: dict) -> AsyncIterator[Dict[str, Any]]:
+        data = await self.achat(payload)
+        words = data["message"]["content"].split(" ")
+        for i, word in enumerate(words):
+            yield {"model": self.model, "message": {"role": "assistant", "content": word + (" " if i < len(words) - 1 else "")}, "done": False}
+        yield {**data, "message": {"role": "assistant", "content": ""}}
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mock": True, "latency_seconds": self.latency, "requests_total": self._requests_total}
+
+
+class ModelBackend:
+    """
+    One routing tier: the model name sent in the payload and the client that
+    serves it. client=None means the shared local Ollama client (llm_service.client).
+    """
+    def __init__(self, tier: str, model: str, client=None):
+        self.tier = tier
+        self.model = model
+        self.client = client
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.seconds_total = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        LLM_TIER_SECONDS.labels(self.tier).observe(seconds)
+        if not ok:
+            LLM_TIER_ERRORS.labels(self.tier).inc()
+        with self._lock:
+            self.calls += 1
+            self.seconds_total += seconds
+            if not ok:
+                self.failures += 1
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": self.model,
+                "calls": self.calls,
+                "failures": self.failures,
+                "fallbacks": self.fallbacks,
+                "avg_seconds": round(self.seconds_total / self.calls, 4) if self.calls else 0.0,
+                "client": self.client.stats() if self.client is not None else "shared",
+            }
+
+
+class ModelRegistry:
+    """
+    Tier name -> ModelBackend. The model is chosen per request and passed down
+    to the call, so no shared state changes between requests. Unknown or
+    disabled tiers resolve to the default tier.
+    """
+    def __init__(self, default_tier: str = LOCAL_LLAMA):
+        self.default_tier = default_tier
+        self._backends: Dict[str, ModelBackend] = {}
+
+    def register(self, backend: ModelBackend):
+        self._backends[backend.tier] = backend
+
+    def get(self, tier: Optional[str]) -> ModelBackend:
+        return self._backends.get(tier) or self._backends[self.default_tier]
+
+    @property
+    def default(self) -> ModelBackend:
+        return self._backends[self.default_tier]
+
+    def local_models(self) -> List[str]:
+        """Models served by the shared Ollama client (the ones worth preloading)."""
+        return [backend.model for backend in self._backends.values() if backend.client is None]
+
+    async def aclose(self):
+        # Shared-client tiers are closed by llm_service
+        for backend in self._backends.values():
+            if backend.client is not None:
+                await backend.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {tier: backend.stats() for tier, backend in self._backends.items()}
+
+
+def build_registry() -> ModelRegistry:
+    registry = ModelRegistry(LOCAL_LLAMA)
+    registry.register(ModelBackend(LOCAL_LLAMA, config.MODEL_NAME))
+    # Same Ollama server (and concurrency limit) as the default model
+    if config.TINY_MODEL_NAME:
+        registry.register(ModelBackend(LOCAL_TINY, config.TINY_MODEL_NAME))
+    # Any Ollama-compatible endpoint, or the in-process mock
+    if config.CLOUD_MODEL_BASE_URL:
+        cloud_client = OllamaClient(config.CLOUD_MODEL_BASE_URL)
+    else:
+        cloud_client = MockCloudClient(config.CLOUD_MODEL_NAME)
+    registry.register(ModelBackend(CLOUD_CLAUDE, config.CLOUD_MODEL_NAME, cloud_client))
+    return registry
+
+model_registry = build_registry()
@@ -0,0 +1,459 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    ordering_key TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    locked_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_ordering ON outbox (ordering_key, status);
+CREATE INDEX IF NOT EXISTS idx_outbox_retention ON outbox (status, updated_at);
+"""
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+# Rows per retention DELETE, so a sweep never holds the write lock for long
+SWEEP_CHUNK = 2000
+
+class OutboxJob:
+    """
+    A side effect to run later. `idempotency_key` makes enqueueing the same
+    effect twice a no-op; jobs sharing an `ordering_key` never run
+    concurrently, and a newer pending job replaces an older pending one
+    when `supersede` is set (e.g. the latest CRM snapshot of a lead).
+    """
+    def __init__(self, kind: str, payload: Dict[str, Any], idempotency_key: str,
+                 ordering_key: Optional[str] = None, supersede: bool = False):
+        self.kind = kind
+        self.payload = payload
+        self.idempotency_key = idempotency_key
+        self.ordering_key = ordering_key
+        self.supersede = supersede
+
+class _Buffer:
+    # Jobs whose handler only buffered their writes, kept claimed until `flush` commits them
+    def __init__(self, flush: Callable[[], Any], due: Callable[[], bool]):
+        self.flush = flush
+        self.due = due
+        self.jobs: List[Tuple[int, str, str, int]] = []
+        self.since: Optional[float] = None # When the oldest waiting job was buffered
+        self.lock = threading.Lock()
+
+class Outbox:
+    """
+    Durable, SQLite-backed outbox for side effects (notifications, CRM writes).
+
+    The request path pays for one local insert; a pool of worker threads
+    claims due jobs under a lease, runs the registered handler and retries
+    failures with exponential backoff until `max_attempts`, after which the
+    job is parked as 'dead'. Several processes can share the database file.
+    Finished rows are swept by the workers (see sweep()).
+    """
+    def __init__(
+        self,
+        db_path: str = config.OUTBOX_DB_PATH,
+        workers: int = config.OUTBOX_WORKERS,
+        max_attempts: int = config.OUTBOX_MAX_ATTEMPTS,
+        backoff_base: float = config.OUTBOX_BACKOFF_BASE_SECONDS,
+        backoff_max: float = config.OUTBOX_BACKOFF_MAX_SECONDS,
+        lease_seconds: float = config.OUTBOX_LEASE_SECONDS,
+        poll_interval: float = config.OUTBOX_POLL_SECONDS,
+        batch_size: int = config.OUTBOX_BATCH_SIZE,
+        done_retention: float = config.OUTBOX_DONE_RETENTION_MINUTES * 60,
+        dead_retention: float = config.OUTBOX_DEAD_RETENTION_DAYS * 86400,
+        dead_max_rows: int = config.OUTBOX_DEAD_MAX_ROWS,
+        sweep_interval: float = config.OUTBOX_SWEEP_INTERVAL_SECONDS
+    ):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.done_retention = done_retention
+        self.dead_retention = dead_retention
+        self.dead_max_rows = dead_max_rows
+        self.sweep_interval = sweep_interval
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._batch_handlers: Dict[str, Callable[[List[Dict[str, Any]]], None]] = {}
+        self._ticks: List[Callable[[], Any]] = []
+        self._buffers: Dict[str, _Buffer] = {}
+        self._buffered_kinds: Dict[str, str] = {}
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.succeeded = 0
+        self.failed = 0
+        self.dead = 0
+        self.swept = 0
+        self._last_sweep = time.time() # The first sweep waits one interval, not at startup
+
+        self._conn().executescript(SCHEMA)
+
+    # --- storage ---
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Truncate the WAL file back to this size after checkpoints
+            conn.execute("PRAGMA journal_size_limit=67108864")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- producer API ---
+
+    def register(self, kind: str, handler: Callable, batch: bool = False, buffer: Optional[str] = None):
+        """
+        Registers the handler for a job kind. Handlers must raise on failure.
+        A batch handler receives the payloads of every claimed job of its kind
+        at once (for bulk writes); they succeed or are retried together.
+        With `buffer` (see add_buffer) the batch handler only buffers its
+        writes and the jobs are done when that buffer is flushed.
+        """
+        if batch:
+            self._batch_handlers[kind] = handler
+        else:
+            self._handlers[kind] = handler
+        if buffer is not None:
+            if not batch or buffer not in self._buffers:
+                raise ValueError(f"Outbox kind '{kind}': buffer '{buffer}' needs batch=True and add_buffer() first")
+            self._buffered_kinds[kind] = buffer
+
+    def add_buffer(self, name: str, flush: Callable[[], Any], due: Callable[[], bool]):
+        """
+        Registers a write buffer shared by several job kinds (e.g. the CRM
+        tables). Their jobs stay claimed after the handler ran and are marked
+        done, or retried, by the next `flush()`, which runs when `due()` says
+        so, when the oldest job has waited half the lease, and on drain()/stop().
+        Writes of every kind and every claim in between go out together.
+        """
+        self._buffers[name] = _Buffer(flush, due)
+
+    def add_tick(self, fn: Callable[[], Any]):
+        """
+        Registers a callable each worker runs after every poll (e.g. time-based flushes).
+        """
+        self._ticks.append(fn)
+
+    def enqueue_many(self, jobs: List[OutboxJob]) -> int:
+        """
+        Stores the jobs in one local transaction. Returns how many were new.
+        """
+        if not jobs:
+            return 0
+        now = time.time()
+        inserted = 0
+        with self._transaction() as conn:
+            for job in jobs:
+                if job.supersede and job.ordering_key:
+                    conn.execute(
+                        "DELETE FROM outbox WHERE ordering_key = ? AND kind = ? AND status = ? AND idempotency_key != ?",
+                        (job.ordering_key, job.kind, PENDING, job.idempotency_key)
+                    )
+                cursor = conn.execute(
+                    """
+                    INSERT OR IGNORE INTO outbox
+                        (idempotency_key, kind, payload, ordering_key, status, attempts, next_attempt_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)
+                    """,
+                    (job.idempotency_key, job.kind, json.dumps(job.payload, default=str),
+                     job.ordering_key, PENDING, now, now, now)
+                )
+                inserted += cursor.rowcount
+        if inserted:
+            self._wake.set()
+        return inserted
+
+    def enqueue(self, job: OutboxJob) -> int:
+        return self.enqueue_many([job])
+
+    # --- consumer side ---
+
+    def _claim(self, limit: int) -> List[Tuple[int, str, str, int]]:
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, kind, payload, attempts, ordering_key FROM outbox o
+                WHERE ((o.status = ? AND o.next_attempt_at <= ?) OR (o.status = ? AND o.locked_until < ?))
+                  AND (o.ordering_key IS NULL OR NOT EXISTS (
+                        SELECT 1 FROM outbox r
+                        WHERE r.ordering_key = o.ordering_key AND r.status = ? AND r.locked_until >= ? AND r.id != o.id))
+                ORDER BY o.id
+                LIMIT ?
+                """,
+                (PENDING, now, RUNNING, now, RUNNING, now, limit)
+            ).fetchall()
+            # One job per ordering key per claim keeps same-key jobs in order
+            seen, claimed = set(), []
+            for job_id, kind, payload, attempts, ordering in rows:
+                if ordering is not None:
+                    if ordering in seen:
+                        continue
+                    seen.add(ordering)
+                claimed.append((job_id, kind, payload, attempts))
+            conn.executemany(
+                "UPDATE outbox SET status = ?, locked_until = ?, updated_at = ? WHERE id = ?",
+                [(RUNNING, now + self.lease_seconds, now, row[0]) for row in claimed]
+            )
+        return claimed
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2) # jitter, so retries of a burst spread out
+
+    def _finish(self, job_id: int, attempts: int, error: Optional[str]):
+        now = time.time()
+        with self._transaction() as conn:
+            if error is None:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, locked_until = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+                    (DONE, attempts, now, job_id)
+                )
+            elif attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, locked_until = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                    (DEAD, attempts, error, now, job_id)
+                )
+            else:
+                conn.execute(
+                    """
+                    UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, locked_until = NULL,
+                        last_error = ?, updated_at = ? WHERE id = ?
+                    """,
+                    (PENDING, attempts, now + self._backoff(attempts), error, now, job_id)
+                )
+
+    def _complete(self, jobs: List[Tuple[int, str, str, int]], error: Optional[str]):
+        for job_id, kind, _, attempts in jobs:
+            attempts += 1
+            if error is not None:
+                print(f"❌ Outbox job {job_id} ({kind}) attempt {attempts} failed: {error}")
+            self._finish(job_id, attempts, error)
+            with self._lock:
+                if error is None:
+                    self.succeeded += 1
+                elif attempts >= self.max_attempts:
+                    self.dead += 1
+                else:
+                    self.failed += 1
+
+    def _execute(self, jobs: List[Tuple[int, str, str, int]], fn: Callable[[], Any], buffer: Optional[_Buffer] = None):
+        try:
+            fn()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if buffer is not None and error is None:
+            with buffer.lock:
+                buffer.jobs.extend(jobs)
+                if buffer.since is None:
+                    buffer.since = time.time()
+            return
+        self._complete(jobs, error)
+
+    def _flush_buffers(self, force: bool = False):
+        for buffer in self._buffers.values():
+            with buffer.lock:
+                if not buffer.jobs:
+                    continue
+                # Well inside the lease, so no other worker claims the jobs again meanwhile
+                waited = time.time() - buffer.since >= self.lease_seconds / 2
+                if not (force or waited or buffer.due()):
+                    continue
+                # Every job taken here finished buffering, so this flush carries its writes
+                jobs, buffer.jobs, buffer.since = buffer.jobs, [], None
+            try:
+                buffer.flush()
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self._complete(jobs, error)
+
+    def _call(self, kind: str, payload: str):
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise LookupError(f"No outbox handler registered for '{kind}'")
+        handler(json.loads(payload))
+
+    def run_once(self, limit: Optional[int] = None) -> int:
+        """
+        Claims and runs one batch of due jobs. Returns how many were processed.
+        """
+        claimed = self._claim(limit or self.batch_size)
+        batches: Dict[str, List[Tuple[int, str, str, int]]] = {}
+        for job in claimed:
+            kind, payload = job[1], job[2]
+            if kind in self._batch_handlers:
+                batches.setdefault(kind, []).append(job)
+            else:
+                self._execute([job], lambda: self._call(kind, payload))
+        for kind, jobs in batches.items():
+            handler = self._batch_handlers[kind]
+            buffer = self._buffers.get(self._buffered_kinds.get(kind))
+            self._execute(jobs, lambda: handler([json.loads(job[2]) for job in jobs]), buffer)
+        self._flush_buffers()
+        return len(claimed)
+
+    # --- retention ---
+
+    def _delete_chunks(self, where: str, params: tuple) -> int:
+        deleted = 0
+        while True:
+            with self._transaction() as conn:
+                n = conn.execute(
+                    f"DELETE FROM outbox WHERE id IN (SELECT id FROM outbox WHERE {where} LIMIT ?)",
+                    params + (SWEEP_CHUNK,)
+                ).rowcount
+            deleted += n
+            if n < SWEEP_CHUNK:
+                return deleted
+
+    def sweep(self) -> int:
+        """
+        Deletes finished rows, which otherwise grow without bound (CRM
+        payloads carry the message window). 'done' rows go after
+        `done_retention` seconds, except jobs without an ordering key (the
+        once-per-session notifications): their row is the record that stops a
+        second send, so it is kept with an empty payload. 'dead' rows go after
+        `dead_retention` seconds, and beyond the newest `dead_max_rows`.
+        Returns the number of rows deleted.
+        """
+        now = time.time()
+        deleted = self._delete_chunks(
+            "status = ? AND updated_at < ? AND ordering_key IS NOT NULL", (DONE, now - self.done_retention)
+        )
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE outbox SET payload = '{}' WHERE status = ? AND updated_at < ? AND ordering_key IS NULL AND payload != '{}'",
+                (DONE, now - self.done_retention)
+            )
+        deleted += self._delete_chunks("status = ? AND updated_at < ?", (DEAD, now - self.dead_retention))
+        row = self._conn().execute(
+            "SELECT id FROM outbox WHERE status = ? ORDER BY id DESC LIMIT 1 OFFSET ?", (DEAD, self.dead_max_rows)
+        ).fetchone()
+        if row is not None:
+            deleted += self._delete_chunks("status = ? AND id <= ?", (DEAD, row[0]))
+        with self._lock:
+            self.swept += deleted
+        if deleted:
+            print(f"🧹 Outbox: swept {deleted} finished jobs")
+        return deleted
+
+    def _maybe_sweep(self):
+        with self._lock:
+            if time.time() - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = time.time()
+        try:
+            self.sweep()
+        except sqlite3.Error as e:
+            print(f"Outbox sweep error: {e}")
+
+    def _tick(self):
+        for fn in self._ticks:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Outbox tick error: {e}")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except sqlite3.Error as e:
+                print(f"Outbox worker error: {e}")
+                processed = 0
+            self._tick()
+            self._maybe_sweep()
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._flush_buffers(force=True)
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """
+        Runs due jobs inline until none are left (retries that are not yet due
+        are left alone). Returns True if nothing due remains.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self.run_once():
+                self._flush_buffers(force=True)
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self._conn().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        with self._lock:
+            return {
+                "pending": counts.get(PENDING, 0),
+                "running": counts.get(RUNNING, 0),
+                "done": counts.get(DONE, 0),
+                "dead": counts.get(DEAD, 0),
+                "succeeded": self.succeeded,
+                "retried": self.failed,
+                "dead_lettered": self.dead,
+                "buffered": sum(len(b.jobs) for b in self._buffers.values()),
+                "swept": self.swept,
+                "workers": len(self._threads)
+            }
+
+outbox = Outbox()
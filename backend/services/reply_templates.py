@@ -0,0 +1,214 @@
+import re
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from config.settings import config
+from models.schemas import LeadProfile
+from services.metrics import TEMPLATE_DECISIONS
+
+# Profile fields a user message can fill; a change in any of them is progress
+PROGRESS_FIELDS = (
+    "name", "phone_number", "email", "property_type", "budget_range",
+    "target_location", "bedrooms", "investment_type", "urgency"
+)
+
+# One localized reply per route. {name} and {phone} come from the profile.
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "greeting": "Hello and welcome to Everest View Property! May I have your name, please?",
+        "ask_name": "Thank you! May I have your name, please?",
+        "ask_phone": "Thanks, {name}! What is the best phone number to reach you on?",
+        "ask_property": "Great, {name}. What kind of property are you looking for: an apartment, a villa or a townhouse?",
+        "ask_budget": "And what budget do you have in mind for this property?",
+        "complete": "Thank you, {name}! Our sales team will call you shortly on {phone} with matching options.",
+    },
+    "ar": {
+        "greeting": "مرحباً بك في إيفرست فيو العقارية! هل يمكنني معرفة اسمك من فضلك؟",
+        "ask_name": "شكراً لك! هل يمكنني معرفة اسمك من فضلك؟",
+        "ask_phone": "شكراً {name}! ما هو أفضل رقم هاتف للتواصل معك؟",
+        "ask_property": "رائع يا {name}. ما نوع العقار الذي تبحث عنه: شقة، فيلا أم تاون هاوس؟",
+        "ask_budget": "وما هي الميزانية التي تفكر بها لهذا العقار؟",
+        "complete": "شكراً {name}! سيتصل بك فريق المبيعات قريباً على الرقم {phone} بخيارات مناسبة.",
+    },
+    "fr": {
+        "greeting": "Bonjour et bienvenue chez Everest View Property ! Puis-je avoir votre nom, s'il vous plaît ?",
+        "ask_name": "Merci ! Puis-je avoir votre nom, s'il vous plaît ?",
+        "ask_phone": "Merci, {name} ! Quel est le meilleur numéro pour vous joindre ?",
+        "ask_property": "Parfait, {name}. Quel type de bien recherchez-vous : un appartement, une villa ou une maison de ville ?",
+        "ask_budget": "Et quel budget envisagez-vous pour ce bien ?",
+        "complete": "Merci, {name} ! Notre équipe commerciale vous appellera très bientôt au {phone} avec des biens correspondants.",
+    },
+    "es": {
+        "greeting": "¡Hola y bienvenido a Everest View Property! ¿Me puede decir su nombre, por favor?",
+        "ask_name": "¡Gracias! ¿Me puede decir su nombre, por favor?",
+        "ask_phone": "¡Gracias, {name}! ¿Cuál es el mejor número de teléfono para contactarle?",
+        "ask_property": "Perfecto, {name}. ¿Qué tipo de propiedad busca: un apartamento, una villa o una casa adosada?",
+        "ask_budget": "¿Y qué presupuesto tiene en mente para esta propiedad?",
+        "complete": "¡Gracias, {name}! Nuestro equipo de ventas le llamará en breve al {phone} con opciones que encajen.",
+    },
+}
+
+# The routes that address the lead, without the name, for a name we should not say
+NAMELESS_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "ask_phone": "Thank you! What is the best phone number to reach you on?",
+        "ask_property": "Great. What kind of property are you looking for: an apartment, a villa or a townhouse?",
+        "complete": "Thank you! Our sales team will call you shortly on {phone} with matching options.",
+    },
+    "ar": {
+        "ask_phone": "شكراً لك! ما هو أفضل رقم هاتف للتواصل معك؟",
+        "ask_property": "رائع. ما نوع العقار الذي تبحث عنه: شقة، فيلا أم تاون هاوس؟",
+        "complete": "شكراً لك! سيتصل بك فريق المبيعات قريباً على الرقم {phone} بخيارات مناسبة.",
+    },
+    "fr": {
+        "ask_phone": "Merci ! Quel est le meilleur numéro pour vous joindre ?",
+        "ask_property": "Parfait. Quel type de bien recherchez-vous : un appartement, une villa ou une maison de ville ?",
+        "complete": "Merci ! Notre équipe commerciale vous appellera très bientôt au {phone} avec des biens correspondants.",
+    },
+    "es": {
+        "ask_phone": "¡Gracias! ¿Cuál es el mejor número de teléfono para contactarle?",
+        "ask_property": "Perfecto. ¿Qué tipo de propiedad busca: un apartamento, una villa o una casa adosada?",
+        "complete": "¡Gracias! Nuestro equipo de ventas le llamará en breve al {phone} con opciones que encajen.",
+    },
+}
+
+ROUTES = tuple(TEMPLATES["en"])
+
+# Words the "i am ..." name pattern picks up from ordinary sentences
+# ("I am looking for a villa" -> "Looking For", "I am ok" -> "Ok")
+_NOT_NAME_WORDS = frozenset("""
+a an the in on at to for of from with about after by into
+looking interested searching buying selling renting investing planning thinking trying hoping
+wanting going moving calling writing waiting asking
+ok okay fine good great well alright sure glad happy here just not also still very
+really so ready new back currently keen open available busy free done investor buyer
+""".split())
+
+# Questions go to the LLM: a question mark, or a leading question word (en/ar/fr/es)
+_QUESTION_WORDS = re.compile(
+    r"^\s*(what|how|when|where|which|why|who|can|could|do|does|is|are|will|would|should"
+    r"|ما|ماذا|كيف|هل|متى|أين|لماذا|كم"
+    r"|quel|quelle|quels|quelles|comment|combien|pourquoi|où|est-ce"
+    r"|qué|que|cómo|cuánto|cuánta|dónde|cuál|por qué|puedo|puede)\b",
+    re.IGNORECASE
+)
+
+
+def fixed_replies(routes: Optional[Iterable[str]] = None) -> Set[Tuple[str, str]]:
+    """
+    (language, text) of every template reply without placeholders, i.e. the
+    ones spoken word for word (TTS cache warming). `routes` limits it to those routes.
+    """
+    routes = set(ROUTES if routes is None else routes)
+    return {
+        (lang, text)
+        for table in (TEMPLATES, NAMELESS_TEMPLATES)
+        for lang, templates in table.items()
+        for route, text in templates.items()
+        if route in routes and "{" not in text
+    }
+
+
+def addressable_name(name: Optional[str]) -> Optional[str]:
+    """
+    The profile name if it is safe to address the lead with it, None if any
+    of its words is a common word rather than a name.
+    """
+    if not name or any(word in _NOT_NAME_WORDS for word in name.lower().split()):
+        return None
+    return name
+
+
+class ReplyTemplateEngine:
+    """
+    Rule-based replies for plain slot-filling turns. When the user just gave
+    a detail (or only said hello/thanks) and the next step is to ask for the
+    next missing slot (name -> phone -> property type -> budget), the reply is
+    a localized template; questions, escalated turns and messages that added
+    nothing go to the LLM. Every route can be switched off, and hits per route
+    and LLM fallbacks per reason are counted.
+    """
+    def __init__(self, routes=config.REPLY_TEMPLATE_ROUTES):
+        self.routes = {r.strip() for r in routes.split(",") if r.strip()} if isinstance(routes, str) else set(routes)
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {route: 0 for route in ROUTES}
+        self.misses: Dict[str, int] = {}
+
+    @staticmethod
+    def is_question(message: str) -> bool:
+        return "?" in message or "؟" in message or bool(_QUESTION_WORDS.match(message))
+
+    @staticmethod
+    def next_route(before: LeadProfile, after: LeadProfile, first_turn: bool) -> Optional[str]:
+        # A name the pattern mistook ("Looking For") leaves the slot open, so the
+        # lead is still asked and "my name is ..." replaces it
+        if not addressable_name(after.name):
+            return "greeting" if first_turn else "ask_name"
+        if not after.phone_number:
+            return "ask_phone"
+        if not after.property_type:
+            return "ask_property"
+        if not after.budget_range:
+            return "ask_budget"
+        if not (addressable_name(before.name) and before.phone_number and before.property_type and before.budget_range):
+            return "complete" # Only on the turn that completes the profile
+        return None
+
+    def _miss(self, reason: str) -> None:
+        with self._lock:
+            self.misses[reason] = self.misses.get(reason, 0) + 1
+        TEMPLATE_DECISIONS.labels("llm", reason).inc()
+        return None
+
+    def reply(
+        self,
+        message: str,
+        before: LeadProfile,
+        after: LeadProfile,
+        language: str = "en",
+        escalated: bool = False,
+        small_talk: bool = False,
+        first_turn: bool = False
+    ) -> Optional[str]:
+        """
+        Returns the template reply for this turn, or None when the LLM should answer.
+        `before` is the profile ahead of this turn, `after` an extracted copy.
+        """
+        if escalated:
+            return self._miss("complex")
+        if self.is_question(message):
+            return self._miss("question")
+        progressed = any(getattr(before, f) != getattr(after, f) for f in PROGRESS_FIELDS)
+        if not progressed and not small_talk:
+            return self._miss("open_ended")
+        route = self.next_route(before, after, first_turn)
+        if route is None:
+            return self._miss("profile_complete")
+        if route not in self.routes:
+            return self._miss("route_off")
+
+        lang = (language or "en").split("-")[0].lower()
+        if lang not in TEMPLATES:
+            lang = "en"
+        name = addressable_name(after.name)
+        template = TEMPLATES[lang][route]
+        if name is None and "{name}" in template:
+            template = NAMELESS_TEMPLATES[lang][route]
+        with self._lock:
+            self.hits[route] += 1
+        TEMPLATE_DECISIONS.labels("template", route).inc()
+        return template.format(name=name or "", phone=after.phone_number or "")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + sum(self.misses.values())
+            return {
+                "routes_enabled": sorted(self.routes),
+                "hits": dict(self.hits),
+                "llm_fallbacks": dict(self.misses),
+                "template_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+
+reply_templates = ReplyTemplateEngine() if config.REPLY_TEMPLATES_ENABLED else None
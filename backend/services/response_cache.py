@@ -0,0 +1,259 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config.settings import config
+from models.schemas import LeadProfile
+from services.llm_service import FALLBACK_REPLY
+from services.metrics import record_cache
+
+_WHITESPACE = re.compile(r"\s+")
+# Personal data in the user message (digits, emails) makes a reply session-specific
+_PERSONAL = re.compile(r"[\d@]")
+_NON_DIGITS = re.compile(r"\D")
+# Profile values a reply must not quote to be shared: everything the lead told us
+_PROFILE_VALUE_FIELDS = [f for f, info in LeadProfile.model_fields.items()
+                         if info.annotation == Optional[str] and f != "language_preference"]
+
+
+def mentions_profile(reply: str, profile: LeadProfile) -> bool:
+    """
+    Whether the reply quotes any value of the lead's profile (name, phone,
+    email, budget, location, ...), as a whole word, case-insensitively;
+    phone numbers also match when formatted differently.
+    """
+    reply_digits = None
+    for field in _PROFILE_VALUE_FIELDS:
+        value = (getattr(profile, field) or "").strip()
+        if not value:
+            continue
+        if re.search(rf"(?<!\w){re.escape(value)}(?!\w)", reply, re.IGNORECASE):
+            return True
+        digits = _NON_DIGITS.sub("", value)
+        if len(digits) >= 7:
+            if reply_digits is None:
+                reply_digits = _NON_DIGITS.sub("", reply)
+            if digits in reply_digits:
+                return True
+    return False
+
+
+def normalize_text(text: str) -> str:
+    """
+    Case-, whitespace- and punctuation-insensitive form of a message:
+    "Hi!!", " hi " and "HI." all normalize to "hi".
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = "".join(" " if unicodedata.category(c).startswith("P") else c for c in text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class MemoryResponseCacheBackend:
+    """Per-process LRU with expiry."""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteResponseCacheBackend:
+    """
+    File-backed cache shared by every worker on the host. Expired rows are
+    ignored on read and trimmed, with LRU eviction, every `trim_every` writes.
+    """
+    def __init__(self, db_path: str, max_entries: int, trim_every: int = 100):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM response_cache WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE response_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: float):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl_seconds, now)
+        )
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % self.trim_every == 0
+        if trim:
+            self.trim()
+
+    def trim(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            overflow = conn.execute(
+                """
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.evictions += expired + overflow
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Reply cache keyed on the session-independent context of a turn.
+
+    The key combines the normalized user message, the normalized previous
+    assistant message, the language and which contact/requirement slots are
+    already filled, so "Hi!" on a fresh session hits no matter who sends it.
+    Turns that carry personal data are neither looked up nor stored, and
+    replies that quote any of the lead's profile values are not stored.
+    """
+    def __init__(self, backend, ttl_seconds: float = config.RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.skipped = 0
+        self.refused_personal = 0
+
+    @staticmethod
+    def slot_mask(profile: LeadProfile) -> str:
+        slots = [profile.name, profile.phone_number, profile.property_type, profile.budget_range]
+        return "".join("1" if s else "0" for s in slots)
+
+    def make_key(self, user_message: str, last_assistant_msg: str, language: str, profile: LeadProfile) -> str:
+        raw = json.dumps([
+            normalize_text(user_message),
+            normalize_text(last_assistant_msg),
+            (language or "en").lower(),
+            self.slot_mask(profile)
+        ], ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable_message(user_message: str) -> bool:
+        return not _PERSONAL.search(user_message)
+
+    def get(self, user_message: str, last_assistant_msg: str, language: str, profile: LeadProfile) -> Optional[str]:
+        if not self.is_cacheable_message(user_message):
+            with self._lock:
+                self.skipped += 1
+            record_cache("response", "skip")
+            return None
+        reply = self.backend.get(self.make_key(user_message, last_assistant_msg, language, profile))
+        with self._lock:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache("response", "miss" if reply is None else "hit")
+        return reply
+
+    def set(self, user_message: str, last_assistant_msg: str, language: str, profile: LeadProfile, reply: str):
+        # Never pin an outage reply, and never store replies that address the lead personally
+        if not reply or reply == FALLBACK_REPLY or not self.is_cacheable_message(user_message):
+            return
+        if mentions_profile(reply, profile):
+            with self._lock:
+                self.refused_personal += 1
+            return
+        self.backend.set(self.make_key(user_message, last_assistant_msg, language, profile), reply, self.ttl_seconds)
+        with self._lock:
+            self.sets += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "size": self.backend.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "skipped_personal": self.skipped,
+                "refused_personal_replies": self.refused_personal,
+                "sets": self.sets,
+                "evictions": self.backend.evictions
+            }
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    if config.RESPONSE_CACHE_BACKEND == "memory":
+        return ResponseCache(MemoryResponseCacheBackend(config.RESPONSE_CACHE_MAX_ENTRIES))
+    if config.RESPONSE_CACHE_BACKEND == "sqlite":
+        return ResponseCache(SQLiteResponseCacheBackend(config.RESPONSE_CACHE_SQLITE_PATH, config.RESPONSE_CACHE_MAX_ENTRIES))
+    print("Response cache disabled.")
+    return None
+
+response_cache = build_response_cache()
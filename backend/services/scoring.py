@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from config.settings import config
+from services.lazy import Lazy
+
+# Lead score weights, read from LEAD_SCORING_WEIGHTS_PATH (JSON) and reloaded
+# when the file changes. Used by LeadExtractionService.calculate_lead_score
+# (one profile per turn) and by services.lead_ranking (whole pipeline in one
+# NumPy pass, /admin/leads/rank); both must give the same score.
+
+# Profile fields worth `filled_field` points each when set
+FILLED_FIELDS = (
+    "investment_type", "budget_range", "property_type", "bedrooms",
+    "target_location", "name", "phone_number", "email"
+)
+
+
+class _Weights(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class FilledFieldWeights(_Weights):
+    investment_type: int = 10
+    budget_range: int = 10
+    property_type: int = 10
+    bedrooms: int = 10
+    target_location: int = 10
+    name: int = 10
+    phone_number: int = 10
+    email: int = 10
+
+
+class ContactWeights(_Weights):
+    name: int = 20
+    phone_number: int = 40
+
+
+class ScoringWeights(_Weights):
+    """
+    Points per signal; the defaults are the original hard-coded weights.
+    """
+    filled_field: FilledFieldWeights = FilledFieldWeights()
+    large_budget: int = 30 # budget_range mentions "m"/"million"
+    high_urgency: int = 20 # urgency == "High"
+    contact: ContactWeights = ContactWeights() # On top of filled_field
+
+    def merged(self, overrides: Optional[Dict[str, Any]]) -> "ScoringWeights":
+        """
+        These weights with `overrides` (same shape, any subset) applied; raises ValueError.
+        """
+        doc = self.model_dump()
+        for key, value in (overrides or {}).items():
+            if isinstance(value, dict) and isinstance(doc.get(key), dict):
+                doc[key] = {**doc[key], **value}
+            else:
+                doc[key] = value
+        return ScoringWeights.model_validate(doc) # pydantic's ValidationError is a ValueError
+
+
+class _WeightsFile:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._weights = ScoringWeights()
+
+    def get(self) -> ScoringWeights:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return self._weights
+        with self._lock:
+            if mtime != self._mtime:
+                self._weights = self._load(mtime)
+                self._mtime = mtime
+        return self._weights
+
+    def _load(self, mtime) -> ScoringWeights:
+        if mtime is None:
+            print(f"⚠️ {self.path} not found, using the built-in lead score weights")
+            return ScoringWeights()
+        try:
+            with open(self.path, "r") as f:
+                weights = ScoringWeights.model_validate(json.load(f))
+            print(f"⚖️ Lead score weights loaded from {self.path}")
+            return weights
+        except (OSError, ValueError) as e:
+            # Keep scoring with the last good weights rather than failing turns
+            print(f"⚠️ Invalid lead score weights in {self.path}, keeping the previous ones: {e}")
+            return self._weights
+
+
+_weights_file = _WeightsFile(config.LEAD_SCORING_WEIGHTS_PATH)
+
+
+def scoring_weights() -> ScoringWeights:
+    """The current weights (re-read when the file's mtime changes)."""
+    return _weights_file.get()
+
+
+def build_lead_ranker():
+    # NumPy is only loaded when ranking is first used (or by the startup warmup)
+    from services.lead_index import lead_index
+    from services.lead_ranking import LeadRanker
+    return LeadRanker(lead_index)
+
+
+lead_ranker = Lazy("lead_ranker", build_lead_ranker)
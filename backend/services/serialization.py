@@ -0,0 +1,156 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import config
+from models.schemas import Session
+
+# Session (de)serialization without round trips.
+#
+# Writes: model_dump(mode="json") gives the JSON-safe dict directly, instead
+# of session.json() followed by json.loads().
+# Reads: one model_validate pass over the stored dict. With pydantic v2 the
+# validator runs in pydantic-core, which is faster than model_construct
+# (pure Python) for the same document, so validation is kept on reads from
+# our own stores as well (see benchmarks/bench_serialization.py).
+# Storage: orjson when installed, otherwise compact JSON (no indentation).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def session_from_doc(doc: Dict[str, Any]) -> Session:
+    """Builds a Session from a stored document (Mongo's _id is ignored)."""
+    if "_id" in doc:
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+    session = Session.model_validate(doc)
+    if "messages" in doc and "message_count" in doc:
+        mark_synced(session, doc["message_count"], session.message_count)
+    return session
+
+
+def session_to_doc(session: Session) -> Dict[str, Any]:
+    """The JSON-safe dict written to every store (same shape as json.loads(session.json()))."""
+    return session.model_dump(mode="json")
+
+
+def window_start(message_count: int, summarized_count: int, window: int = config.SESSION_MESSAGE_WINDOW) -> int:
+    """
+    Position of the first message loaded with a session: the last `window`
+    messages, extended back so everything not yet summarized is included.
+    """
+    return max(0, min(summarized_count, message_count - window))
+
+
+def sync_base(session: Session) -> Optional[Tuple[int, int]]:
+    """
+    (stored message_count, session.message_count) as of the last read or
+    write of this copy, None if it never came from a store.
+    """
+    return session._sync
+
+
+def mark_synced(session: Session, stored_count: int, local_count: int):
+    session._sync = (stored_count, local_count)
+
+
+def trim_to_window(session: Session, window: int = config.SESSION_MESSAGE_WINDOW) -> int:
+    """
+    Drops the messages a fresh read of the session would not load (before
+    window_start), so a long-lived in-memory copy stays as small as a loaded
+    one. Messages not yet written to the store are always kept. Returns how
+    many were dropped.
+    """
+    base = sync_base(session)
+    if base is None:
+        return 0
+    start = min(window_start(session.message_count, session.summarized_count, window), base[1])
+    drop = start - session.message_offset
+    if drop <= 0:
+        return 0
+    del session.messages[:drop]
+    session.message_offset = start
+    return drop
+
+
+def is_stale(base: Optional[Tuple[int, int]], stored_count: int) -> bool:
+    """
+    Whether a copy synced at `base` misses messages another writer stored:
+    the store moved on since, or an earlier save already had to append after
+    someone else's messages.
+    """
+    return base is not None and (stored_count != base[0] or base[0] != base[1])
+
+
+def split_session_doc(
+    doc: Dict[str, Any], stored_count: int, base: Optional[Tuple[int, int]] = None
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Splits a session_to_doc() dict into the header (no messages, with
+    message_count) and the messages the store does not have yet, each tagged
+    with its position `seq` in the transcript. Messages are append-only.
+
+    Without `base` the doc's positions are taken as the stored ones. With the
+    copy's sync_base(), the messages it added since are appended after the
+    `stored_count` messages, even if another writer saved some in between.
+    """
+    offset = doc.get("message_offset", 0)
+    messages = doc.get("messages") or []
+    synced = stored_count if base is None else base[1]
+    header = {k: v for k, v in doc.items() if k not in ("messages", "message_offset")}
+    header["message_count"] = stored_count + max(0, offset + len(messages) - synced)
+    new_messages = [
+        {**m, "seq": stored_count + offset + i - synced}
+        for i, m in enumerate(messages) if offset + i >= synced
+    ]
+    return header, new_messages
+
+
+# Order in which a lead progresses; NEEDS_REVIEW is set by hand and kept
+_STATUS_RANK = {"INITIAL": 0, "DISCOVERY": 1, "QUALIFIED": 2, "NEEDS_REVIEW": 3}
+
+
+def _filled(value) -> bool:
+    return value is not None and value != ""
+
+
+def merge_stale_header(header: Dict[str, Any], stored: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The header to write for a stale copy (is_stale) instead of its own: the
+    stored profile wins and the copy only fills fields that are still empty,
+    score and status never go down, and the stored summary is kept (the
+    copy's summarized_count is in its own positions).
+    """
+    profile = dict(stored.get("lead_profile") or {})
+    for field, value in (header.get("lead_profile") or {}).items():
+        if not _filled(profile.get(field)) and _filled(value):
+            profile[field] = value
+    profile["lead_score"] = max(profile.get("lead_score") or 0, (header.get("lead_profile") or {}).get("lead_score") or 0)
+    status = max(
+        str(stored.get("qualification_status") or "INITIAL"), str(header["qualification_status"]),
+        key=lambda s: _STATUS_RANK.get(s, 0)
+    )
+    return {
+        **header,
+        "lead_profile": profile,
+        "qualification_status": status,
+        "conversation_summary": stored.get("conversation_summary"),
+        "summarized_count": stored.get("summarized_count") or 0,
+    }
+
+
+def model_to_doc(model) -> Dict[str, Any]:
+    return model.model_dump(mode="json")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes; datetimes and other non-JSON values become strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def loads(data) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
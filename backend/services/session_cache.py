@@ -0,0 +1,305 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.settings import config
+from models.schemas import Session
+from services.executor import run_blocking
+from services.firestore_service import FirestoreService, firestore_service
+from services.metrics import record_cache
+from services.serialization import sync_base, trim_to_window
+
+
+class SessionCache:
+    """
+    Bounded LRU of hydrated Session objects in front of FirestoreService.
+
+    Reads are served from memory while an entry is younger than `ttl_seconds`.
+    save_session() only marks the session dirty; dirty sessions are written
+    back in one coalesced batch every `flush_interval` seconds and on stop().
+    With flush_interval <= 0 every save is written through immediately.
+
+    The cache is per process. With a store that several workers share
+    (anything but the FILE mock), a cached copy is checked against the
+    stored message_count before each turn and read again if another worker
+    has saved the session since (`revalidate`). A copy that still goes stale
+    between that check and the flush is not overwritten: the store appends
+    its new messages after the other worker's and merges the header
+    (FirestoreService.save_sessions), and the copy is dropped from the cache.
+
+    A cached copy only keeps the message window a fresh read would load
+    (serialization.trim_to_window), so long conversations do not grow it.
+    """
+    def __init__(
+        self,
+        store: FirestoreService,
+        max_size: int = config.SESSION_CACHE_SIZE,
+        ttl_seconds: float = config.SESSION_CACHE_TTL_SECONDS,
+        flush_interval: float = config.SESSION_FLUSH_INTERVAL_SECONDS,
+        revalidate: Optional[bool] = None
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self._revalidate = revalidate
+
+        self._entries: "OrderedDict[str, Tuple[Session, float]]" = OrderedDict()
+        # Dirty sessions are tracked apart from the LRU, so eviction never drops unsaved data
+        self._dirty: Dict[str, Session] = {}
+        # Sessions being written right now; their messages must not change under the serializer
+        self._writing: Set[str] = set()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.backend_reads = 0
+        self.backend_writes = 0
+        self.flushes = 0
+        self.flushed_sessions = 0
+        self.saves = 0
+        self.stale_reloads = 0
+        self.stale_writes = 0
+        self.trimmed_messages = 0
+
+    @property
+    def revalidate(self) -> bool:
+        if self._revalidate is None:
+            # Decided on first use, the store is built lazily; the FILE mock is single-process
+            self._revalidate = config.SESSION_CACHE_REVALIDATE and self.store.mode != "FILE"
+        return self._revalidate
+
+    # --- cache bookkeeping ---
+
+    def _put(self, session: Session):
+        self._entries[session.session_id] = (session, time.monotonic())
+        self._entries.move_to_end(session.session_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, session_id: str) -> Optional[Session]:
+        session = self._lookup_locked(session_id)
+        record_cache("session", "miss" if session is None else "hit")
+        return session
+
+    def _lookup_locked(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            # Unsaved local changes are always the newest copy
+            if session_id in self._dirty:
+                session = self._dirty[session_id]
+                self._put(session)
+                self.hits += 1
+                return session
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            session, loaded_at = entry
+            if time.monotonic() - loaded_at > self.ttl_seconds:
+                del self._entries[session_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            # Saved and not being written: keep only the window a fresh read would load
+            if session_id not in self._writing:
+                self.trimmed_messages += trim_to_window(session)
+            return session
+
+    def _in_sync(self, session: Session) -> bool:
+        """
+        False if another worker saved the session since our copy was read or
+        last written (one message_count read when revalidating).
+        """
+        base = sync_base(session)
+        if base is None:
+            return True
+        if base[0] != base[1]: # An earlier flush found it stale
+            return False
+        if not self.revalidate:
+            return True
+        stored = self.store.message_count(session.session_id)
+        return stored is None or stored == base[0]
+
+    # --- public API (mirrors FirestoreService) ---
+
+    def _load(self, user_id: str, session_id: str) -> Session:
+        session = self.store.get_or_create_session(user_id, session_id)
+        with self._lock:
+            self.backend_reads += 1
+            # A concurrent save may have landed while we were reading
+            if session_id in self._dirty:
+                return self._dirty[session_id]
+            self._put(session)
+        return session
+
+    def _reload(self, user_id: str, session_id: str) -> Session:
+        # Our pending changes are written first (the store merges them), then the session is read again
+        with self._lock:
+            self.stale_reloads += 1
+            self._entries.pop(session_id, None)
+            pending = session_id in self._dirty
+        if pending:
+            self.flush()
+        return self._load(user_id, session_id)
+
+    def _checked(self, user_id: str, session_id: str, session: Session) -> Session:
+        return session if self._in_sync(session) else self._reload(user_id, session_id)
+
+    def get_or_create_session(self, user_id: str, session_id: str) -> Session:
+        session = self._lookup(session_id)
+        if session is not None:
+            return self._checked(user_id, session_id, session)
+        return self._load(user_id, session_id)
+
+    def save_session(self, session: Session):
+        with self._lock:
+            self.saves += 1
+            session.updated_at = datetime.utcnow()
+            self._put(session)
+            if self.flush_interval > 0:
+                self._dirty[session.session_id] = session
+                return
+        with self._lock:
+            self._writing.add(session.session_id)
+        try:
+            stale = self.store.save_session(session)
+        finally:
+            with self._lock:
+                self._writing.discard(session.session_id)
+        with self._lock:
+            self.backend_writes += 1
+            self._drop_stale(stale)
+
+    def flush(self) -> int:
+        """
+        Writes all dirty sessions back in one batch. Returns how many were written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                batch: List[Session] = list(self._dirty.values())
+                self._dirty.clear()
+                self._writing.update(session.session_id for session in batch)
+            try:
+                stale = self.store.save_sessions(batch)
+            except Exception as e:
+                print(f"Session flush failed, will retry: {e}")
+                with self._lock:
+                    self._writing.difference_update(session.session_id for session in batch)
+                    # Keep newer copies saved while we were flushing
+                    for session in batch:
+                        self._dirty.setdefault(session.session_id, session)
+                return 0
+            with self._lock:
+                self._writing.difference_update(session.session_id for session in batch)
+                self.flushes += 1
+                self.backend_writes += 1
+                self.flushed_sessions += len(batch)
+                self._drop_stale(stale)
+            return len(batch)
+
+    def _drop_stale(self, session_ids: List[str]):
+        # Stale copies miss the other worker's messages, the next turn reads the session again
+        for session_id in session_ids or ():
+            self.stale_writes += 1
+            if session_id not in self._dirty:
+                self._entries.pop(session_id, None)
+
+    def get_all_sessions(self):
+        # Admin listings read the backend, make sure it has our latest writes
+        self.flush()
+        return self.store.get_all_sessions()
+
+    def list_sessions(self, query):
+        self.flush()
+        return self.store.list_sessions(query)
+
+    def iter_sessions(self, query):
+        self.flush()
+        return self.store.iter_sessions(query)
+
+    def get_messages(self, session_id: str, before: Optional[int] = None, limit: int = 50):
+        self.flush()
+        return self.store.get_messages(session_id, before, limit)
+
+    # --- async API ---
+
+    async def aget_or_create_session(self, user_id: str, session_id: str) -> Session:
+        session = self._lookup(session_id)
+        if session is not None:
+            if not self.revalidate and self._in_sync(session):
+                return session # No store read needed, stay on the loop
+            return await run_blocking(self._checked, user_id, session_id, session)
+        return await run_blocking(self._load, user_id, session_id)
+
+    async def asave_session(self, session: Session):
+        if self.flush_interval > 0:
+            return self.save_session(session)
+        return await run_blocking(self.save_session, session)
+
+    async def aget_all_sessions(self):
+        return await run_blocking(self.get_all_sessions)
+
+    async def alist_sessions(self, query):
+        return await run_blocking(self.list_sessions, query)
+
+    async def aget_messages(self, session_id: str, before: Optional[int] = None, limit: int = 50):
+        return await run_blocking(self.get_messages, session_id, before, limit)
+
+    # --- background flusher ---
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        if self.flush_interval <= 0 or (self._flusher and self._flusher.is_alive()):
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._run, name="session-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "dirty": len(self._dirty),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "saves": self.saves,
+                "flushes": self.flushes,
+                "flushed_sessions": self.flushed_sessions,
+                "backend_reads": self.backend_reads,
+                "backend_writes": self.backend_writes,
+                "revalidate": self._revalidate,
+                "stale_reloads": self.stale_reloads,
+                "stale_writes": self.stale_writes,
+                "trimmed_messages": self.trimmed_messages,
+                # Round-trips an uncached setup would have made minus the ones we did
+                "backend_round_trips_saved": (lookups + self.saves) - (self.backend_reads + self.backend_writes)
+            }
+
+session_cache = SessionCache(firestore_service)
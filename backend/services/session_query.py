@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Admin listing of sessions: filters, projection and keyset pagination shared
+# by every session backend. Sessions are listed newest first, ordered by
+# (updated_at, session_id) descending; the cursor is the sort key of the last
+# item returned, so pages stay stable while new sessions are written.
+
+PROFILE_FIELDS = ("session_id", "user_id", "qualification_status", "lead_profile", "created_at", "updated_at", "message_count")
+FIELD_SETS = ("profile", "full")
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    raw = json.dumps([str(doc.get("updated_at") or ""), doc["session_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        updated_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(updated_at), str(session_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _normalize_time(value: Optional[str]) -> Optional[str]:
+    # Stored timestamps are naive UTC ISO strings, which order correctly as text
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed.isoformat()
+
+class SessionQuery:
+    """
+    Filters and paging options for listing sessions.
+    """
+    def __init__(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: str = "profile",
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+        location: Optional[str] = None,
+        updated_after: Optional[str] = None,
+        updated_before: Optional[str] = None
+    ):
+        if fields not in FIELD_SETS:
+            raise ValueError(f"fields must be one of {', '.join(FIELD_SETS)}")
+        self.limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        self.after = decode_cursor(cursor) if cursor else None
+        self.fields = fields
+        self.status = status
+        self.min_score = min_score
+        self.max_score = max_score
+        self.location = location
+        self.updated_after = _normalize_time(updated_after)
+        self.updated_before = _normalize_time(updated_before)
+
+    def matches(self, doc: Dict[str, Any]) -> bool:
+        """
+        In-process filter, for backends that cannot express the query natively.
+        """
+        profile = doc.get("lead_profile") or {}
+        updated_at = str(doc.get("updated_at") or "")
+        score = profile.get("lead_score") or 0
+        if self.status and doc.get("qualification_status") != self.status:
+            return False
+        if self.min_score is not None and score < self.min_score:
+            return False
+        if self.max_score is not None and score > self.max_score:
+            return False
+        if self.location and (profile.get("target_location") or "").lower() != self.location.lower():
+            return False
+        if self.updated_after and updated_at < self.updated_after:
+            return False
+        if self.updated_before and updated_at >= self.updated_before:
+            return False
+        if self.after and (updated_at, doc["session_id"]) >= self.after:
+            return False
+        return True
+
+    def project(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields == "full":
+            return doc
+        projected = {k: doc.get(k) for k in PROFILE_FIELDS}
+        if projected["message_count"] is None:
+            projected["message_count"] = len(doc.get("messages") or [])
+        return projected
+
+def sort_key(doc: Dict[str, Any]) -> Tuple[str, str]:
+    return str(doc.get("updated_at") or ""), doc["session_id"]
+
+def make_page(docs: List[Dict[str, Any]], query: SessionQuery) -> Dict[str, Any]:
+    """
+    `docs` is up to limit + 1 matching sessions in order; the extra one only
+    tells whether another page exists.
+    """
+    items = docs[:query.limit]
+    next_cursor = encode_cursor(items[-1]) if len(docs) > query.limit else None
+    return {"items": [query.project(d) for d in items], "next_cursor": next_cursor}
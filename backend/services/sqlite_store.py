@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.schemas import Session
+from services.session_query import SessionQuery
+from services.serialization import (
+    session_from_doc, session_to_doc, split_session_doc, is_stale, merge_stale_header, mark_synced,
+    window_start, dumps, loads
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    qualification_status TEXT NOT NULL,
+    lead_profile TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    conversation_summary TEXT,
+    summarized_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at, session_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+HEADER_COLUMNS = (
+    "session_id, user_id, qualification_status, lead_profile, message_count, "
+    "created_at, updated_at, conversation_summary, summarized_count"
+)
+
+# Columns added after the first release of the store: (name, definition)
+ADDED_COLUMNS = [
+    ("conversation_summary", "TEXT"),
+    ("summarized_count", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+class SQLiteSessionStore:
+    """
+    Session store on a single SQLite file in WAL mode.
+
+    One row per session header, messages in their own table keyed by
+    (session_id, seq). A turn is one header upsert plus inserts for the
+    messages appended since the last save, in one short write transaction,
+    so several uvicorn workers can share the file safely. Sessions are read
+    with their recent message window only; older messages are paged with
+    read_messages().
+    """
+    def __init__(self, db_path: str, json_path: Optional[str] = None):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._migrate_schema()
+        if json_path:
+            self.migrate_from_json(json_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers
+        # queue on busy_timeout instead of failing on lock upgrade
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- migration ---
+
+    def _migrate_schema(self):
+        with self._transaction() as conn:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            for name, definition in ADDED_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE sessions ADD COLUMN {name} {definition}")
+
+    def migrate_from_json(self, json_path: str):
+        """
+        One-time import of the FILE-mode local_db.json. Guarded by a meta flag
+        inside the write transaction, so only the first worker imports.
+        """
+        with self._transaction() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done:
+                return
+            imported = 0
+            if os.path.exists(json_path):
+                try:
+                    with open(json_path, 'r') as f:
+                        store = json.load(f)
+                except Exception as e:
+                    print(f"SQLite migration: could not read {json_path} ({e}), skipping")
+                    store = {}
+                for doc in store.values():
+                    self._write(conn, session_to_doc(session_from_doc(doc)))
+                    imported += 1
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (f"{json_path}:{imported}",)
+            )
+            if imported:
+                print(f"SQLite migration: imported {imported} sessions from {json_path}")
+
+    # --- reads ---
+
+    def ping(self):
+        self._conn().execute("SELECT 1").fetchone()
+
+    def _load(self, conn: sqlite3.Connection, header: tuple, with_messages: bool = True) -> Dict[str, Any]:
+        session_id, user_id, status, profile, message_count, created_at, updated_at, summary, summarized_count = header
+        doc = {"message_count": message_count}
+        if with_messages:
+            start = window_start(message_count, summarized_count)
+            rows = conn.execute(
+                "SELECT role, content, timestamp FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+                (session_id, start)
+            ).fetchall()
+            doc["messages"] = [{"role": r, "content": c, "timestamp": t} for r, c, t in rows]
+            doc["message_offset"] = start
+        return {
+            "session_id": session_id,
+            "user_id": user_id,
+            **doc,
+            "qualification_status": status,
+            "lead_profile": loads(profile),
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "conversation_summary": summary,
+            "summarized_count": summarized_count
+        }
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        header = conn.execute(f"SELECT {HEADER_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return self._load(conn, header) if header else None
+
+    def get_or_create(self, user_id: str, session_id: str) -> Session:
+        doc = self.get(session_id)
+        if doc:
+            return session_from_doc(doc)
+        new_session = Session(session_id=session_id, user_id=user_id)
+        with self._transaction() as conn:
+            # Another worker may have created it in the meantime, keep theirs
+            header = conn.execute(f"SELECT {HEADER_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if header:
+                return session_from_doc(self._load(conn, header))
+            self._write(conn, session_to_doc(new_session))
+        mark_synced(new_session, 0, 0)
+        return new_session
+
+    def message_count(self, session_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def read_messages(self, session_id: str, start: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Messages start <= seq < end (to the last one when end is None), oldest first.
+        """
+        rows = self._conn().execute(
+            "SELECT seq, role, content, timestamp FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (session_id, start, end if end is not None else 2 ** 62)
+        ).fetchall()
+        return [{"seq": s, "role": r, "content": c, "timestamp": t} for s, r, c, t in rows]
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        conn = self._conn()
+        headers = conn.execute(f"SELECT {HEADER_COLUMNS} FROM sessions ORDER BY updated_at DESC").fetchall()
+        return [self._load(conn, h) for h in headers]
+
+    def list_page(self, query: SessionQuery, limit: int) -> List[Dict[str, Any]]:
+        """
+        Up to `limit` sessions matching the query, newest first. The recent
+        message window is only read for fields='full'.
+        """
+        where, params = [], []
+        if query.status:
+            where.append("qualification_status = ?")
+            params.append(query.status)
+        if query.min_score is not None:
+            where.append("COALESCE(json_extract(lead_profile, '$.lead_score'), 0) >= ?")
+            params.append(query.min_score)
+        if query.max_score is not None:
+            where.append("COALESCE(json_extract(lead_profile, '$.lead_score'), 0) <= ?")
+            params.append(query.max_score)
+        if query.location:
+            where.append("lower(json_extract(lead_profile, '$.target_location')) = lower(?)")
+            params.append(query.location)
+        if query.updated_after:
+            where.append("updated_at >= ?")
+            params.append(query.updated_after)
+        if query.updated_before:
+            where.append("updated_at < ?")
+            params.append(query.updated_before)
+        if query.after:
+            where.append("(updated_at, session_id) < (?, ?)")
+            params.extend(query.after)
+        sql = f"SELECT {HEADER_COLUMNS} FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated_at DESC, session_id DESC LIMIT ?"
+        conn = self._conn()
+        headers = conn.execute(sql, params + [limit]).fetchall()
+        return [self._load(conn, h, with_messages=query.fields == "full") for h in headers]
+
+    # --- writes ---
+
+    def _write(self, conn: sqlite3.Connection, data: Dict[str, Any], base: Optional[Tuple[int, int]] = None) -> Tuple[int, bool]:
+        """
+        Writes one session doc; `base` is the copy's sync_base(). Returns the
+        stored message_count and whether the copy was stale (its new messages
+        were appended after another writer's and its header merged into theirs).
+        """
+        session_id = data["session_id"]
+        row = conn.execute(
+            "SELECT message_count, lead_profile, qualification_status, conversation_summary, summarized_count "
+            "FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        stored_count = row[0] if row else 0
+        header, new_messages = split_session_doc(data, stored_count, base)
+        stale = row is not None and is_stale(base, stored_count)
+        if stale:
+            header = merge_stale_header(header, {
+                "lead_profile": loads(row[1]), "qualification_status": row[2],
+                "conversation_summary": row[3], "summarized_count": row[4]
+            })
+        new_rows = [
+            (session_id, m["seq"], m["role"], m["content"], str(m["timestamp"]))
+            for m in new_messages
+        ]
+        if new_rows:
+            # Never OR IGNORE: a seq that is already taken is a bug, not a duplicate
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                new_rows
+            )
+        conn.execute(
+            """
+            INSERT INTO sessions (session_id, user_id, qualification_status, lead_profile, message_count,
+                                  created_at, updated_at, conversation_summary, summarized_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                user_id = excluded.user_id,
+                qualification_status = excluded.qualification_status,
+                lead_profile = excluded.lead_profile,
+                message_count = excluded.message_count,
+                updated_at = excluded.updated_at,
+                conversation_summary = excluded.conversation_summary,
+                summarized_count = excluded.summarized_count
+            """,
+            (
+                session_id,
+                data["user_id"],
+                str(header["qualification_status"]),
+                dumps(header["lead_profile"]).decode(),
+                header["message_count"],
+                str(data["created_at"]),
+                str(data["updated_at"]),
+                header.get("conversation_summary"),
+                header.get("summarized_count", 0)
+            )
+        )
+        return header["message_count"], stale
+
+    def save(self, data: Dict[str, Any], base: Optional[Tuple[int, int]] = None) -> Tuple[int, bool]:
+        with self._transaction() as conn:
+            return self._write(conn, data, base)
+
+    def save_many(self, docs: List[Dict[str, Any]], bases: Optional[List[Optional[Tuple[int, int]]]] = None) -> List[Tuple[int, bool]]:
+        """
+        save() for each doc in one transaction; the stored count is read and
+        the messages appended under the same write lock, so concurrent
+        workers cannot both claim a seq.
+        """
+        bases = bases or [None] * len(docs)
+        with self._transaction() as conn:
+            return [self._write(conn, data, base) for data, base in zip(docs, bases)]
@@ -0,0 +1,47 @@
+import json
+import logging
+import random
+import sys
+from datetime import datetime
+
+from config.settings import config
+
+# JSON-lines logging for per-request diagnostics. High-volume events go
+# through `log_sampled`, so a busy server logs LOG_SAMPLE_RATE of them
+# instead of one line (or a full payload dump) per call.
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(config.LOG_LEVEL.upper())
+        logger.propagate = False
+    return logger
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+def log_sampled(logger: logging.Logger, event: str, rate: float = None, level: int = logging.INFO, **fields):
+    """
+    Logs the event with probability `rate` (LOG_SAMPLE_RATE by default).
+    The line carries `sample_rate` so counts can be scaled back up.
+    """
+    rate = config.LOG_SAMPLE_RATE if rate is None else rate
+    if rate >= 1 or random.random() < rate:
+        log_event(logger, event, level, sample_rate=rate, **fields)
@@ -0,0 +1,197 @@
+import io
+import os
+import base64
+import hashlib
+import json
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Optional
+from config.settings import config
+from services.executor import run_blocking
+from services.metrics import record_cache
+
+# gTTS options that change the audio, part of the cache key
+TTS_OPTIONS = {"slow": False}
+
+class TTSCache:
+    """
+    Content-addressed, size-bounded MP3 cache on disk.
+
+    Files are named by the hash of (normalized text, language, options,
+    provider), so every worker pointing at the same directory shares the
+    cache. Writes go through a temp file + rename, reads bump the file mtime,
+    and eviction removes the least recently used files once the directory
+    exceeds max_bytes.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._approx_bytes = self._scan_size()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text: str, language: str, options: dict = TTS_OPTIONS, provider: str = "gtts") -> str:
+        parts = [self.normalize(text), language.lower(), options]
+        if provider != "gtts":
+            # Stub audio must never be served as real speech; gTTS keys stay as before
+            parts.append(provider)
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def _files(self):
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".mp3"):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path) # LRU position, visible to every worker
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.writes += 1
+            self._approx_bytes += len(data)
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used files until the cache is under 90% of max_bytes.
+        The directory is rescanned, so files written by other workers count too.
+        """
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._approx_bytes = total
+            self.evictions += removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "approx_bytes": self._approx_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+class TTSService:
+    def __init__(self):
+        self.cache = TTSCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_MB * 1024 * 1024) if config.TTS_CACHE_ENABLED else None
+
+    def _render(self, text: str, language: str) -> bytes:
+        if config.TTS_PROVIDER == "stub":
+            return self._render_stub(text, language)
+        from gtts import gTTS # Only when something is actually rendered
+        tts = gTTS(text=text, lang=language, **TTS_OPTIONS)
+        audio_fp = io.BytesIO()
+        tts.write_to_fp(audio_fp)
+        return audio_fp.getvalue()
+
+    @staticmethod
+    def _render_stub(text: str, language: str) -> bytes:
+        # Offline stand-in for load tests: fixed latency, deterministic bytes
+        # sized roughly like gTTS output (~100 bytes of MP3 per character)
+        if config.TTS_STUB_LATENCY_SECONDS > 0:
+            time.sleep(config.TTS_STUB_LATENCY_SECONDS)
+        seed = hashlib.sha256(f"{language}:{text}".encode()).digest()
+        return b"ID3" + (seed * (len(text) * 100 // len(seed) + 1))[:len(text) * 100]
+
+    def synthesize_bytes(self, text: str, language: str = "en") -> bytes:
+        """
+        Returns MP3 bytes for the text, from the cache when possible. Raises if gTTS fails.
+        """
+        if self.cache is None:
+            return self._render(text, language)
+        key = self.cache.key(text, language, provider=config.TTS_PROVIDER)
+        data = self.cache.get(key)
+        record_cache("tts", "miss" if data is None else "hit")
+        if data is None:
+            data = self._render(text, language)
+            try:
+                self.cache.put(key, data)
+            except OSError as e:
+                print(f"TTS cache write failed: {e}")
+        return data
+
+    def synthesize(self, text: str, language: str = "en") -> Optional[str]:
+        """
+        Returns the spoken reply as base64-encoded MP3, or None if TTS failed.
+        """
+        try:
+            return base64.b64encode(self.synthesize_bytes(text, language)).decode('utf-8')
+        except Exception as e:
+            print(f"TTS Generation failed: {e}")
+            return None
+
+    async def asynthesize(self, text: str, language: str = "en") -> Optional[str]:
+        # gTTS does blocking HTTP calls to Google, keep it off the event loop
+        return await run_blocking(self.synthesize, text, language)
+
+tts_service = TTSService()
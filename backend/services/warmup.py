@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from config.settings import config
+from services.executor import run_blocking
+from services.firestore_service import firestore_service
+from services.lazy import provider_stats, providers
+from services.llm_service import FALLBACK_REPLY, llm_service
+from services.model_registry import model_registry
+from services.reply_templates import TEMPLATES, fixed_replies, reply_templates
+from services.session_cache import session_cache
+from services.session_query import SessionQuery
+from services.tts_service import tts_service
+
+
+class Warmup:
+    """
+    Startup warmup and readiness for a new replica.
+
+    run() builds the lazily created services, loads the local Ollama models
+    (kept in memory for OLLAMA_KEEP_ALIVE), renders the fixed template
+    replies into the TTS cache and optionally loads the most recent sessions
+    into the session cache, so the first turns skip those cold starts. A
+    failed step is reported but does not hold readiness back; check() adds
+    live probes of the session store and Ollama.
+    """
+    def __init__(self):
+        self.state = "pending" # pending | running | done | skipped
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.seconds = None
+
+    def skip(self):
+        self.state = "skipped"
+
+    async def _step(self, name: str, fn: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        try:
+            detail = await fn()
+            self.steps[name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3), "detail": detail}
+        except Exception as e:
+            self.steps[name] = {"ok": False, "seconds": round(time.perf_counter() - started, 3), "error": str(e)}
+            print(f"⚠️ Warmup step '{name}' failed: {e}")
+
+    async def run(self):
+        self.state = "running"
+        started = time.perf_counter()
+        await self._step("providers", self._providers)
+        await asyncio.gather(
+            self._step("llm", self._llm),
+            self._step("tts_cache", self._tts_cache),
+            self._step("session_cache", self._session_cache)
+        )
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.state = "done"
+        print(f"🔥 Warmup done in {self.seconds}s")
+
+    # --- steps ---
+
+    async def _providers(self):
+        for provider in providers():
+            await run_blocking(provider.resolve)
+        return provider_stats()
+
+    async def _llm(self):
+        models = model_registry.local_models()
+        await asyncio.gather(*(llm_service.client.apreload(model) for model in models))
+        return {"preloaded": models, "keep_alive": config.OLLAMA_KEEP_ALIVE}
+
+    async def _tts_cache(self):
+        if tts_service.cache is None:
+            return "cache disabled"
+        # Replies that never change: the fallback (English text, spoken in the
+        # user's language) and templates without placeholders
+        phrases = {(lang, FALLBACK_REPLY) for lang in TEMPLATES}
+        if reply_templates is not None:
+            phrases |= fixed_replies(reply_templates.routes)
+        await asyncio.gather(*(run_blocking(tts_service.synthesize_bytes, text, lang) for lang, text in phrases))
+        return {"phrases": len(phrases)}
+
+    async def _session_cache(self):
+        if config.WARMUP_SESSIONS <= 0:
+            return {"sessions": 0}
+
+        def load() -> int:
+            page = session_cache.list_sessions(SessionQuery(limit=config.WARMUP_SESSIONS))
+            for doc in page["items"]:
+                session_cache.get_or_create_session(doc["user_id"], doc["session_id"])
+            return len(page["items"])
+
+        return {"sessions": await run_blocking(load)}
+
+    # --- readiness ---
+
+    async def _probe(self, fn: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        try:
+            detail = await asyncio.wait_for(fn(), config.READY_CHECK_TIMEOUT_SECONDS)
+            return {"ok": True, "detail": detail}
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"no answer within {config.READY_CHECK_TIMEOUT_SECONDS}s"}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _llm_probe(self):
+        loaded = await llm_service.client.aloaded_models(timeout=config.READY_CHECK_TIMEOUT_SECONDS)
+        return {"loaded": loaded, "default_model_loaded": config.MODEL_NAME in loaded}
+
+    async def check(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        (ready, report). Ready once warmup has finished (or is disabled) and
+        both the session store and Ollama answer.
+        """
+        store, llm = await asyncio.gather(
+            self._probe(lambda: run_blocking(firestore_service.ping)),
+            self._probe(self._llm_probe)
+        )
+        checks = {
+            "warmup": {"ok": self.state in ("done", "skipped"), "state": self.state, "seconds": self.seconds, "steps": self.steps},
+            "session_store": store,
+            "llm": llm,
+        }
+        return all(c["ok"] for c in checks.values()), checks
+
+
+warmup = Warmup()
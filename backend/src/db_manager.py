@@ -1,19 +1,52 @@
 import os
+import threading
+import time
 from datetime import datetime
-from supabase import create_client, Client
 from models.schemas import LeadProfile, Session
 from config.settings import config
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import json
+from src.local_providers import LocalSupabaseClient
+from services.lazy import Lazy
 
 class DatabaseManager:
-    def __init__(self):
+    """
+    CRM writes to Supabase, buffered and incremental.
+
+    Lead rows and conversation messages are buffered and sent as bulk upserts
+    when `batch_size` rows are waiting or the oldest has waited
+    `flush_interval` seconds (`flush_due`; the outbox flushes on it and only
+    then marks the CRM jobs done), or on an explicit `flush()`.
+    Messages go to the append-only 'conversation_messages' table keyed by
+    (session_id, seq); a per-session watermark means only messages added
+    since the last successful write are sent. The watermark lives in memory,
+    so after a restart a session's first write resends its history once,
+    which the (session_id, seq) upsert key makes harmless. The tables (and
+    the migration from the embedded `messages` column) are in
+    config/supabase_schema.sql.
+    """
+    def __init__(self, batch_size: int = config.CRM_BATCH_SIZE, flush_interval: float = config.CRM_FLUSH_INTERVAL_SECONDS):
         self.supabase_url = os.environ.get("SUPABASE_URL")
         self.supabase_key = os.environ.get("SUPABASE_KEY")
-        self.client: Optional[Client] = None
-        
-        if self.supabase_url and self.supabase_key:
+        self.client = None # supabase Client or the local stand-in
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._leads: Dict[str, Dict[str, Any]] = {} # session_id -> latest lead row
+        self._conversations: Dict[str, Dict[str, Any]] = {} # session_id -> header row
+        self._messages: Dict[Tuple[str, int], Dict[str, Any]] = {} # (session_id, seq) -> message row
+        self._watermarks: Dict[str, int] = {} # session_id -> messages stored or buffered
+        self._oldest_buffered_at: Optional[float] = None
+        self.flushes = 0
+        self.rows_written = 0
+
+        if config.PROVIDER_MODE == "local":
+            self.client = LocalSupabaseClient()
+            print("✅ Local Supabase stand-in enabled")
+        elif self.supabase_url and self.supabase_key:
             try:
+                from supabase import create_client # ~0.1 s to import, only needed here
                 self.client = create_client(self.supabase_url, self.supabase_key)
                 print("✅ Supabase Client Initialized")
             except Exception as e:
@@ -21,51 +54,132 @@ class DatabaseManager:
         else:
             print("⚠️ SUPABASE_URL or SUPABASE_KEY not found. Running in MOCK DB mode.")
 
-    def upsert_lead(self, session_id: str, profile: LeadProfile, score: int):
+    def _pending_rows(self) -> int:
+        return len(self._leads) + len(self._messages)
+
+    def _buffered(self):
+        if self._oldest_buffered_at is None:
+            self._oldest_buffered_at = time.time()
+        if self._pending_rows() >= self.batch_size:
+            self.flush()
+
+    def upsert_lead(self, session_id: str, profile: LeadProfile, score: int, updated_at: Optional[str] = None):
         """
-        Inserts or updates a lead record in the 'leads' table.
+        Buffers the lead record for the 'leads' table; the latest one per session wins.
         """
         if not self.client:
-            print(f"[MOCK DB] Upsert Lead {session_id}: {profile.dict()}")
+            print(f"[MOCK DB] Upsert Lead {session_id}: {profile.model_dump()}")
             return
-        
-        try:
-            data = {
-                "session_id": session_id,
-                "investment_type": profile.investment_type,
-                "budget": profile.budget_range,
-                "property_type": profile.property_type,
-                "bedrooms": profile.bedrooms,
-                "location": profile.target_location,
-                "language": profile.language_preference,
-                "urgency": profile.urgency,
-                "score": score,
-                "updated_at": datetime.now().isoformat()
-            }
-            # Upsert based on session_id (assuming it's a unique key or primary key)
-            self.client.table("leads").upsert(data, on_conflict="session_id").execute()
-        except Exception as e:
-            print(f"❌ DB Error (upsert_lead): {e}")
 
-    def log_conversation(self, session_id: str, messages: List[Any]):
+        data = {
+            "session_id": session_id,
+            "investment_type": profile.investment_type,
+            "budget": profile.budget_range,
+            "property_type": profile.property_type,
+            "bedrooms": profile.bedrooms,
+            "location": profile.target_location,
+            "language": profile.language_preference,
+            "urgency": profile.urgency,
+            "score": score,
+            "updated_at": updated_at or datetime.now().isoformat()
+        }
+        with self._lock:
+            self._leads[session_id] = data
+            self._buffered()
+
+    def log_conversation(self, session_id: str, messages: List[Any], updated_at: Optional[str] = None, offset: int = 0):
         """
-        Logs the full conversation history to 'conversations' table.
+        Buffers the messages not yet logged for this session (append-only).
+        `messages` is the conversation so far from message number `offset`
+        (the session's loaded window); earlier ones were logged before.
         """
         if not self.client:
-            # print(f"[MOCK DB] Log Conversation {session_id}: {len(messages)} messages")
             return
 
-        try:
-            # Convert internal Message objects to dicts
-            msgs_json = [m.dict() if hasattr(m, "dict") else m for m in messages]
-            
-            data = {
+        updated_at = updated_at or datetime.now().isoformat()
+        with self._lock:
+            start = max(self._watermarks.get(session_id, 0), offset)
+            count = offset + len(messages)
+            if count <= start:
+                return
+            for seq in range(start, count):
+                m = messages[seq - offset]
+                m = m.model_dump() if hasattr(m, "model_dump") else m
+                self._messages[(session_id, seq)] = {
+                    "session_id": session_id,
+                    "seq": seq,
+                    "role": getattr(m["role"], "value", m["role"]),
+                    "content": m["content"],
+                    "logged_at": updated_at
+                }
+            self._watermarks[session_id] = count
+            self._conversations[session_id] = {
                 "session_id": session_id,
-                "messages": msgs_json,
-                "updated_at": datetime.now().isoformat()
+                "message_count": count,
+                "updated_at": updated_at
+            }
+            self._buffered()
+
+    def flush(self) -> int:
+        """
+        Sends every buffered row as one bulk upsert per table. On failure the
+        rows stay buffered for the next flush and the error is raised.
+        Returns the number of rows written.
+        """
+        if not self.client:
+            return 0
+        with self._lock:
+            leads = list(self._leads.values())
+            messages = sorted(self._messages.values(), key=lambda r: (r["session_id"], r["seq"]))
+            conversations = list(self._conversations.values())
+            if not (leads or messages or conversations):
+                return 0
+            try:
+                if leads:
+                    self.client.table("leads").upsert(leads, on_conflict="session_id").execute()
+                    self._leads.clear()
+                if messages:
+                    self.client.table("conversation_messages").upsert(messages, on_conflict="session_id,seq").execute()
+                    self._messages.clear()
+                if conversations:
+                    self.client.table("conversations").upsert(conversations, on_conflict="session_id").execute()
+                    self._conversations.clear()
+            except Exception as e:
+                # Tables that did go out were already dropped from the buffer
+                print(f"❌ DB Error (flush): {e}")
+                raise
+            finally:
+                self._oldest_buffered_at = time.time() if self._pending_rows() or self._conversations else None
+            written = len(leads) + len(messages) + len(conversations)
+            self.flushes += 1
+            self.rows_written += written
+            return written
+
+    def flush_due(self) -> bool:
+        """
+        Whether the buffer should be flushed now: batch_size rows are waiting,
+        the oldest has waited flush_interval, or nothing is left to send.
+        """
+        with self._lock:
+            if self._oldest_buffered_at is None:
+                return True
+            return self._pending_rows() >= self.batch_size or time.time() - self._oldest_buffered_at >= self.flush_interval
+
+    def flush_if_due(self) -> int:
+        with self._lock:
+            if self._oldest_buffered_at is None or time.time() - self._oldest_buffered_at < self.flush_interval:
+                return 0
+            return self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buffered_leads": len(self._leads),
+                "buffered_messages": len(self._messages),
+                "sessions_tracked": len(self._watermarks),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written
             }
-            self.client.table("conversations").upsert(data, on_conflict="session_id").execute()
-        except Exception as e:
-            print(f"❌ DB Error (log_conversation): {e}")
 
-db_manager = DatabaseManager()
+# Built on first use, not at import
+db_manager = Lazy("db_manager", DatabaseManager)
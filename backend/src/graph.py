@@ -1,13 +1,18 @@
+import asyncio
+import time
 from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 
-from models.schemas import LeadProfile, ProcessStatus
+from models.schemas import LeadProfile, ProcessStatus, Session
 from services.llm_service import llm_service
 from services.lead_extraction import lead_extractor
-from src.hybrid_router import should_escalate, select_model
-from src.notify import notification_manager
-from src.db_manager import db_manager
+from src.hybrid_router import should_escalate, select_model, is_trivial
+from src.side_effects import enqueue_lead_side_effects
+from services.executor import run_blocking
+from services.history_manager import history_manager
+from services.reply_templates import reply_templates
+from services.tts_service import tts_service
+from services import metrics
+from services.lazy import Lazy
 
 # Define State
 class LeadAgentState(TypedDict):
@@ -20,103 +25,200 @@ class LeadAgentState(TypedDict):
     latest_reply: str
     audio_base64: Optional[str]
     language: str
+    cached_reply: Optional[str] # Set by the response cache, skips the LLM call
+    conversation_summary: Optional[str]
+    summarized_count: int
+    message_offset: int # Position of messages[0] in the transcript (older ones are not loaded)
+    previous_profile: LeadProfile # Profile before this turn's extraction
 
-# Node: Qualifier (The detailed worker)
-def qualifier_node(state: LeadAgentState):
+# Node: Extract (runs first, so the reply is generated from the updated profile)
+def extract_node(state: LeadAgentState):
     user_msg = state['messages'][-1]['content']
-    profile = state['lead_profile']
-    
-    # 1. Router Logic
-    escalate = should_escalate(user_msg, state.get('extraction_attempts', 0))
-    model = select_model(escalate)
-    
-    # Temporary: Update llm_service model on the fly (not thread safe in prod but ok for this demo)
-    # Ideally pass model param to generate_response
-    original_model = llm_service.model
-    if model == "Cloud-Claude":
-        # Placeholder for Claude integration
-        # In real scenario: llm_service.generate_response(..., model="claude-3-5-sonnet")
-        print(">>> SWITCHING TO CLAUDE (Simulated) <<<")
-        # For now, we simulate Claude by just flagging it, 
-        # as we might not have the API key set up in llm_service yet.
-        pass
+    # Extract into a copy: the session keeps its old profile until the turn is saved
+    with metrics.stage("qualifier_extraction"):
+        updated_profile = lead_extractor.extract_data(user_msg, state['lead_profile'].model_copy())
+        updated_profile.lead_score = lead_extractor.calculate_lead_score(updated_profile)
+        new_status = lead_extractor.check_qualification_status(updated_profile)
+    metrics.record_transition(state['qualification_status'], new_status)
 
-    # 2. Generate Reply
-    # Create a dummy Session object because llm_service expects it
-    # We must bridge the gap between new State and old Session object
-    from models.schemas import Session as SchemaSession, Message as SchemaMessage
-    
-    schema_msgs = [SchemaMessage(role=m['role'], content=m['content']) for m in state['messages']]
-    dummy_session = SchemaSession(
-        session_id=state['session_id'],
-        user_id="user",
-        messages=schema_msgs,
-        lead_profile=profile,
-        qualification_status=state['qualification_status']
-    )
-    
-    reply = llm_service.generate_response(dummy_session, user_msg, state['language'])
-    
-    # 3. Extract entities
-    updated_profile = lead_extractor.extract_data(user_msg, profile)
-    score = lead_extractor.calculate_lead_score(updated_profile)
-    updated_profile.lead_score = score
-    new_status = lead_extractor.check_qualification_status(updated_profile)
-    
-    # Check if extraction made progress?
-    # For simplicity, we just increment attempts if score didn't increase significantly?
-    # Or just reset attempts if we got new data.
-    # Let's simple increment attempts if status is same.
+    # Repeated turns without a status change count as failed extraction attempts
+    # (the router escalates after two); any change resets the count.
     new_attempts = state['extraction_attempts'] + 1
     if new_status != state['qualification_status']:
          new_attempts = 0
 
     return {
         "lead_profile": updated_profile,
+        "previous_profile": state['lead_profile'],
         "qualification_status": new_status,
-        "lead_score": score,
-        "model_used": model,
-        "latest_reply": reply,
         "extraction_attempts": new_attempts
     }
 
-# Node: Notifier
-def notifier_node(state: LeadAgentState):
-    profile = state['lead_profile']
-    
-    if profile.lead_score > 80 or state['qualification_status'] == ProcessStatus.QUALIFIED:
-        # Trigger notifications
-        notification_manager.send_sms(profile)
-        notification_manager.send_email(profile, state['session_id'])
-        if profile.lead_score > 90:
-             notification_manager.trigger_call()
+async def aextract_node(state: LeadAgentState):
+    # Regex/keyword scan, microseconds: cheaper inline than on the thread pool
+    return extract_node(state)
+
+# Node: Respond (cached reply, template, or LLM)
+def _prepare_turn(state: LeadAgentState):
+    user_msg = state['messages'][-1]['content']
     
-    # Persist to DB
-    db_manager.upsert_lead(
-        state['session_id'], 
-        profile, 
-        profile.lead_score
+    # 1. Router Logic: the chosen tier travels with this request down to the LLM call
+    escalate = should_escalate(user_msg, state.get('extraction_attempts', 0))
+    model = select_model(escalate, is_trivial(user_msg))
+
+    # 2. Generate Reply
+    # Create a dummy Session object because llm_service expects it
+    # We must bridge the gap between new State and old Session object:
+    # one validation pass over plain dicts, no Message object built per item
+
+    # The current user message is the last state message and is sent separately,
+    # older turns are folded into the rolling summary. summarized_count counts
+    # from the start of the transcript, the loaded window from message_offset.
+    history = state['messages'][:-1]
+    offset = state.get('message_offset', 0)
+    summary, folded = history_manager.fold(
+        history, state.get('conversation_summary'), state.get('summarized_count', 0) - offset
     )
-    db_manager.log_conversation(state['session_id'], state['messages'])
-    
+    summarized_count = offset + folded
+    dummy_session = Session.model_validate({
+        "session_id": state['session_id'],
+        "user_id": "user",
+        "messages": [{"role": m['role'], "content": m['content']} for m in history[folded:]],
+        "lead_profile": state['lead_profile'], # Already includes this message's details (instance kept as is)
+        "qualification_status": state['qualification_status'],
+        "conversation_summary": summary,
+        "summarized_count": summarized_count
+    })
+    return user_msg, model, dummy_session
+
+def _finish_turn(dummy_session, model: str, reply: str):
+    metrics.record_route(model)
+    return {
+        "model_used": model,
+        "latest_reply": reply,
+        "conversation_summary": dummy_session.conversation_summary,
+        "summarized_count": dummy_session.summarized_count
+    }
+
+def _quick_reply(state: LeadAgentState, user_msg: str, model: str):
+    """
+    (model, reply) when the turn needs no LLM call: a cached reply or a slot
+    question template. None otherwise.
+    """
+    if state.get('cached_reply'):
+        return "Cache", state['cached_reply']
+    if reply_templates is None:
+        return None
+    template = reply_templates.reply(
+        user_msg, state.get('previous_profile') or state['lead_profile'], state['lead_profile'], state['language'],
+        escalated=model == "Cloud-Claude", small_talk=is_trivial(user_msg),
+        first_turn=state.get('message_offset', 0) + len(state['messages']) == 1
+    )
+    return ("Template", template) if template is not None else None
+
+def respond_node(state: LeadAgentState):
+    user_msg, model, dummy_session = _prepare_turn(state)
+    quick = _quick_reply(state, user_msg, model)
+    if quick is not None:
+        return _finish_turn(dummy_session, *quick)
+    with metrics.stage("qualifier_llm"):
+        reply = llm_service.generate_response(dummy_session, user_msg, state['language'], model)
+    return _finish_turn(dummy_session, model, reply)
+
+async def arespond_node(state: LeadAgentState):
+    user_msg, model, dummy_session = _prepare_turn(state)
+    quick = _quick_reply(state, user_msg, model)
+    if quick is not None:
+        return _finish_turn(dummy_session, *quick)
+    with metrics.stage("qualifier_llm"):
+        reply = await llm_service.agenerate_response(dummy_session, user_msg, state['language'], model)
+    return _finish_turn(dummy_session, model, reply)
+
+# Node: Notifier (needs only the extracted profile, runs alongside Respond)
+def notifier_node(state: LeadAgentState):
+    # Notifications and CRM writes go to the durable outbox, so the turn only
+    # pays for one local insert; outbox workers deliver them with retries.
+    with metrics.stage("notifier"):
+        enqueue_lead_side_effects(state)
     return {} # No state update needed, just side effects
 
-# Build Graph
-builder = StateGraph(LeadAgentState)
+async def anotifier_node(state: LeadAgentState):
+    return await run_blocking(notifier_node, state)
 
-builder.add_node("qualifier", qualifier_node)
-builder.add_node("notifier", notifier_node)
+# Node: TTS (starts as soon as the reply text exists)
+def tts_node(state: LeadAgentState):
+    with metrics.stage("tts"):
+        return {"audio_base64": tts_service.synthesize(state['latest_reply'], state['language'])}
 
-builder.set_entry_point("qualifier")
+async def atts_node(state: LeadAgentState):
+    with metrics.stage("tts"):
+        return {"audio_base64": await tts_service.asynthesize(state['latest_reply'], state['language'])}
 
 # Edge Logic
 def should_notify(state: LeadAgentState):
-    # If qualified or high score, go to notifier
-    if state['qualification_status'] == ProcessStatus.QUALIFIED or state['lead_profile'].lead_score > 80:
-        return "notifier"
-    return END
+    # If qualified or high score, notify
+    return state['qualification_status'] == ProcessStatus.QUALIFIED or state['lead_profile'].lead_score > 80
+
+def after_extract(state: LeadAgentState):
+    # Fan out: the notifier does not need the reply, so it runs while Respond generates it
+    return ["respond", "notifier"] if should_notify(state) else ["respond"]
+
+# Build Graph
+def build_graph():
+    # LangGraph is the slowest import of the app (~0.5 s), so it is only
+    # loaded when the graph is first used (or by the startup warmup)
+    from langgraph.graph import StateGraph, END
+    from langchain_core.runnables import RunnableLambda
+
+    builder = StateGraph(LeadAgentState)
+
+    # Each node carries a sync and an async implementation, so the same compiled
+    # graph serves both graph.invoke() and graph.ainvoke().
+    builder.add_node("extract", RunnableLambda(extract_node, afunc=aextract_node, name="extract"))
+    builder.add_node("respond", RunnableLambda(respond_node, afunc=arespond_node, name="respond"))
+    builder.add_node("notifier", RunnableLambda(notifier_node, afunc=anotifier_node, name="notifier"))
+    builder.add_node("tts", RunnableLambda(tts_node, afunc=atts_node, name="tts"))
+
+    builder.set_entry_point("extract")
+    builder.add_conditional_edges("extract", after_extract, ["respond", "notifier"])
+    builder.add_edge("respond", "tts")
+    builder.add_edge("tts", END)
+    builder.add_edge("notifier", END)
+    return builder.compile()
+
+graph = Lazy("graph", build_graph)
+
+async def astream_turn(state: LeadAgentState):
+    """
+    Streaming counterpart of graph.ainvoke(): runs the same extract/respond/notifier
+    steps but yields ("token", chunk) while the reply is generated, then
+    ("state", final_state). TTS is left to the caller, which runs it alongside the save.
+    """
+    state = {**state, **extract_node(state)}
+    # Enqueued while the reply streams
+    notify_task = asyncio.create_task(anotifier_node(state)) if should_notify(state) else None
+    try:
+        user_msg, model, dummy_session = _prepare_turn(state)
+        quick = _quick_reply(state, user_msg, model)
+        if quick is not None:
+            model, reply = quick
+            chunks = [reply]
+            yield "token", reply
+        else:
+            chunks = []
+            # Measured as generation time only: yields wait on the client, not the LLM
+            llm_seconds = 0.0
+            started = time.perf_counter()
+            async for chunk in llm_service.astream_response(dummy_session, user_msg, state['language'], model):
+                llm_seconds += time.perf_counter() - started
+                chunks.append(chunk)
+                yield "token", chunk
+                started = time.perf_counter()
+            metrics.observe_stage("qualifier_llm", llm_seconds + time.perf_counter() - started)
 
-builder.add_conditional_edges("qualifier", should_notify)
-builder.add_edge("notifier", END)
+        final_state = {**state, **_finish_turn(dummy_session, model, "".join(chunks))}
+    finally:
+        if notify_task is not None:
+            await notify_task
 
-graph = builder.compile()
+    yield "state", final_state
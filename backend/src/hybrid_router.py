@@ -5,6 +5,14 @@ COMPLEX_KEYWORDS = [
     "market analysis", "trends", "forecast", "legal", "mortgage", "financing"
 ]
 
+# Greetings, thanks and acknowledgements (en/ar/fr/es) that any small model can answer
+TRIVIAL_PHRASES = {
+    "hi", "hello", "hey", "hiya", "good morning", "good afternoon", "good evening",
+    "thanks", "thank you", "thx", "ok", "okay", "cool", "great", "bye", "goodbye",
+    "مرحبا", "اهلا", "أهلا", "السلام عليكم", "شكرا", "شكراً",
+    "bonjour", "salut", "merci", "hola", "buenos dias", "buenos días", "gracias",
+}
+
 def should_escalate(user_message: str, extraction_attempts: int = 0) -> bool:
     """
     Decides whether to route to a smarter model (Claude) or stay with local (Llama).
@@ -23,5 +31,16 @@ def should_escalate(user_message: str, extraction_attempts: int = 0) -> bool:
     # 3. Default to Local
     return False
 
-def select_model(escalate: bool) -> str:
-    return "Cloud-Claude" if escalate else "Local-Llama"
+def is_trivial(user_message: str) -> bool:
+    """
+    True for small talk with nothing to extract ("Hi!", "thanks", "ok"),
+    which the tiny local model answers as well as the default one.
+    """
+    text = re.sub(r"[^\w\s]", " ", user_message.lower()).strip()
+    text = " ".join(text.split())
+    return text in TRIVIAL_PHRASES
+
+def select_model(escalate: bool, trivial: bool = False) -> str:
+    if escalate:
+        return "Cloud-Claude"
+    return "Local-Tiny" if trivial else "Local-Llama"
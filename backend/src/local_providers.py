@@ -0,0 +1,110 @@
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+from config.settings import config
+
+# Offline stand-ins for Twilio, Resend and Supabase (PROVIDER_MODE=local).
+# Every call is appended to a JSONL file so deliveries can be inspected, and a
+# configurable failure rate / latency exercises the outbox retry path.
+
+class LocalProviderError(Exception):
+    pass
+
+class LocalProviderLog:
+    def __init__(self, path: str = config.LOCAL_PROVIDER_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, action: str, data: Dict[str, Any]) -> str:
+        if config.LOCAL_PROVIDER_LATENCY_SECONDS > 0:
+            time.sleep(config.LOCAL_PROVIDER_LATENCY_SECONDS)
+        if random.random() < config.LOCAL_PROVIDER_FAILURE_RATE:
+            raise LocalProviderError(f"Simulated {provider} {action} failure")
+        ref = f"{provider[:2].upper()}{uuid.uuid4().hex[:16]}"
+        entry = {"ts": datetime.utcnow().isoformat(), "provider": provider, "action": action, "id": ref, "data": data}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        return ref
+
+    def entries(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+provider_log = LocalProviderLog()
+
+class _Result:
+    def __init__(self, sid: str, data=None):
+        self.sid = sid
+        self.data = data
+
+class _LocalMessages:
+    def create(self, body: str, from_: str, to: str):
+        return _Result(provider_log.record("twilio", "sms", {"body": body, "from": from_, "to": to}))
+
+class _LocalCalls:
+    def create(self, twiml: str, to: str, from_: str):
+        return _Result(provider_log.record("twilio", "call", {"twiml": twiml, "from": from_, "to": to}))
+
+class LocalTwilioClient:
+    """Implements the parts of twilio.rest.Client used by NotificationManager."""
+    def __init__(self):
+        self.messages = _LocalMessages()
+        self.calls = _LocalCalls()
+
+class LocalEmailClient:
+    """Implements resend.Emails.send."""
+    @staticmethod
+    def send(params: Dict[str, Any]) -> Dict[str, str]:
+        return {"id": provider_log.record("resend", "email", params)}
+
+class _LocalQuery:
+    def __init__(self, client, table: str, action: str, data, on_conflict: str):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.payload = data if isinstance(data, list) else [data]
+        self.on_conflict = on_conflict
+
+    def execute(self):
+        provider_log.record("supabase", f"{self.table}.{self.action}", {"on_conflict": self.on_conflict, "rows": self.payload})
+        self.client._apply(self.table, self.payload, self.on_conflict)
+        return _Result(None, self.payload)
+
+class _LocalTable:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+
+    def upsert(self, data, on_conflict: str = ""):
+        return _LocalQuery(self.client, self.name, "upsert", data, on_conflict)
+
+class LocalSupabaseClient:
+    """
+    Implements client.table(name).upsert(data, on_conflict=...).execute(),
+    keeping the upserted rows in memory (`tables`) so writes can be checked.
+    """
+    def __init__(self):
+        self.tables: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str):
+        return _LocalTable(self, name)
+
+    def _apply(self, table: str, rows: List[Dict[str, Any]], on_conflict: str):
+        keys = [k.strip() for k in on_conflict.split(",") if k.strip()]
+        with self._lock:
+            self.requests += 1
+            store = self.tables.setdefault(table, {})
+            for row in rows:
+                key = tuple(row.get(k) for k in keys) if keys else (len(store),)
+                store[key] = {**store.get(key, {}), **row}
@@ -2,16 +2,10 @@ import os
 from config.settings import config
 from models.schemas import LeadProfile
 
-# Try importing libraries, handle mock if missing
-try:
-    from twilio.rest import Client as TwilioClient
-except ImportError:
-    TwilioClient = None
+from src.local_providers import LocalTwilioClient, LocalEmailClient
+from services.lazy import Lazy
 
-try:
-    import resend
-except ImportError:
-    resend = None
+# Delivery methods raise on provider errors so the outbox can retry them.
 
 class NotificationManager:
     def __init__(self):
@@ -24,6 +18,25 @@ class NotificationManager:
         self.sales_email = config.SALES_TEAM_EMAIL
 
         self.twilio_client = None
+        self.email_client = None
+        if config.PROVIDER_MODE == "local":
+            self.twilio_client = LocalTwilioClient()
+            self.twilio_from = self.twilio_from or "+10000000000"
+            self.email_client = LocalEmailClient()
+            print("✅ Local notification providers enabled")
+            return
+
+        # Try importing libraries, handle mock if missing. Imported here rather
+        # than at module import, the manager is only built on first use.
+        try:
+            from twilio.rest import Client as TwilioClient
+        except ImportError:
+            TwilioClient = None
+        try:
+            import resend
+        except ImportError:
+            resend = None
+
         if TwilioClient and self.twilio_sid and self.twilio_auth:
             try:
                 self.twilio_client = TwilioClient(self.twilio_sid, self.twilio_auth)
@@ -33,6 +46,7 @@ class NotificationManager:
 
         if resend and self.resend_key:
             resend.api_key = self.resend_key
+            self.email_client = resend.Emails
             print("✅ Resend Client Initialized")
         else:
             print("⚠️ RESEND_API_KEY not found or lib missing.")
@@ -50,6 +64,7 @@ class NotificationManager:
                 print(f"✅ SMS Sent: {message.sid}")
             except Exception as e:
                 print(f"❌ SMS Failed: {e}")
+                raise
         else:
             print(f"[MOCK SMS] To: {self.sales_phone} | Body: {msg_body}")
 
@@ -72,9 +87,9 @@ class NotificationManager:
         <p>Please contact immediately.</p>
         """
         
-        if resend and self.resend_key:
+        if self.email_client:
             try:
-                r = resend.Emails.send({
+                r = self.email_client.send({
                     "from": "AI Agent <onboarding@resend.dev>",
                     "to": self.sales_email,
                     "subject": subject,
@@ -83,6 +98,7 @@ class NotificationManager:
                 print(f"✅ Email Sent: {r}")
             except Exception as e:
                 print(f"❌ Email Failed: {e}")
+                raise
         else:
             print(f"[MOCK EMAIL] To: {self.sales_email} | Subject: {subject}")
 
@@ -99,7 +115,8 @@ class NotificationManager:
                 print(f"✅ Call Initiated: {call.sid}")
              except Exception as e:
                 print(f"❌ Call Failed: {e}")
+                raise
         else:
              print("[MOCK CALL] Ringing Sales Team...")
 
-notification_manager = NotificationManager()
+notification_manager = Lazy("notification_manager", NotificationManager)
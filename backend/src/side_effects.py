@@ -0,0 +1,81 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+
+from models.schemas import LeadProfile, ProcessStatus
+from services.outbox import outbox, OutboxJob
+from services.serialization import model_to_doc
+from src.notify import notification_manager
+from src.db_manager import db_manager
+
+# Side effects of a qualified turn, run by the outbox workers instead of inline.
+#
+# Idempotency:
+# - sales notifications (sms, email, call) go out once per session;
+# - CRM writes are keyed on a hash of their content, and a newer pending
+#   snapshot of the same lead/conversation replaces an older one.
+
+def _content_key(kind: str, session_id: str, payload: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return f"{kind}:{session_id}:{digest}"
+
+def build_jobs(state) -> List[OutboxJob]:
+    session_id = state['session_id']
+    profile = state['lead_profile']
+    profile_data = model_to_doc(profile)
+    jobs = []
+
+    if profile.lead_score > 80 or state['qualification_status'] == ProcessStatus.QUALIFIED:
+        jobs.append(OutboxJob("sms", {"profile": profile_data}, f"sms:{session_id}"))
+        jobs.append(OutboxJob("email", {"profile": profile_data, "session_id": session_id}, f"email:{session_id}"))
+        if profile.lead_score > 90:
+            jobs.append(OutboxJob("call", {"session_id": session_id}, f"call:{session_id}"))
+
+    now = datetime.now().isoformat()
+    lead = {"session_id": session_id, "profile": profile_data, "score": profile.lead_score}
+    jobs.append(OutboxJob(
+        "upsert_lead", {**lead, "updated_at": now}, _content_key("upsert_lead", session_id, lead),
+        ordering_key=f"lead:{session_id}", supersede=True
+    ))
+    conversation = {"session_id": session_id, "messages": state['messages'], "offset": state.get('message_offset', 0)}
+    jobs.append(OutboxJob(
+        "log_conversation", {**conversation, "updated_at": now}, _content_key("log_conversation", session_id, conversation),
+        ordering_key=f"conversation:{session_id}", supersede=True
+    ))
+    return jobs
+
+def enqueue_lead_side_effects(state) -> int:
+    return outbox.enqueue_many(build_jobs(state))
+
+# --- handlers ---
+
+def _send_sms(payload):
+    notification_manager.send_sms(LeadProfile(**payload["profile"]))
+
+def _send_email(payload):
+    notification_manager.send_email(LeadProfile(**payload["profile"]), payload["session_id"])
+
+def _trigger_call(payload):
+    notification_manager.trigger_call()
+
+# CRM jobs only buffer their rows in db_manager. The outbox keeps them claimed
+# and flushes the buffer for every kind at once when CRM_BATCH_SIZE rows are
+# waiting or the oldest has waited CRM_FLUSH_INTERVAL_SECONDS; the jobs are
+# marked done only after that flush, so a failed write is retried.
+
+def _upsert_leads(payloads):
+    for p in payloads:
+        db_manager.upsert_lead(p["session_id"], LeadProfile(**p["profile"]), p["score"], p["updated_at"])
+
+def _log_conversations(payloads):
+    for p in payloads:
+        db_manager.log_conversation(p["session_id"], p["messages"], p["updated_at"], p.get("offset", 0))
+
+outbox.register("sms", _send_sms)
+outbox.register("email", _send_email)
+outbox.register("call", _trigger_call)
+# Lambdas, so the manager is not built at import
+outbox.add_buffer("crm", flush=lambda: db_manager.flush(), due=lambda: db_manager.flush_due())
+outbox.register("upsert_lead", _upsert_leads, batch=True, buffer="crm")
+outbox.register("log_conversation", _log_conversations, batch=True, buffer="crm")